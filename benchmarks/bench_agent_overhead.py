@@ -0,0 +1,82 @@
+"""Micro-benchmark: per-request overhead of the AIClient request paths.
+
+The model is a pydantic-ai FunctionModel that answers instantly, so the
+numbers measure only client-side setup and dispatch cost.
+
+Usage:
+    uv run python benchmarks/bench_agent_overhead.py [--requests 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelMessage, ModelResponse, TextPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from claude_clis.shared.ai_client import AIClient
+from claude_clis.shared.config import ConfigManager
+
+SYSTEM_PROMPT = "You are converting part of a larger document to Markdown."
+
+
+def echo(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+    return ModelResponse(parts=[TextPart("# Converted\n\nSome text.")])
+
+
+async def measure(requests: int, call: Callable[[int], Awaitable[str]]) -> float:
+    """Return mean microseconds per request"""
+    for i in range(min(50, requests)):  # Warm up
+        await call(i)
+    start = time.perf_counter()
+    for i in range(requests):
+        await call(i)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(requests: int) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_manager = ConfigManager()
+        config_manager._config_dir = Path(tmpdir)
+        config_manager._config_file = Path(tmpdir) / "config.yaml"
+
+        model = FunctionModel(echo)
+        client = AIClient(config_manager)
+        client._models["gemini"] = model
+
+        async def agent_per_request(i: int) -> str:
+            # What run_prompt did before agents were pooled
+            agent = Agent(model=model, system_prompt=SYSTEM_PROMPT)
+            return (await agent.run(f"chunk {i}")).output
+
+        async def pooled_agent(i: int) -> str:
+            agent = client.create_agent("gemini", SYSTEM_PROMPT)
+            return (await agent.run(f"chunk {i}")).output
+
+        async def default_path(i: int) -> str:
+            # Plain prompts go straight to the model unless direct_requests is off
+            return await client.run_prompt(f"chunk {i}", "gemini", SYSTEM_PROMPT)
+
+        baseline = await measure(requests, agent_per_request)
+        rows = [
+            ("Agent per request (before)", baseline),
+            ("Pooled agent", await measure(requests, pooled_agent)),
+            ("run_prompt (direct, default)", await measure(requests, default_path)),
+        ]
+
+    print(f"{'Path':<30} {'us/request':>12} {'vs before':>10}")
+    for name, micros in rows:
+        print(f"{name:<30} {micros:>12.1f} {baseline / micros:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,103 @@
+"""Benchmark: character chunking of large extracted text.
+
+Times chunk_by_chars against the previous backward-scanning chunker on
+pathological inputs at growing sizes. Time per MB should stay flat as the
+input grows; a rising column means the chunker isn't linear.
+
+Usage:
+    uv run python benchmarks/bench_chunker.py [--sizes 1 10 50] [--chunk-size 4000]
+        [--skip-legacy]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from collections.abc import Callable
+
+from claude_clis.shared.chunking import chunk_by_chars
+
+MB = 1024 * 1024
+WORDS = "data model request latency chunk token document table section result".split()
+
+
+def legacy_chunk_content(content: str, chunk_size: int = 4000) -> list[str]:
+    """The chunker chunk_by_chars replaced, kept for comparison"""
+    if len(content) <= chunk_size:
+        return [content]
+    chunks = []
+    current_pos = 0
+    while current_pos < len(content):
+        end_pos = min(current_pos + chunk_size, len(content))
+        if end_pos < len(content):
+            for i in range(end_pos, max(current_pos + chunk_size // 2, end_pos - 200), -1):
+                if content[i:i+2] == "\n\n":
+                    end_pos = i + 2
+                    break
+            else:
+                for i in range(end_pos, max(current_pos + chunk_size // 2, end_pos - 100), -1):
+                    if content[i] in ".!?":
+                        end_pos = i + 1
+                        break
+        chunk = content[current_pos:end_pos].strip()
+        if chunk:
+            chunks.append(chunk)
+        current_pos = end_pos
+    return chunks
+
+
+def prose(size: int) -> str:
+    rng = random.Random(0)
+    paragraphs = []
+    total = 0
+    while total < size:
+        sentences = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + "."
+            for _ in range(rng.randint(2, 6))
+        ]
+        paragraphs.append(" ".join(sentences))
+        total += len(paragraphs[-1]) + 2
+    return "\n\n".join(paragraphs)[:size]
+
+
+INPUTS: dict[str, Callable[[int], str]] = {
+    "prose": prose,
+    # PDF extraction that lost every line break
+    "no newlines": lambda size: prose(size).replace("\n\n", " "),
+    # Nothing to cut at: both fallbacks search their whole window every chunk
+    "no boundaries": lambda size: "x" * size,
+    "all sentences": lambda size: "." * size,
+    "blank lines": lambda size: "\n" * size,
+}
+
+
+def measure(chunker: Callable[[str, int], list[str]], text: str, chunk_size: int) -> float:
+    start = time.perf_counter()
+    chunker(text, chunk_size)
+    return time.perf_counter() - start
+
+
+def main(sizes: list[int], chunk_size: int, skip_legacy: bool) -> None:
+    chunkers: dict[str, Callable[[str, int], list[str]]] = {"current": chunk_by_chars}
+    if not skip_legacy:
+        chunkers["legacy"] = legacy_chunk_content
+
+    print(f"{'input':<14} {'MB':>5} " + " ".join(f"{name + ' s':>10} {'ms/MB':>7}" for name in chunkers))
+    for name, make in INPUTS.items():
+        for size in sizes:
+            text = make(size * MB)
+            cells = []
+            for chunker in chunkers.values():
+                seconds = measure(chunker, text, chunk_size)
+                cells.append(f"{seconds:>10.3f} {seconds / size * 1000:>7.1f}")
+            print(f"{name:<14} {size:>5} " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50], help="Input sizes in MB")
+    parser.add_argument("--chunk-size", type=int, default=4000)
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the current chunker")
+    args = parser.parse_args()
+    main(args.sizes, args.chunk_size, args.skip_legacy)
@@ -0,0 +1,94 @@
+"""Load test: end-to-end doc2md batch conversion against the stub provider.
+
+Generates a corpus of text documents and converts it with several
+--max-concurrent settings, so concurrency can be tuned without spending
+provider quota.
+
+Usage:
+    uv run python benchmarks/bench_doc2md_stub.py [--files 40] [--paragraphs 200]
+        [--latency 1.0] [--tokens-per-second 80] [--error-rate 0.02]
+        [--max-concurrent 1 3 8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from claude_clis.shared.config import config_manager
+from claude_clis.shared.utils import CLIContext
+from claude_clis.tools.doc2md.processor import Doc2mdProcessor
+
+WORDS = "data model request latency chunk token document table section result".split()
+
+
+def write_corpus(directory: Path, files: int, paragraphs: int) -> None:
+    rng = random.Random(0)
+    for i in range(files):
+        blocks = []
+        for p in range(paragraphs):
+            if p % 10 == 0:
+                blocks.append(f"Section {p // 10 + 1}")
+            else:
+                blocks.append(" ".join(rng.choice(WORDS) for _ in range(60)) + ".")
+        (directory / f"doc{i:03}.txt").write_text("\n\n".join(blocks), encoding="utf-8")
+
+
+async def run_batch(input_dir: Path, output_dir: Path, max_concurrent: int) -> tuple[float, int]:
+    cli_ctx = CLIContext()
+    cli_ctx.quiet = True
+    processor = Doc2mdProcessor(cli_ctx, use_cache=False)
+    start = time.perf_counter()
+    try:
+        results = await processor.batch_convert(
+            input_dir, output_dir, pattern="*.txt", ai_provider="stub",
+            max_concurrent=max_concurrent,
+        )
+    finally:
+        await processor.aclose()
+    return time.perf_counter() - start, len(results)
+
+
+async def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        config_manager._config_dir = root
+        config_manager._config_file = root / "config.yaml"
+        config_manager._config = None
+        config = config_manager.load_config()
+        config.cache.enabled = False
+        config.ai.stub.latency_mean = args.latency
+        config.ai.stub.latency_stddev = args.latency / 2
+        config.ai.stub.tokens_per_second = args.tokens_per_second
+        config.ai.stub.rate_limit_rate = args.error_rate / 2
+        config.ai.stub.server_error_rate = args.error_rate / 2
+        config.ai.stub.seed = 0
+
+        input_dir = root / "docs"
+        input_dir.mkdir()
+        write_corpus(input_dir, args.files, args.paragraphs)
+
+        print(f"{'max-concurrent':>14} {'seconds':>10} {'docs/s':>8} {'converted':>10}")
+        for max_concurrent in args.max_concurrent:
+            seconds, converted = await run_batch(
+                input_dir, root / f"out{max_concurrent}", max_concurrent
+            )
+            print(
+                f"{max_concurrent:>14} {seconds:>10.2f} "
+                f"{converted / seconds:>8.2f} {converted:>6}/{args.files}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--max-concurrent", type=int, nargs="+", default=[1, 3, 8])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,117 @@
+"""Response cache management commands."""
+
+from __future__ import annotations
+
+import sys
+
+import click
+
+from ..shared.cache import ResponseCacheError, open_response_cache
+from ..shared.config import config_manager
+from ..shared.utils import CLIContext, confirm_action, format_file_size, print_table
+
+
+@click.group(name="cache")
+def cache_cmd() -> None:
+    """🗄️ Response cache management
+
+    Inspect and maintain the on-disk cache of AI responses used by doc2md.
+
+    **Examples:**
+    ```bash
+    # Show cache usage
+    claude-clis cache stats
+
+    # Evict entries not used in the last 30 days
+    claude-clis cache prune --older-than 30
+
+    # Remove everything
+    claude-clis cache clear
+    ```
+    """
+    pass
+
+
+@cache_cmd.command("stats")
+@click.pass_obj
+def cache_stats(cli_ctx: CLIContext) -> None:
+    """📊 Show cache size and hit rate"""
+    try:
+        stats = open_response_cache(config_manager).stats()
+    except ResponseCacheError as e:
+        cli_ctx.error(str(e))
+        sys.exit(1)
+
+    enabled = config_manager.load_config().cache.enabled
+    print_table(
+        "Response Cache",
+        ["Metric", "Value"],
+        [
+            ["Enabled", "Yes" if enabled else "No"],
+            ["Location", str(stats.path)],
+            ["Entries", f"{stats.entries:,}"],
+            ["Size", format_file_size(stats.total_bytes)],
+            ["Limit", format_file_size(stats.max_bytes)],
+            ["Hits", f"{stats.hits:,}"],
+            ["Misses", f"{stats.misses:,}"],
+            ["Hit rate", f"{stats.hit_rate:.1%}"],
+        ],
+    )
+
+
+@cache_cmd.command("prune")
+@click.option(
+    "--max-size-mb",
+    type=float,
+    default=None,
+    help="Shrink the cache to this size (default: configured limit)"
+)
+@click.option(
+    "--older-than",
+    type=float,
+    default=None,
+    help="Also remove entries not used in this many days"
+)
+@click.pass_obj
+def cache_prune(
+    cli_ctx: CLIContext,
+    max_size_mb: float | None,
+    older_than: float | None,
+) -> None:
+    """✂️ Evict least recently used entries"""
+    try:
+        cache = open_response_cache(config_manager)
+        removed = cache.prune(
+            max_bytes=int(max_size_mb * 1024 * 1024) if max_size_mb is not None else None,
+            older_than=older_than * 86400 if older_than is not None else None,
+        )
+        stats = cache.stats()
+    except ResponseCacheError as e:
+        cli_ctx.error(str(e))
+        sys.exit(1)
+
+    cli_ctx.success(
+        f"Removed {removed} entries, {stats.entries} remaining "
+        f"({format_file_size(stats.total_bytes)})"
+    )
+
+
+@cache_cmd.command("clear")
+@click.option(
+    "--yes", "-y",
+    is_flag=True,
+    help="Don't ask for confirmation"
+)
+@click.pass_obj
+def cache_clear(cli_ctx: CLIContext, yes: bool) -> None:
+    """🗑️ Remove all cached responses"""
+    if not yes and not confirm_action("Remove all cached responses?"):
+        return
+
+    try:
+        removed = open_response_cache(config_manager).clear()
+    except ResponseCacheError as e:
+        cli_ctx.error(str(e))
+        sys.exit(1)
+
+    cli_ctx.success(f"Removed {removed} cached responses")
@@ -159,7 +159,7 @@ def config_show(cli_ctx: CLIContext, format: str) -> None:
 @config.command("init")
 @click.option(
     "--provider",
-    type=click.Choice(["gemini", "ollama", "anthropic"]),
+    type=click.Choice(["gemini", "ollama", "anthropic", "stub"]),
     default="gemini",
     help="Default AI provider"
 )
@@ -190,6 +190,10 @@ def config_init(cli_ctx: CLIContext, provider: str) -> None:
             cli_ctx.info("   Install: https://ollama.ai/")
             cli_ctx.info("   Run: ollama serve")
             cli_ctx.info("   Pull a model: ollama pull llama3.2")
+        elif provider == "stub":
+            cli_ctx.info("📝 The stub provider answers offline; tune it under ai.stub:")
+            cli_ctx.info("   claude-clis config set ai.stub.latency_mean 1.5")
+            cli_ctx.info("   claude-clis config set ai.stub.rate_limit_rate 0.05")
         
         cli_ctx.success("✅ Configuration initialized!")
         cli_ctx.info(f"📁 Config location: {config_manager.config_file}")
@@ -204,6 +208,7 @@ def show_tools_list(cli_ctx: CLIContext) -> None:
     tools = [
         ["doc2md", "Convert documents to Markdown", "PDF, DOCX → Markdown"],
         ["config", "Manage configuration", "AI providers, API keys"],
+        ["cache", "Manage response cache", "Stats, prune, clear"],
         ["claude-code", "Claude Code integration", "Register CLI commands"],
     ]
     
@@ -256,6 +261,12 @@ def register_tools() -> None:
         # Handle gracefully if optional tools are not available
         print_error(f"Failed to load doc2md tool: {e}")
     
+    try:
+        from .commands.cache import cache_cmd
+        main.add_command(cache_cmd)
+    except ImportError as e:
+        print_error(f"Failed to load cache command: {e}")
+    
     try:
         from .commands.claude_code import claude_code_cmd
         main.add_command(claude_code_cmd)
@@ -1,44 +1,400 @@
 from __future__ import annotations
 
+import asyncio
+import importlib.util
+import json
+import math
 import os
-from typing import Any
+import random
+import time
+from collections import deque
+from contextlib import AbstractAsyncContextManager, nullcontext
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterator,
+)
+from email.utils import parsedate_to_datetime
+from functools import partial
+from typing import Any, cast
 
 import httpx
 from pydantic_ai import Agent
+from pydantic_ai.direct import model_request
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelRequestPart,
+    SystemPromptPart,
+    TextPart,
+    UserPromptPart,
+)
 from pydantic_ai.models import KnownModelName, Model
 from pydantic_ai.models.anthropic import AnthropicModel
 from pydantic_ai.models.google import GoogleModel
+from pydantic_ai.providers.anthropic import AnthropicProvider
 from pydantic_ai.providers.google import GoogleProvider
+from pydantic_ai.settings import ModelSettings
 # from pydantic_ai.models.ollama import OllamaModel
 
+from .cache import ResponseCache, make_cache_key
+from .chunking import (
+    IncrementalChunker,
+    chunk_by_anchors,
+    chunk_by_chars,
+    chunk_by_structure,
+    chunk_by_tokens,
+    iter_chunks,
+    split_in_half,
+)
 from .config import ConfigManager
+from .journal import ChunkJournal, ChunkStore
+from .packing import build_packed_content, pack_marker, pack_nonce, split_packed_response
+from .routing import ChunkRouter
+from .stub_model import create_stub_model
+from .telemetry import MetricsRecorder, TokenUsage, estimate_cost, request_context
+from .tokens import chunk_token_budget, estimate_tokens
 
 
 class AIClientError(Exception):
     pass
 
 
+class CircuitOpenError(AIClientError):
+    pass
+
+
+class TruncatedResponseError(AIClientError):
+    """The model stopped at its output token limit"""
+
+    def __init__(self, output: str, usage: TokenUsage | None = None) -> None:
+        super().__init__("AI response was cut off at the output token limit")
+        self.output = output
+        self.usage = usage
+
+
+# Finish reasons meaning the output limit was hit (OpenAI-compatible,
+# Anthropic and Gemini respectively)
+_LENGTH_FINISH_REASONS = ("length", "max_tokens", "MAX_TOKENS")
+
+
+def check_truncation(
+    output: str,
+    usage: TokenUsage,
+    max_tokens: int | None,
+    finish_reason: str | None = None,
+) -> None:
+    """Raise TruncatedResponseError if the response ended at the output limit
+
+    Without a finish reason from the provider, a response that used the
+    whole max_tokens budget is taken as cut off.
+    """
+    if finish_reason is not None:
+        truncated = finish_reason in _LENGTH_FINISH_REASONS
+    else:
+        truncated = bool(max_tokens) and usage.output_tokens >= cast(int, max_tokens)
+    if truncated:
+        raise TruncatedResponseError(output, usage)
+
+
+def _finish_reason(response: Any) -> str | None:
+    details = getattr(response, "provider_details", None) or {}
+    return details.get("finish_reason")
+
+
+def _iter_causes(exc: BaseException) -> Iterator[BaseException]:
+    """Walk an exception and everything it was raised from"""
+    seen: set[int] = set()
+    current: BaseException | None = exc
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        yield current
+        current = current.__cause__ or current.__context__
+
+
+def _status_code(exc: BaseException) -> int | None:
+    for error in _iter_causes(exc):
+        # pydantic-ai, anthropic and openai use status_code; google-genai uses
+        # code; httpx keeps it on the response
+        for value in (
+            getattr(error, "status_code", None),
+            getattr(error, "code", None),
+            getattr(getattr(error, "response", None), "status_code", None),
+        ):
+            if isinstance(value, int) and 100 <= value < 600:
+                return value
+    return None
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """429, 408 and 5xx responses and transport failures are worth retrying"""
+    status = _status_code(exc)
+    if status is not None:
+        return status in (408, 429) or status >= 500
+    return any(
+        isinstance(error, (httpx.TransportError, asyncio.TimeoutError, TimeoutError))
+        for error in _iter_causes(exc)
+    )
+
+
+def is_outage_error(exc: BaseException) -> bool:
+    """Failures that suggest the backend itself is down, as opposed to throttling"""
+    status = _status_code(exc)
+    if status is not None:
+        return status >= 500
+    return is_retryable_error(exc)
+
+
+def get_retry_after(exc: BaseException) -> float | None:
+    """Read a Retry-After header from the HTTP response behind an error"""
+    for error in _iter_causes(exc):
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or getattr(error, "headers", None)
+        if not headers:
+            continue
+        
+        value = headers.get("retry-after-ms")
+        if value:
+            try:
+                return float(value) / 1000
+            except ValueError:
+                pass
+        
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+    return None
+
+
+class CircuitBreaker:
+    """Stops sending requests to a provider after repeated outage failures"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_request(self, provider: str) -> bool:
+        """Raise while the circuit is open; True if this request is the half-open probe"""
+        if self.state == "closed":
+            return False
+        
+        remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+        if self.state == "open" and remaining <= 0:
+            # Let a single probe request through to test the backend
+            self.state = "half_open"
+        
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        
+        raise CircuitOpenError(
+            f"AI provider '{provider}' is unavailable after {self._failures} consecutive "
+            f"failures; retrying in {max(0.0, remaining):.0f}s"
+        )
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Let another probe through after this one ended without an outcome,
+        e.g. because it was cancelled"""
+        if self.state == "half_open":
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+
+class TokenBucket:
+    """Async token bucket that refills continuously at a fixed rate"""
+
+    def __init__(self, capacity: float, refill_per_second: float) -> None:
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """Take amount tokens, sleeping until they are available; returns seconds waited"""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        
+        # Holding the lock while sleeping keeps waiters in FIFO order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.refill_per_second
+                await asyncio.sleep(delay)
+                waited += delay
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one provider"""
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0) -> None:
+        self._requests = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60)
+            if requests_per_minute > 0 else None
+        )
+        self._tokens = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+            if tokens_per_minute > 0 else None
+        )
+
+    async def acquire(self, tokens: int = 0) -> float:
+        waited = 0.0
+        if self._requests is not None:
+            waited += await self._requests.acquire(1)
+        if self._tokens is not None and tokens > 0:
+            waited += await self._tokens.acquire(tokens)
+        return waited
+
+
+class LatencyTracker:
+    """Rolling window of successful request latencies for one provider"""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
 class AIClient:
     def __init__(self, config_manager: ConfigManager) -> None:
         self._config_manager = config_manager
         self._models: dict[str, Model] = {}
+        self._rate_limiters: dict[str, RateLimiter] = {}
+        self._circuit_breakers: dict[str, CircuitBreaker] = {}
+        self._agents: dict[tuple[str, str, str], Agent[None, str]] = {}
+        self._http_client: httpx.AsyncClient | None = None
+        self._latencies: dict[str, LatencyTracker] = {}
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.prompt_requests = 0
+        self.coalesced_requests = 0
+        self._in_flight: dict[str, tuple[asyncio.Task[str], list[int]]] = {}
+        self._slots: dict[str, asyncio.Semaphore] = {}
+        self._warm_ups: dict[str, asyncio.Task[None]] = {}
+        self.metrics = MetricsRecorder()
 
-    def _get_model(self, provider: str) -> Model:
-        if provider in self._models:
-            return self._models[provider]
+    def _http_options(self) -> dict[str, Any]:
+        http_config = self._config_manager.load_config().ai.http
+        return {
+            # HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 without it
+            "http2": http_config.http2 and importlib.util.find_spec("h2") is not None,
+            "limits": httpx.Limits(
+                max_connections=http_config.max_connections,
+                max_keepalive_connections=http_config.max_keepalive_connections,
+                keepalive_expiry=http_config.keepalive_expiry,
+            ),
+            "timeout": httpx.Timeout(
+                http_config.read_timeout,
+                connect=http_config.connect_timeout,
+            ),
+        }
 
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """Pooled HTTP client shared by every provider"""
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(**self._http_options())
+        return self._http_client
+
+    async def aclose(self) -> None:
+        """Close pooled connections; models are rebuilt on next use"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        self._models.clear()
+        self._agents.clear()
+
+    def _create_google_provider(self, api_key: str) -> GoogleProvider:
+        from google import genai
+        from google.genai.types import HttpOptions
+        
+        if "httpx_async_client" in HttpOptions.model_fields:
+            # Only newer google-genai releases take a client of their own, so
+            # the field is checked at runtime rather than by the type checker
+            http_options = HttpOptions.model_validate({"httpx_async_client": self.http_client})
+        else:
+            # Older releases only accept settings for the client they build
+            http_options = HttpOptions(async_client_args=self._http_options())
+        return GoogleProvider(client=genai.Client(api_key=api_key, http_options=http_options))
+
+    def get_api_key(self, provider: str) -> str:
         config = self._config_manager.get_ai_config(provider)
         
         if provider == "gemini":
-            # Check for API key
             api_key = config.get("api_key") or os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
             if not api_key:
                 raise AIClientError(
                     "Gemini API key not found. Set GOOGLE_API_KEY or configure it with: "
                     "claude-clis config set ai.gemini.api_key YOUR_KEY"
                 )
-            
-            google_provider = GoogleProvider(api_key=api_key)
+            return api_key
+        
+        if provider == "anthropic":
+            api_key = config.get("api_key") or os.getenv("ANTHROPIC_API_KEY")
+            if not api_key:
+                raise AIClientError(
+                    "Anthropic API key not found. Set ANTHROPIC_API_KEY or configure it with: "
+                    "claude-clis config set ai.anthropic.api_key YOUR_KEY"
+                )
+            return api_key
+        
+        raise AIClientError(f"AI provider '{provider}' does not use an API key")
+
+    def _get_model(self, provider: str) -> Model:
+        if provider in self._models:
+            return self._models[provider]
+
+        config = self._config_manager.get_ai_config(provider)
+        model: Model
+        
+        if provider == "gemini":
+            api_key = self.get_api_key(provider)
+            google_provider = self._create_google_provider(api_key)
             model = GoogleModel(
                 model_name=config["model"],
                 provider=google_provider,
@@ -49,32 +405,157 @@ class AIClient:
             from pydantic_ai.models.openai import OpenAIModel
             from pydantic_ai.providers.ollama import OllamaProvider
             
-            ollama_provider = OllamaProvider(base_url=config["base_url"])
+            ollama_provider = OllamaProvider(
+                base_url=config["base_url"],
+                http_client=self.http_client,
+            )
             model = OpenAIModel(
                 model_name=config["model"],
                 provider=ollama_provider,
             )
             
         elif provider == "anthropic":
-            # Check for API key
-            api_key = config.get("api_key") or os.getenv("ANTHROPIC_API_KEY")
-            if not api_key:
-                raise AIClientError(
-                    "Anthropic API key not found. Set ANTHROPIC_API_KEY or configure it with: "
-                    "claude-clis config set ai.anthropic.api_key YOUR_KEY"
-                )
-            
+            api_key = self.get_api_key(provider)
             model = AnthropicModel(
                 model_name=config["model"],
-                api_key=api_key,
+                provider=AnthropicProvider(api_key=api_key, http_client=self.http_client),
             )
             
+        elif provider == "stub":
+            model = create_stub_model(config)
+            
         else:
             raise AIClientError(f"Unknown AI provider: {provider}")
 
         self._models[provider] = model
         return model
 
+    def _get_rate_limiter(self, provider: str) -> RateLimiter:
+        if provider not in self._rate_limiters:
+            config = self._config_manager.get_ai_config(provider)
+            self._rate_limiters[provider] = RateLimiter(
+                requests_per_minute=config.get("requests_per_minute", 0),
+                tokens_per_minute=config.get("tokens_per_minute", 0),
+            )
+        return self._rate_limiters[provider]
+
+    def _get_circuit_breaker(self, provider: str) -> CircuitBreaker:
+        if provider not in self._circuit_breakers:
+            breaker_config = self._config_manager.load_config().ai.circuit_breaker
+            self._circuit_breakers[provider] = CircuitBreaker(
+                failure_threshold=breaker_config.failure_threshold,
+                reset_timeout=breaker_config.reset_timeout,
+            )
+        return self._circuit_breakers[provider]
+
+    def get_parallelism(self, provider: str) -> int:
+        """Requests the provider's server handles at once, or 0 if unlimited
+
+        Only Ollama reports this: its num_parallel setting, else the
+        OLLAMA_NUM_PARALLEL the server was presumably started with.
+        """
+        if provider != "ollama":
+            return 0
+        configured = self._config_manager.get_ai_config(provider).get("num_parallel", 0)
+        if configured:
+            return int(configured)
+        try:
+            return max(0, int(os.getenv("OLLAMA_NUM_PARALLEL", "0")))
+        except ValueError:
+            return 0
+
+    def _request_slot(self, provider: str) -> AbstractAsyncContextManager[Any]:
+        """Hold one of the server's parallel slots while a request runs
+
+        Requests beyond the slots would only queue on the server, where
+        their time counts against the request timeout.
+        """
+        parallelism = self.get_parallelism(provider)
+        if not parallelism:
+            return nullcontext()
+        if provider not in self._slots:
+            self._slots[provider] = asyncio.Semaphore(parallelism)
+        return self._slots[provider]
+
+    def _ollama_url(self, path: str) -> str:
+        base_url = self._config_manager.get_ai_config("ollama")["base_url"].rstrip("/")
+        return f"{base_url.removesuffix('/v1')}{path}"
+
+    def _ollama_options(self, settings: ModelSettings | None = None) -> dict[str, Any]:
+        config = self._config_manager.get_ai_config("ollama")
+        # The model is reloaded whenever num_ctx changes, so every request
+        # and the warm-up must agree on it
+        options: dict[str, Any] = {"num_ctx": config.get("num_ctx") or config["context_window"]}
+        if settings:
+            if settings.get("temperature") is not None:
+                options["temperature"] = settings["temperature"]
+            if settings.get("max_tokens"):
+                options["num_predict"] = settings["max_tokens"]
+        return options
+
+    async def warm_up(self, provider: str | None = None) -> bool:
+        """Load a local model before the first request needs it
+
+        Returns whether the provider has anything to load (only Ollama does).
+        Concurrent callers share one load.
+        """
+        provider = provider or self._config_manager.get_ai_provider()
+        if provider != "ollama" or not self._config_manager.get_ai_config(provider).get("native_api"):
+            return False
+        if provider not in self._warm_ups:
+            self._warm_ups[provider] = asyncio.ensure_future(self._load_ollama_model())
+        await asyncio.shield(self._warm_ups[provider])
+        return True
+
+    async def _load_ollama_model(self) -> None:
+        config = self._config_manager.get_ai_config("ollama")
+        try:
+            # A generate request without a prompt only loads the model
+            response = await self.http_client.post(
+                self._ollama_url("/api/generate"),
+                json={
+                    "model": config["model"],
+                    "keep_alive": config["keep_alive"],
+                    "options": self._ollama_options(),
+                },
+                timeout=config["timeout"],
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise AIClientError(f"Could not load Ollama model {config['model']}: {e}") from e
+
+    def _model_settings(
+        self,
+        provider: str,
+        overrides: ModelSettings | None = None,
+    ) -> ModelSettings:
+        """Default request settings from the provider config, merged with overrides"""
+        config = self._config_manager.get_ai_config(provider)
+        settings: dict[str, Any] = {}
+        for key in ("temperature", "max_tokens", "timeout"):
+            if config.get(key) is not None:
+                settings[key] = config[key]
+        settings.update(overrides or {})
+        return cast(ModelSettings, settings)
+
+    def _request_settings(
+        self,
+        provider: str,
+        prompt: str,
+        overrides: ModelSettings | None = None,
+    ) -> ModelSettings:
+        """Model settings with max_tokens sized to the output the prompt needs
+
+        Conversions come out about as long as their input, so the configured
+        max_tokens is only the ceiling.
+        """
+        settings: dict[str, Any] = dict(self._model_settings(provider, overrides))
+        ratio = self._config_manager.load_config().ai.output_token_ratio
+        if ratio > 0 and settings.get("max_tokens") and "max_tokens" not in (overrides or {}):
+            expected = max(512, math.ceil(estimate_tokens(prompt) * ratio))
+            settings["max_tokens"] = min(settings["max_tokens"], expected)
+        return cast(ModelSettings, settings)
+
     def create_agent(
         self, 
         provider: str | None = None,
@@ -82,13 +563,151 @@ class AIClient:
         **kwargs: Any
     ) -> Agent[None, str]:
         provider = provider or self._config_manager.get_ai_provider()
-        model = self._get_model(provider)
+        kwargs["model_settings"] = self._model_settings(provider, kwargs.get("model_settings"))
         
-        return Agent(
-            model=model,
-            system_prompt=system_prompt,
-            **kwargs
+        # Agents are stateless between runs, so reuse one per distinct setup
+        key = (
+            provider,
+            system_prompt or "",
+            json.dumps(kwargs, sort_keys=True, default=repr),
         )
+        if key not in self._agents:
+            self._agents[key] = Agent(
+                model=self._get_model(provider),
+                system_prompt=system_prompt or (),
+                **kwargs
+            )
+        return self._agents[key]
+
+    async def _before_attempt(self, provider: str, estimated_tokens: int) -> tuple[float, bool]:
+        """Check the breaker and wait for quota
+
+        Returns the seconds spent waiting and whether the attempt is the
+        breaker's half-open probe, which the caller must release if the
+        attempt ends without recording an outcome.
+        """
+        breaker = self._get_circuit_breaker(provider)
+        probe = breaker.before_request(provider)
+        
+        # Wait for quota before the request goes out instead of collecting 429s
+        try:
+            return await self._get_rate_limiter(provider).acquire(estimated_tokens), probe
+        except BaseException:
+            if probe:
+                breaker.release_probe()
+            raise
+
+    async def _after_failure(self, provider: str, error: Exception, attempt: int) -> None:
+        """Record a failed attempt and back off, or raise if it should not be retried"""
+        retry = self._config_manager.load_config().ai.retry
+        breaker = self._get_circuit_breaker(provider)
+        
+        if is_outage_error(error):
+            breaker.record_failure()
+        else:
+            # The backend answered, so it is up even if it refused us
+            breaker.record_success()
+        
+        if not is_retryable_error(error) or attempt >= retry.max_attempts:
+            suffix = f" (after {attempt} attempts)" if attempt > 1 else ""
+            raise AIClientError(f"AI request failed{suffix}: {str(error)}") from error
+        
+        # Full jitter keeps concurrent chunks from retrying in lockstep
+        backoff = min(retry.max_delay, retry.base_delay * 2 ** (attempt - 1))
+        delay = random.uniform(0, backoff)
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, retry.base_delay)
+        
+        await asyncio.sleep(delay)
+
+    async def _with_retries(
+        self,
+        provider: str,
+        estimated_tokens: int,
+        request: Callable[[], Awaitable[tuple[str, TokenUsage]]],
+    ) -> str:
+        attempt = 1
+        queue_wait = 0.0
+        while True:
+            wait, probe = await self._before_attempt(provider, estimated_tokens)
+            queue_wait += wait
+            waiting = time.monotonic()
+            try:
+                async with self._request_slot(provider):
+                    started = time.monotonic()
+                    queue_wait += started - waiting
+                    error: Exception | None = None
+                    try:
+                        output, usage = await request()
+                    except TruncatedResponseError as e:
+                        # The same request would stop at the same limit, so hand it
+                        # back to the caller to split instead of retrying
+                        self._get_circuit_breaker(provider).record_success()
+                        self._record_call(
+                            provider, "truncated", e.usage, time.monotonic() - started, queue_wait, attempt
+                        )
+                        raise
+                    except Exception as e:
+                        error = e
+                    latency = time.monotonic() - started
+            except BaseException:
+                # Cancelled, e.g. as a hedge loser: the backend's health is unknown
+                if probe:
+                    self._get_circuit_breaker(provider).release_probe()
+                raise
+            
+            # Back off outside the slot so other requests can use it
+            if error is not None:
+                try:
+                    await self._after_failure(provider, error, attempt)
+                except AIClientError:
+                    self._record_call(provider, "error", None, latency, queue_wait, attempt)
+                    raise
+                attempt += 1
+                continue
+            
+            self._latencies.setdefault(provider, LatencyTracker()).record(latency)
+            self._get_circuit_breaker(provider).record_success()
+            self._record_call(provider, "ok", usage, latency, queue_wait, attempt)
+            return output
+
+    def _record_call(
+        self,
+        provider: str,
+        status: str,
+        usage: TokenUsage | None,
+        latency: float,
+        queue_wait: float,
+        attempts: int,
+    ) -> None:
+        config = self._config_manager.get_ai_config(provider)
+        self.metrics.record(
+            provider,
+            config["model"],
+            status,
+            usage=usage,
+            latency=latency,
+            queue_wait=queue_wait,
+            attempts=attempts,
+            cost=estimate_cost(usage, config) if usage is not None else 0.0,
+        )
+
+    def _provider_chain(self, provider: str) -> list[str]:
+        """The requested provider followed by the configured fallbacks"""
+        chain = [provider]
+        for fallback in self._config_manager.load_config().ai.fallback_providers:
+            if fallback not in chain and fallback in self.get_available_providers():
+                chain.append(fallback)
+        return chain
+
+    def _hedge_delay(self, provider: str) -> float:
+        """How long to wait on a request before sending a duplicate"""
+        hedging = self._config_manager.load_config().ai.hedging
+        tracker = self._latencies.get(provider)
+        if tracker is None or len(tracker) < hedging.min_samples:
+            return hedging.initial_delay
+        return max(hedging.min_delay, tracker.quantile(hedging.quantile) or 0.0)
 
     async def run_prompt(
         self,
@@ -97,16 +716,352 @@ class AIClient:
         system_prompt: str | None = None,
         **kwargs: Any
     ) -> str:
-        agent = self.create_agent(provider, system_prompt, **kwargs)
+        """Run a prompt, sharing one request between identical concurrent calls"""
+        provider = provider or self._config_manager.get_ai_provider()
+        self.prompt_requests += 1
+        if not self._config_manager.load_config().ai.coalesce_requests:
+            return await self._run_chain(prompt, provider, system_prompt, **kwargs)
         
+        info = self.get_model_info(provider)
+        key = make_cache_key(
+            prompt, system_prompt, provider, info["model"], info["temperature"], extra=kwargs
+        )
+        if key in self._in_flight:
+            self.coalesced_requests += 1
+            task, waiters = self._in_flight[key]
+        else:
+            task = asyncio.ensure_future(
+                self._run_chain(prompt, provider, system_prompt, **kwargs)
+            )
+            waiters = [0]
+            self._in_flight[key] = (task, waiters)
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        
+        waiters[0] += 1
         try:
-            result = await agent.run(prompt)
-            return result.output
-        except Exception as e:
-            raise AIClientError(f"AI request failed: {str(e)}") from e
+            return await asyncio.shield(task)
+        finally:
+            waiters[0] -= 1
+            # Nobody is left to use the answer once the last caller is cancelled
+            if waiters[0] == 0 and not task.done():
+                task.cancel()
+
+    async def _run_chain(
+        self,
+        prompt: str,
+        provider: str,
+        system_prompt: str | None = None,
+        **kwargs: Any
+    ) -> str:
+        chain = self._provider_chain(provider)
+        
+        async def attempt(on: str) -> str:
+            return await self._run_on_provider(on, prompt, system_prompt, **kwargs)
+        
+        errors: list[AIClientError] = []
+        if self._config_manager.load_config().ai.hedging.enabled:
+            tried: list[str] = []
+            try:
+                return await self._run_hedged(chain, attempt, tried)
+            except TruncatedResponseError:
+                raise
+            except AIClientError as e:
+                errors.append(e)
+            # Carry on down the chain with providers the hedge didn't use
+            chain = [on for on in chain if on not in tried]
+        
+        for i, on in enumerate(chain):
+            if i > 0 or errors:
+                self.failovers += 1
+            try:
+                return await attempt(on)
+            except TruncatedResponseError:
+                # Another provider wouldn't fit the answer in fewer tokens
+                raise
+            except AIClientError as e:
+                errors.append(e)
+        
+        if len(errors) == 1:
+            raise errors[0]
+        raise AIClientError(
+            "All AI providers failed: " + "; ".join(str(e) for e in errors)
+        ) from errors[-1]
+
+    async def _run_hedged(
+        self,
+        chain: list[str],
+        attempt: Callable[[str], Awaitable[str]],
+        tried: list[str],
+    ) -> str:
+        """Race a duplicate request against a slow one and keep the first answer"""
+        tried.append(chain[0])
+        primary = asyncio.ensure_future(attempt(chain[0]))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay(chain[0]))
+            if not done:
+                # Prefer a secondary provider so the duplicate avoids the slow backend
+                self.hedged_requests += 1
+                hedge_provider = chain[1] if len(chain) > 1 else chain[0]
+                tried.append(hedge_provider)
+                tasks.add(asyncio.ensure_future(attempt(hedge_provider)))
+            
+            error: BaseException | None = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _run_on_provider(
+        self,
+        provider: str,
+        prompt: str,
+        system_prompt: str | None = None,
+        **kwargs: Any
+    ) -> str:
+        plain = set(kwargs) <= {"model_settings"}
+        if plain and provider == "ollama" and self._config_manager.get_ai_config(provider).get("native_api"):
+            return await self._complete_with_ollama(
+                prompt, system_prompt, kwargs.get("model_settings")
+            )
+        
+        # Plain prompt-in/text-out calls don't need the Agent machinery
+        if self._config_manager.load_config().ai.direct_requests and plain:
+            return await self.complete(
+                prompt, provider, system_prompt, kwargs.get("model_settings")
+            )
+        
+        agent = self.create_agent(provider, system_prompt, **kwargs)
+        settings = self._request_settings(provider, prompt, kwargs.get("model_settings"))
+        
+        async def request() -> tuple[str, TokenUsage]:
+            result = await agent.run(prompt, model_settings=settings)
+            usage = TokenUsage.from_usage(result.usage())
+            check_truncation(
+                result.output,
+                usage,
+                settings.get("max_tokens"),
+                _finish_reason(result.all_messages()[-1]),
+            )
+            return result.output, usage
+        
+        return await self._with_retries(
+            provider, estimate_tokens(prompt + (system_prompt or "")), request
+        )
+
+    async def complete(
+        self,
+        prompt: str,
+        provider: str | None = None,
+        system_prompt: str | None = None,
+        model_settings: ModelSettings | None = None,
+    ) -> str:
+        """Send a single request straight to the model, bypassing Agent"""
+        provider = provider or self._config_manager.get_ai_provider()
+        model = self._get_model(provider)
+        settings = self._request_settings(provider, prompt, model_settings)
+        
+        parts: list[ModelRequestPart] = []
+        if system_prompt:
+            parts.append(SystemPromptPart(content=system_prompt))
+        parts.append(UserPromptPart(content=prompt))
+        messages: list[ModelMessage] = [ModelRequest(parts=parts)]
+        
+        async def request() -> tuple[str, TokenUsage]:
+            response = await model_request(model, messages, model_settings=settings)
+            output = "".join(
+                part.content for part in response.parts if isinstance(part, TextPart)
+            )
+            usage = TokenUsage.from_usage(response.usage)
+            check_truncation(
+                output, usage, settings.get("max_tokens"), _finish_reason(response)
+            )
+            return output, usage
+        
+        return await self._with_retries(
+            provider, estimate_tokens(prompt + (system_prompt or "")), request
+        )
+
+    async def _complete_with_ollama(
+        self,
+        prompt: str,
+        system_prompt: str | None = None,
+        model_settings: ModelSettings | None = None,
+    ) -> str:
+        """Request through Ollama's native chat API
+
+        Unlike the OpenAI-compatible endpoint it accepts num_ctx and
+        keep_alive, so the model stays loaded with the context it was warmed
+        up with.
+        """
+        config = self._config_manager.get_ai_config("ollama")
+        settings = self._request_settings("ollama", prompt, model_settings)
+        messages = [{"role": "user", "content": prompt}]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+        payload = {
+            "model": config["model"],
+            "messages": messages,
+            "stream": False,
+            "keep_alive": config["keep_alive"],
+            "options": self._ollama_options(settings),
+        }
+        
+        async def request() -> tuple[str, TokenUsage]:
+            response = await self.http_client.post(
+                self._ollama_url("/api/chat"),
+                json=payload,
+                timeout=settings.get("timeout", config["timeout"]),
+            )
+            response.raise_for_status()
+            data = response.json()
+            output = data.get("message", {}).get("content", "")
+            usage = TokenUsage(
+                input_tokens=data.get("prompt_eval_count", 0),
+                output_tokens=data.get("eval_count", 0),
+            )
+            check_truncation(output, usage, settings.get("max_tokens"), data.get("done_reason"))
+            return output, usage
+        
+        return await self._with_retries(
+            "ollama", estimate_tokens(prompt + (system_prompt or "")), request
+        )
+
+    async def stream_prompt(
+        self,
+        prompt: str,
+        provider: str | None = None,
+        system_prompt: str | None = None,
+        **kwargs: Any
+    ) -> AsyncIterator[str]:
+        """Yield response text as it is generated"""
+        provider = provider or self._config_manager.get_ai_provider()
+        agent = self.create_agent(provider, system_prompt, **kwargs)
+        estimated_tokens = estimate_tokens(prompt + (system_prompt or ""))
+        
+        attempt = 1
+        queue_wait = 0.0
+        while True:
+            wait, probe = await self._before_attempt(provider, estimated_tokens)
+            queue_wait += wait
+            started = time.monotonic()
+            emitted = False
+            try:
+                async with self._request_slot(provider):
+                    queue_wait += time.monotonic() - started
+                    started = time.monotonic()
+                    async with agent.run_stream(prompt) as result:
+                        async for delta in result.stream_text(delta=True):
+                            emitted = True
+                            yield delta
+                        usage = TokenUsage.from_usage(result.usage())
+            except Exception as e:
+                if emitted:
+                    # Text already went out, so a retry would duplicate it
+                    if is_outage_error(e):
+                        self._get_circuit_breaker(provider).record_failure()
+                    self._record_call(
+                        provider, "error", None, time.monotonic() - started, queue_wait, attempt
+                    )
+                    raise AIClientError(f"AI stream interrupted: {str(e)}") from e
+                try:
+                    await self._after_failure(provider, e, attempt)
+                except AIClientError:
+                    self._record_call(
+                        provider, "error", None, time.monotonic() - started, queue_wait, attempt
+                    )
+                    raise
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled or closed by the consumer before an outcome was recorded
+                if probe:
+                    self._get_circuit_breaker(provider).release_probe()
+                raise
+            
+            self._get_circuit_breaker(provider).record_success()
+            self._record_call(
+                provider, "ok", usage, time.monotonic() - started, queue_wait, attempt
+            )
+            return
+
+    async def probe(self, provider: str) -> tuple[float, float | None]:
+        """Send one tiny streamed request, without retries or rate limiting
+
+        Returns the round trip and the time to the first token, in seconds.
+        """
+        started = time.monotonic()
+        first_token: float | None = None
+        async for _ in self._probe_stream(provider):
+            if first_token is None:
+                first_token = time.monotonic() - started
+        return time.monotonic() - started, first_token
+
+    async def _probe_stream(self, provider: str) -> AsyncIterator[str]:
+        prompt = "Reply with the single word: ok"
+        if provider == "ollama" and self._config_manager.get_ai_config(provider).get("native_api"):
+            config = self._config_manager.get_ai_config(provider)
+            options = self._ollama_options()
+            options["num_predict"] = 8
+            async with self.http_client.stream(
+                "POST",
+                self._ollama_url("/api/chat"),
+                json={
+                    "model": config["model"],
+                    "messages": [{"role": "user", "content": prompt}],
+                    "keep_alive": config["keep_alive"],
+                    "options": options,
+                },
+                timeout=config["timeout"],
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        yield json.loads(line).get("message", {}).get("content", "")
+            return
+        
+        agent = self.create_agent(provider)
+        async with agent.run_stream(prompt, model_settings={"max_tokens": 8}) as result:
+            async for delta in result.stream_text(delta=True):
+                yield delta
+
+    def get_request_stats(self) -> dict[str, int]:
+        return {
+            "prompt_requests": self.prompt_requests,
+            "coalesced_requests": self.coalesced_requests,
+            "hedged_requests": self.hedged_requests,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+        }
+
+    def get_model_info(self, provider: str | None = None) -> dict[str, Any]:
+        provider = provider or self._config_manager.get_ai_provider()
+        config = self._config_manager.get_ai_config(provider)
+        return {
+            "provider": provider,
+            "model": config["model"],
+            "temperature": config.get("temperature"),
+        }
+
+    def get_chunk_token_budget(self, provider: str | None = None) -> int:
+        """Tokens of source text per chunk that fit the provider's context and output limits"""
+        config = self._config_manager.get_ai_config(provider)
+        return chunk_token_budget(
+            config.get("num_ctx") or config["context_window"], config["max_tokens"]
+        )
 
     def get_available_providers(self) -> list[str]:
-        return ["gemini", "ollama", "anthropic"]
+        return ["gemini", "ollama", "anthropic", "stub"]
 
     def test_provider(self, provider: str) -> bool:
         try:
@@ -116,17 +1071,181 @@ class AIClient:
             return False
 
 
+class MarkdownStreamCleaner:
+    """Incremental version of DocumentProcessor._clean_markdown_response
+
+    Unlike the batch version, an opening fence is dropped before we know
+    whether the matching closing fence will arrive.
+    """
+
+    _FENCES = ("```markdown\n", "```\n")
+    _CLOSING_FENCE = "\n```"
+
+    def __init__(self) -> None:
+        self._head = ""
+        self._started = False
+        self._fenced = False
+        self._pending = ""
+
+    def feed(self, text: str) -> str:
+        if not self._started:
+            self._head += text
+            head = self._head.lstrip()
+            # Wait until we know whether the response opens with a code fence
+            if not head or any(len(head) < len(f) and f.startswith(head) for f in self._FENCES):
+                return ""
+            self._started = True
+            for fence in self._FENCES:
+                if head.startswith(fence):
+                    self._fenced = True
+                    head = head[len(fence):].lstrip()
+                    break
+            text = head
+        
+        buffer = self._pending + text
+        keep = len(buffer.rstrip())
+        if self._fenced:
+            body = buffer[:keep]
+            # Hold back anything that could still turn into the closing fence
+            for size in range(len(self._CLOSING_FENCE), 0, -1):
+                if body.endswith(self._CLOSING_FENCE[:size]):
+                    keep = len(body[:-size].rstrip())
+                    break
+        
+        self._pending = buffer[keep:]
+        return buffer[:keep]
+
+    def finish(self) -> str:
+        if not self._started:
+            return self._head.strip()
+        
+        tail = self._pending.rstrip()
+        if self._fenced and tail.endswith(self._CLOSING_FENCE):
+            tail = tail[:-len(self._CLOSING_FENCE)]
+        return tail.rstrip()
+
+
 class DocumentProcessor:
-    def __init__(self, ai_client: AIClient) -> None:
+    DOCUMENT_SYSTEM_PROMPT = """You are an expert document converter specialized in converting various document formats to clean, well-structured Markdown. 
+        
+        Focus on:
+        - Accurate content preservation
+        - Proper Markdown syntax
+        - Clean, readable output
+        - Maintaining document structure and hierarchy
+        """
+
+    CHUNK_SYSTEM_PROMPT = "You are converting part of a larger document to Markdown. Maintain consistency with document structure."
+
+    PACK_SYSTEM_PROMPT = "You are converting several short, unrelated documents to Markdown in one pass. Convert each document on its own."
+
+    CONTENT_MARKER = "Document content:\n"
+
+    def __init__(
+        self,
+        ai_client: AIClient,
+        cache: ResponseCache | None = None,
+        router: ChunkRouter | None = None,
+    ) -> None:
         self.ai_client = ai_client
+        self.cache = cache
+        self.router = router
+        self.cache_hits = 0
+
+    def cache_key(
+        self,
+        prompt: str,
+        provider: str | None = None,
+        system_prompt: str | None = None,
+        **kwargs: Any
+    ) -> str:
+        info = self.ai_client.get_model_info(provider)
+        return make_cache_key(
+            prompt,
+            system_prompt,
+            info["provider"],
+            info["model"],
+            info["temperature"],
+            extra=kwargs,
+        )
+
+    def _record_cache_hit(self, provider: str | None) -> None:
+        self.cache_hits += 1
+        info = self.ai_client.get_model_info(provider)
+        self.ai_client.metrics.record(info["provider"], info["model"], "cached")
+
+    def _route(self, prompt: str, provider: str | None) -> str | None:
+        """Pick a provider for the chunk in prompt unless the caller chose one"""
+        if self.router is None or provider is not None:
+            return provider
+        return self.router.route(prompt.split(self.CONTENT_MARKER, 1)[-1])[1]
+
+    async def _run_prompt(
+        self,
+        prompt: str,
+        provider: str | None = None,
+        system_prompt: str | None = None,
+        **kwargs: Any
+    ) -> str:
+        provider = self._route(prompt, provider)
+        if self.cache is None:
+            return await self.ai_client.run_prompt(
+                prompt=prompt, provider=provider, system_prompt=system_prompt, **kwargs
+            )
+
+        key = self.cache_key(prompt, provider, system_prompt, **kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._record_cache_hit(provider)
+            return cached
+
+        result = await self.ai_client.run_prompt(
+            prompt=prompt, provider=provider, system_prompt=system_prompt, **kwargs
+        )
+        self.cache.put(key, result)
+        return result
+
+    async def _stream_prompt(
+        self,
+        prompt: str,
+        provider: str | None = None,
+        system_prompt: str | None = None,
+        **kwargs: Any
+    ) -> AsyncIterator[str]:
+        provider = self._route(prompt, provider)
+        key = None
+        if self.cache is not None:
+            key = self.cache_key(prompt, provider, system_prompt, **kwargs)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._record_cache_hit(provider)
+                yield cached
+                return
+        
+        parts = []
+        async for delta in self.ai_client.stream_prompt(
+            prompt=prompt, provider=provider, system_prompt=system_prompt, **kwargs
+        ):
+            parts.append(delta)
+            yield delta
+        
+        if self.cache is not None and key is not None:
+            self.cache.put(key, "".join(parts))
     
-    def _create_conversion_prompt(
-        self, 
-        content: str, 
+    def _create_system_prompt(
+        self,
+        role: str,
         style: str = "technical",
         preserve_formatting: bool = True
     ) -> str:
-        base_prompt = f"""Convert the following document content to clean, well-structured Markdown format.
+        """Role and conversion instructions, identical for every chunk of a run
+
+        Keeping everything that doesn't depend on the document in the system
+        prompt gives each request a stable prefix the provider can cache.
+        """
+        return f"""{role.strip()}
+
+Convert the document content you are given to clean, well-structured Markdown format.
 
 Requirements:
 - Maintain document structure and hierarchy
@@ -136,12 +1255,28 @@ Requirements:
 - Remove any unnecessary whitespace or formatting artifacts
 - Ensure proper code block formatting if code is present
 
-Document content:
-{content}
-
 Please provide only the converted Markdown content without any additional explanation."""
 
-        return base_prompt
+    def _create_conversion_prompt(self, content: str) -> str:
+        return f"{self.CONTENT_MARKER}{content}"
+
+    def _create_chunk_prompt(self, chunk: str, index: int) -> str:
+        # No total: it isn't known while a document is still being read, and
+        # every path must build the same prompt for a chunk to share its
+        # cache entry
+        return (
+            f"This is part {index+1} of a larger document.\n\n"
+            + self._create_conversion_prompt(chunk)
+        )
+
+    def _create_packed_prompt(self, documents: list[str], nonce: str) -> str:
+        return (
+            f"The content below holds {len(documents)} separate documents, each "
+            f"starting with a marker line such as `{pack_marker(nonce, 1)}`. "
+            "Copy every marker line unchanged onto its own line, followed by the "
+            "Markdown for that document only.\n\n"
+            + self._create_conversion_prompt(build_packed_content(documents, nonce))
+        )
 
     def _clean_markdown_response(self, content: str) -> str:
         """Remove markdown code block wrappers that AI models sometimes add."""
@@ -163,57 +1298,285 @@ Please provide only the converted Markdown content without any additional explan
         preserve_formatting: bool = True,
         **kwargs: Any
     ) -> str:
-        prompt = self._create_conversion_prompt(content, style, preserve_formatting)
-        
-        system_prompt = """You are an expert document converter specialized in converting various document formats to clean, well-structured Markdown. 
-        
-        Focus on:
-        - Accurate content preservation
-        - Proper Markdown syntax
-        - Clean, readable output
-        - Maintaining document structure and hierarchy
-        """
-        
-        result = await self.ai_client.run_prompt(
-            prompt=prompt,
-            provider=provider,
-            system_prompt=system_prompt,
+        return await self._convert_splitting(
+            content,
+            self._create_conversion_prompt,
+            provider,
+            self._create_system_prompt(self.DOCUMENT_SYSTEM_PROMPT, style, preserve_formatting),
             **kwargs
         )
-        
+
+    async def _convert_splitting(
+        self,
+        text: str,
+        make_prompt: Callable[[str], str],
+        provider: str | None = None,
+        system_prompt: str | None = None,
+        **kwargs: Any
+    ) -> str:
+        """Convert text, splitting it in two whenever the response is cut off"""
+        try:
+            result = await self._run_prompt(
+                prompt=make_prompt(text), provider=provider, system_prompt=system_prompt, **kwargs
+            )
+        except TruncatedResponseError as e:
+            halves = split_in_half(text)
+            if halves is None:
+                return self._clean_markdown_response(e.output)
+            parts = await asyncio.gather(*(
+                self._convert_splitting(half, make_prompt, provider, system_prompt, **kwargs)
+                for half in halves
+            ))
+            return "\n\n".join(parts)
         return self._clean_markdown_response(result)
 
-    def chunk_content(self, content: str, chunk_size: int = 4000) -> list[str]:
-        if len(content) <= chunk_size:
-            return [content]
+    async def convert_packed(
+        self,
+        documents: list[str],
+        provider: str | None = None,
+        style: str = "technical",
+        preserve_formatting: bool = True,
+        **kwargs: Any
+    ) -> list[str] | None:
+        """Convert several small documents in one request
+
+        Returns None when the response can't be split back into one Markdown
+        document per input, so the caller can convert them one at a time.
+        """
+        nonce = pack_nonce(documents)
+        prompt = self._create_packed_prompt(documents, nonce)
+        system_prompt = self._create_system_prompt(
+            self.PACK_SYSTEM_PROMPT, style, preserve_formatting
+        )
+        provider = self._route(prompt, provider)
         
-        chunks = []
-        current_pos = 0
+        key = None
+        cached = None
+        if self.cache is not None:
+            key = self.cache_key(prompt, provider, system_prompt, **kwargs)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._record_cache_hit(provider)
         
-        while current_pos < len(content):
-            # Find a good break point (prefer paragraph breaks)
-            end_pos = min(current_pos + chunk_size, len(content))
-            
-            if end_pos < len(content):
-                # Look for paragraph break
-                for i in range(end_pos, max(current_pos + chunk_size // 2, end_pos - 200), -1):
-                    if content[i:i+2] == "\n\n":
-                        end_pos = i + 2
-                        break
-                else:
-                    # Look for sentence break
-                    for i in range(end_pos, max(current_pos + chunk_size // 2, end_pos - 100), -1):
-                        if content[i] in ".!?":
-                            end_pos = i + 1
-                            break
-            
-            chunk = content[current_pos:end_pos].strip()
-            if chunk:
-                chunks.append(chunk)
-            
-            current_pos = end_pos
+        result = cached
+        if result is None:
+            result = await self.ai_client.run_prompt(
+                prompt=prompt, provider=provider, system_prompt=system_prompt, **kwargs
+            )
+        sections = split_packed_response(
+            self._clean_markdown_response(result), nonce, len(documents)
+        )
+        if sections is None:
+            return None
+        # Only responses that split cleanly are worth keeping
+        if cached is None and self.cache is not None and key is not None:
+            self.cache.put(key, result)
+        return [self._clean_markdown_response(section) for section in sections]
+
+    def build_requests(
+        self,
+        content: str,
+        chunk_size: int = 4000,
+        style: str = "technical",
+        preserve_formatting: bool = True,
+        chunk_tokens: int | None = None,
+        structured: bool = False,
+    ) -> list[tuple[str, str]]:
+        """(prompt, system prompt) pairs that convert content, in document order"""
+        chunks = self._split_content(content, chunk_size, chunk_tokens, structured)
         
-        return chunks
+        if len(chunks) == 1:
+            return [(
+                self._create_conversion_prompt(content),
+                self._create_system_prompt(
+                    self.DOCUMENT_SYSTEM_PROMPT, style, preserve_formatting
+                ),
+            )]
+        system_prompt = self._create_system_prompt(
+            self.CHUNK_SYSTEM_PROMPT, style, preserve_formatting
+        )
+        return [
+            (self._create_chunk_prompt(chunk, i), system_prompt)
+            for i, chunk in enumerate(chunks)
+        ]
+
+    def combine_results(self, results: list[str]) -> str:
+        """Join raw model responses for consecutive chunks into one document"""
+        return "\n\n---\n\n".join(self._clean_markdown_response(r) for r in results)
+
+    def split_request(self, prompt: str) -> list[str] | None:
+        """Prompts for the two halves of a request whose response was cut off,
+        or None when its content is too short to split"""
+        head, _, content = prompt.partition(self.CONTENT_MARKER)
+        halves = split_in_half(content)
+        if halves is None:
+            return None
+        return [f"{head}{self.CONTENT_MARKER}{half}" for half in halves]
+
+    def join_halves(self, results: list[str]) -> str:
+        """Join the raw responses for the halves of a split request"""
+        return "\n\n".join(self._clean_markdown_response(r) for r in results)
+
+    def _split_content(
+        self,
+        content: str,
+        chunk_size: int = 4000,
+        chunk_tokens: int | None = None,
+        structured: bool = False,
+    ) -> list[str]:
+        """Chunks by token budget, optionally keeping Markdown blocks whole,
+        or by characters when there is no budget"""
+        chunker = self.make_chunker(chunk_size, chunk_tokens, structured)
+        return list(iter_chunks([content], chunker)) or [content]
+
+    def chunk_content(self, content: str, chunk_size: int = 4000) -> list[str]:
+        return chunk_by_chars(content, chunk_size)
+
+    def make_chunker(
+        self,
+        chunk_size: int = 4000,
+        chunk_tokens: int | None = None,
+        structured: bool = False,
+        anchored: bool = False,
+    ) -> IncrementalChunker:
+        """The chunker behind every conversion path, so a document gives the
+        same chunks, and prompts, whether it is converted whole, streamed
+        block by block or batched; anchored=True cuts at content-defined
+        anchors instead"""
+        split: Callable[[str], list[str]]
+        finish_split: Callable[[str], list[str]] | None = None
+        if anchored:
+            split = partial(chunk_by_anchors, max_tokens=chunk_tokens or max(1, chunk_size // 4))
+        elif chunk_tokens:
+            chunk = chunk_by_structure if structured else chunk_by_tokens
+            # Full chunks mid-document; only the final window is balanced
+            split = partial(chunk, max_tokens=chunk_tokens, balanced=False)
+            finish_split = partial(chunk, max_tokens=chunk_tokens)
+        else:
+            split = partial(self.chunk_content, chunk_size=chunk_size)
+
+        # Two chunks' worth of buffer leaves every released chunk a full budget
+        if chunk_tokens:
+            return IncrementalChunker(split, 2 * chunk_tokens, estimate_tokens, finish_split)
+        return IncrementalChunker(split, 2 * chunk_size, finish_split=finish_split)
+
+    async def _reuse_or_convert(
+        self,
+        index: int,
+        chunk: str,
+        convert: Callable[[], Awaitable[str]],
+        journal: ChunkJournal | None = None,
+        store: ChunkStore | None = None,
+    ) -> str:
+        """A chunk's Markdown from the last conversion, the journal, or the model"""
+        result = store.get(chunk) if store is not None else None
+        if result is None and journal is not None:
+            result = journal.get(index, chunk)
+        if result is None:
+            result = await convert()
+            if journal is not None:
+                journal.record(index, chunk, result)
+        if store is not None:
+            store.record(index, chunk, result)
+        return result
+
+    async def process_block_stream(
+        self,
+        blocks: AsyncIterable[str],
+        provider: str | None = None,
+        chunk_size: int = 4000,
+        style: str = "technical",
+        preserve_formatting: bool = True,
+        chunk_concurrency: int = 4,
+        chunk_tokens: int | None = None,
+        structured: bool = False,
+        journal: ChunkJournal | None = None,
+        store: ChunkStore | None = None,
+        **kwargs: Any
+    ) -> str:
+        """Convert content that arrives block by block, e.g. page by page
+
+        Each chunk is sent as soon as it is cut, so requests start while the
+        document is still being read. The next block is only read once a
+        request slot is free, which bounds the text held in memory. With a
+        journal, chunks it already holds are reused and every newly
+        converted chunk is recorded in it, including those still in flight
+        when another chunk fails. With a store, chunking switches
+        to content-defined anchors and only chunks the previous conversion
+        didn't have are sent to the model.
+        """
+        chunker = self.make_chunker(chunk_size, chunk_tokens, structured, anchored=store is not None)
+
+        async def chunks() -> AsyncGenerator[str, None]:
+            async for block in blocks:
+                for chunk in chunker.feed(block):
+                    yield chunk
+            for chunk in chunker.finish():
+                yield chunk
+
+        source = chunks()
+        first = await anext(source, None)
+        if first is None:
+            return ""
+        second = await anext(source, None)
+        if second is None:
+            with request_context(chunk=0):
+                return await self._reuse_or_convert(0, first, lambda: self.convert_to_markdown(
+                    first, provider, style, preserve_formatting, **kwargs
+                ), journal, store)
+
+        system_prompt = self._create_system_prompt(
+            self.CHUNK_SYSTEM_PROMPT, style, preserve_formatting
+        )
+        semaphore = asyncio.Semaphore(max(1, chunk_concurrency))
+
+        async def convert_chunk(i: int, chunk: str, queue_wait: float) -> str:
+            try:
+                with request_context(chunk=i, queue_wait=queue_wait):
+                    return await self._reuse_or_convert(i, chunk, lambda: self._convert_splitting(
+                        chunk,
+                        lambda text: self._create_chunk_prompt(text, i),
+                        provider,
+                        system_prompt,
+                        **kwargs
+                    ), journal, store)
+            finally:
+                semaphore.release()
+
+        async def all_chunks() -> AsyncIterator[str]:
+            yield first
+            yield second
+            async for chunk in source:
+                yield chunk
+
+        tasks: list[asyncio.Future[str]] = []
+        try:
+            async for chunk in all_chunks():
+                queued = time.monotonic()
+                await semaphore.acquire()
+                # Send nothing more once a chunk has failed; gather() raises its error
+                if any(task.done() and not task.cancelled() and task.exception() for task in tasks):
+                    semaphore.release()
+                    break
+                tasks.append(asyncio.ensure_future(
+                    convert_chunk(len(tasks), chunk, time.monotonic() - queued)
+                ))
+            processed_chunks = await asyncio.gather(*tasks)
+        except Exception:
+            if journal is not None or store is not None:
+                # Chunks already sent still finish, so a rerun can reuse them
+                await asyncio.gather(*tasks, return_exceptions=True)
+            for task in tasks:
+                task.cancel()
+            raise
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            await source.aclose()
+
+        return "\n\n---\n\n".join(processed_chunks)
 
     async def process_large_content(
         self,
@@ -222,28 +1585,113 @@ Please provide only the converted Markdown content without any additional explan
         chunk_size: int = 4000,
         style: str = "technical",
         preserve_formatting: bool = True,
+        chunk_concurrency: int = 4,
+        chunk_tokens: int | None = None,
+        structured: bool = False,
+        semaphore: asyncio.Semaphore | None = None,
         **kwargs: Any
     ) -> str:
-        chunks = self.chunk_content(content, chunk_size)
+        """Convert content chunk by chunk
+
+        Pass a semaphore to share one concurrency limit between several calls.
+        """
+        chunks = self._split_content(content, chunk_size, chunk_tokens, structured)
+        semaphore = semaphore or asyncio.Semaphore(max(1, chunk_concurrency))
         
         if len(chunks) == 1:
-            return await self.convert_to_markdown(
-                content, provider, style, preserve_formatting, **kwargs
-            )
+            async with semaphore:
+                with request_context(chunk=0):
+                    return await self.convert_to_markdown(
+                        content, provider, style, preserve_formatting, **kwargs
+                    )
         
-        # Process chunks and combine results
-        processed_chunks = []
-        for i, chunk in enumerate(chunks):
-            chunk_prompt = self._create_conversion_prompt(
-                chunk, style, preserve_formatting
-            ) + f"\n\nNote: This is part {i+1} of {len(chunks)} of a larger document."
-            
-            processed_chunk = await self.ai_client.run_prompt(
-                prompt=chunk_prompt,
-                provider=provider,
-                system_prompt="You are converting part of a larger document to Markdown. Maintain consistency with document structure.",
-                **kwargs
-            )
-            processed_chunks.append(self._clean_markdown_response(processed_chunk))
+        # Chunks are independent prompts, so convert them concurrently
+        system_prompt = self._create_system_prompt(
+            self.CHUNK_SYSTEM_PROMPT, style, preserve_formatting
+        )
+        
+        async def convert_chunk(i: int, chunk: str) -> str:
+            queued = time.monotonic()
+            async with semaphore:
+                with request_context(chunk=i, queue_wait=time.monotonic() - queued):
+                    # A chunk whose answer is cut off is converted again in halves
+                    return await self._convert_splitting(
+                        chunk,
+                        lambda text: self._create_chunk_prompt(text, i),
+                        provider,
+                        system_prompt,
+                        **kwargs
+                    )
+        
+        tasks = [
+            asyncio.ensure_future(convert_chunk(i, chunk))
+            for i, chunk in enumerate(chunks)
+        ]
+        try:
+            # gather() keeps results in the original chunk order
+            processed_chunks = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        return "\n\n---\n\n".join(processed_chunks)
+
+    async def stream_large_content(
+        self,
+        content: str,
+        provider: str | None = None,
+        chunk_size: int = 4000,
+        style: str = "technical",
+        preserve_formatting: bool = True,
+        chunk_concurrency: int = 4,
+        chunk_tokens: int | None = None,
+        structured: bool = False,
+        **kwargs: Any
+    ) -> AsyncIterator[str]:
+        """Yield converted Markdown in document order as the model produces it"""
+        requests = self.build_requests(
+            content, chunk_size, style, preserve_formatting, chunk_tokens, structured
+        )
         
-        return "\n\n---\n\n".join(processed_chunks)
\ No newline at end of file
+        # Every chunk streams concurrently into its own queue; the head chunk's
+        # text is passed straight through while later chunks are buffered
+        semaphore = asyncio.Semaphore(max(1, chunk_concurrency))
+        queues: list[asyncio.Queue[str | None]] = [asyncio.Queue() for _ in requests]
+        
+        async def stream_chunk(i: int, prompt: str, system_prompt: str) -> None:
+            cleaner = MarkdownStreamCleaner()
+            queued = time.monotonic()
+            try:
+                async with semaphore:
+                    with request_context(chunk=i, queue_wait=time.monotonic() - queued):
+                        async for delta in self._stream_prompt(
+                            prompt=prompt,
+                            provider=provider,
+                            system_prompt=system_prompt,
+                            **kwargs
+                        ):
+                            text = cleaner.feed(delta)
+                            if text:
+                                queues[i].put_nowait(text)
+                text = cleaner.finish()
+                if text:
+                    queues[i].put_nowait(text)
+            finally:
+                queues[i].put_nowait(None)
+        
+        tasks = [
+            asyncio.ensure_future(stream_chunk(i, prompt, system_prompt))
+            for i, (prompt, system_prompt) in enumerate(requests)
+        ]
+        try:
+            for i, queue in enumerate(queues):
+                if i > 0:
+                    yield "\n\n---\n\n"
+                while (text := await queue.get()) is not None:
+                    yield text
+                # Surface the chunk's error, if any, once its queue is drained
+                await tasks[i]
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .config import ConfigManager
+
+
+class ResponseCacheError(Exception):
+    pass
+
+
+@dataclass
+class CacheStats:
+    path: Path
+    entries: int
+    total_bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def make_cache_key(
+    prompt: str,
+    system_prompt: str | None,
+    provider: str,
+    model: str,
+    temperature: float | None,
+    extra: dict[str, Any] | None = None,
+) -> str:
+    """Build a content address for a single model request"""
+    payload = json.dumps(
+        {
+            "prompt": prompt,
+            "system_prompt": system_prompt or "",
+            "provider": provider,
+            "model": model,
+            "temperature": temperature,
+            "extra": extra or {},
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Persistent, size-bounded LRU cache of model responses backed by SQLite"""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            compressed INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        max_size_mb: float = 512,
+        compress: bool = True,
+    ) -> None:
+        self.path = Path(path)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.compress = compress
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(self.path, timeout=30)
+                self._conn.executescript(self._SCHEMA)
+            except sqlite3.Error as e:
+                raise ResponseCacheError(f"Failed to open cache at {self.path}: {e}") from e
+        return self._conn
+
+    def _bump(self, conn: sqlite3.Connection, name: str) -> None:
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key: str) -> str | None:
+        conn = self._connect()
+        with conn:
+            row = conn.execute(
+                "SELECT value, compressed FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._bump(conn, "misses")
+                return None
+
+            conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self._bump(conn, "hits")
+
+        value, compressed = row
+        data = zlib.decompress(value) if compressed else value
+        return bytes(data).decode("utf-8")
+
+    def put(self, key: str, value: str) -> None:
+        data = value.encode("utf-8")
+        compressed = False
+        if self.compress:
+            packed = zlib.compress(data, 6)
+            if len(packed) < len(data):
+                data, compressed = packed, True
+
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, value, compressed, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, data, int(compressed), len(data), now, now),
+            )
+        self.prune()
+
+    def prune(
+        self,
+        max_bytes: int | None = None,
+        older_than: float | None = None,
+    ) -> int:
+        """Evict least recently used entries until the cache fits in max_bytes"""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        conn = self._connect()
+        removed = 0
+
+        with conn:
+            if older_than is not None:
+                cursor = conn.execute(
+                    "DELETE FROM responses WHERE accessed_at < ?",
+                    (time.time() - older_than,),
+                )
+                removed += cursor.rowcount
+
+            total = self._total_bytes(conn)
+            if total <= limit:
+                return removed
+
+            # Evict down to 90% of the limit so we don't prune on every write
+            target = int(limit * 0.9)
+            rows = conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+            )
+            evict = []
+            for key, size in rows:
+                if total <= target:
+                    break
+                evict.append((key,))
+                total -= size
+
+            conn.executemany("DELETE FROM responses WHERE key = ?", evict)
+            removed += len(evict)
+
+        return removed
+
+    def clear(self) -> int:
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute("DELETE FROM responses")
+            conn.execute("DELETE FROM counters")
+        conn.execute("VACUUM")
+        return cursor.rowcount
+
+    def stats(self) -> CacheStats:
+        conn = self._connect()
+        entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        return CacheStats(
+            path=self.path,
+            entries=entries,
+            total_bytes=self._total_bytes(conn),
+            max_bytes=self.max_bytes,
+            hits=counters.get("hits", 0),
+            misses=counters.get("misses", 0),
+        )
+
+    def _total_bytes(self, conn: sqlite3.Connection) -> int:
+        return int(conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0])
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def open_response_cache(config_manager: ConfigManager) -> ResponseCache:
+    """Open the response cache described by the global configuration"""
+    cache_config = config_manager.load_config().cache
+    return ResponseCache(
+        config_manager.get_cache_dir() / "responses.db",
+        max_size_mb=cache_config.max_size_mb,
+        compress=cache_config.compress,
+    )
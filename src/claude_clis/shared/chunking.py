@@ -0,0 +1,493 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+
+from .tokens import estimate_tokens
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?。！？])")
+_HEADING_LINE_RE = re.compile(r"#{1,6} ")
+_LEADING_BLANK_LINES_RE = re.compile(r"\A\s*\n")
+
+
+def _split_oversized(text: str, max_tokens: int) -> list[str]:
+    """Split a single paragraph that exceeds the budget by sentences, then by length"""
+    pieces: list[str] = []
+    current = ""
+    current_tokens = 0
+    for sentence in _SENTENCE_RE.split(text):
+        tokens = estimate_tokens(sentence)
+        if tokens > max_tokens:
+            # No usable boundary: cut by the sentence's own characters-per-token ratio
+            step = max(1, len(sentence) * max_tokens // tokens)
+            parts = [sentence[i:i + step] for i in range(0, len(sentence), step)]
+        else:
+            parts = [sentence]
+
+        for part in parts:
+            part_tokens = estimate_tokens(part) if len(parts) > 1 else tokens
+            if current and current_tokens + part_tokens > max_tokens:
+                pieces.append(current.strip())
+                current, current_tokens = "", 0
+            current += part
+            current_tokens += part_tokens
+    if current.strip():
+        pieces.append(current.strip())
+    return pieces
+
+
+def _count_chunks(tokens: list[int], target: int) -> int:
+    """Chunks made by closing each one before the paragraph that would pass target"""
+    count, current = 1, 0
+    for size in tokens:
+        if current and current + size > target:
+            count, current = count + 1, 0
+        current += size
+    return count
+
+
+def _balanced_target(tokens: list[int], max_tokens: int) -> int:
+    """Smallest target that still packs the paragraphs into as few chunks
+    as filling each to max_tokens would"""
+    fewest = _count_chunks(tokens, max_tokens)
+    low, high = math.ceil(sum(tokens) / fewest), max_tokens
+    while low < high:
+        middle = (low + high) // 2
+        if _count_chunks(tokens, middle) <= fewest:
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+def chunk_by_tokens(content: str, max_tokens: int, balanced: bool = True) -> list[str]:
+    """Pack paragraphs into chunks of at most max_tokens estimated tokens
+
+    A chunk ends before the paragraph that would take it past the target.
+    The target is the smallest that needs no more chunks than the budget
+    does, so the text is spread evenly and the last request isn't a tiny
+    remainder; with balanced=False it is the budget itself.
+    """
+    total = estimate_tokens(content)
+    if total <= max_tokens:
+        return [content.strip()] if content.strip() else []
+
+    paragraphs = _paragraph_pieces(content, max_tokens)
+    target = max_tokens
+    if balanced:
+        target = _balanced_target([tokens for _, tokens in paragraphs], max_tokens)
+
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    for paragraph, tokens in paragraphs:
+        if current and current_tokens + tokens > target:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(paragraph)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+
+    return chunks
+
+
+def _paragraph_pieces(content: str, max_tokens: int) -> list[tuple[str, int]]:
+    pieces: list[tuple[str, int]] = []
+    for paragraph in _PARAGRAPH_RE.split(content):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = estimate_tokens(paragraph)
+        if tokens > max_tokens:
+            pieces.extend(
+                (piece, estimate_tokens(piece))
+                for piece in _split_oversized(paragraph, max_tokens)
+            )
+        else:
+            pieces.append((paragraph, tokens))
+    return pieces
+
+
+def _is_anchor(paragraph: str, tokens: int, spread: int) -> bool:
+    """Whether a chunk may end after this paragraph, decided by its text alone
+
+    The chance grows with the paragraph's length so that chunks average
+    about spread tokens past the minimum, whatever the paragraph sizes.
+    """
+    digest = hashlib.blake2b(paragraph.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") * spread < tokens << 64
+
+
+def chunk_by_anchors(content: str, max_tokens: int) -> list[str]:
+    """Pack paragraphs into chunks whose boundaries depend only on nearby text
+
+    A chunk ends after a paragraph whose hash marks it as an anchor, once
+    the chunk holds a quarter of the budget, or when the next paragraph
+    would overflow the budget. Since anchors come from the paragraphs'
+    own content, an edit changes the chunk it falls in, and at most the
+    next few, while every chunk after the following anchor stays the same.
+    """
+    min_tokens = max_tokens // 4
+    spread = max(1, max_tokens // 2)
+
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    for paragraph, tokens in _paragraph_pieces(content, max_tokens):
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(paragraph)
+        current_tokens += tokens
+        if current_tokens >= min_tokens and _is_anchor(paragraph, tokens, spread):
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def split_in_half(text: str, min_chars: int = 200) -> tuple[str, str] | None:
+    """Split text in two at the boundary nearest its middle
+
+    Paragraph breaks are preferred over line breaks, then sentence ends, then
+    spaces. Returns None for text too short to be worth splitting.
+    """
+    text = text.strip()
+    if len(text) < min_chars:
+        return None
+
+    middle = len(text) // 2
+    for pattern in (_PARAGRAPH_RE, re.compile(r"\n"), _SENTENCE_RE, re.compile(r" ")):
+        cuts = [m.end() for m in pattern.finditer(text) if 0 < m.end() < len(text)]
+        # Only accept a boundary that leaves both halves a fair share
+        cuts = [cut for cut in cuts if len(text) // 4 <= cut <= len(text) * 3 // 4]
+        if cuts:
+            cut = min(cuts, key=lambda c: abs(c - middle))
+            return text[:cut].strip(), text[cut:].strip()
+    return text[:middle], text[middle:]
+
+
+def _last_paragraph_end(content: str, low: int, high: int) -> int | None:
+    """Largest offset in (low, high] just after a blank line or before a heading"""
+    blank = content.rfind("\n\n", low - 1, high)
+    best = blank + 2 if blank >= 0 else None
+
+    end = high + 1
+    while (newline := content.rfind("\n#", low, end)) >= 0:
+        if best is not None and newline + 1 <= best:
+            break
+        if _HEADING_LINE_RE.match(content, newline + 1):
+            return newline + 1
+        end = newline + 1
+    return best
+
+
+def _last_sentence_end(content: str, low: int, high: int) -> int | None:
+    """Largest offset in (low, high] just after a sentence-ending mark"""
+    found = max(content.rfind(mark, low, high) for mark in ".!?")
+    return found + 1 if found >= 0 else None
+
+
+def chunk_by_chars(content: str, chunk_size: int = 4000) -> list[str]:
+    """Split content into chunks of about chunk_size characters
+
+    Each chunk ends at the last paragraph break or heading in its final 200
+    characters, else the last sentence end in its final 100, else at
+    chunk_size; a boundary is never taken from the first half of the chunk.
+    Boundaries are found with str.rfind over those windows only, so the
+    work per chunk is bounded and runs in C.
+    """
+    if len(content) <= chunk_size:
+        return [content]
+
+    chunks = []
+    position = 0
+    while position < len(content):
+        end = min(position + chunk_size, len(content))
+        if end < len(content):
+            half = position + chunk_size // 2
+            cut = _last_paragraph_end(content, max(half, end - 200) + 2, end + 2)
+            if cut is None:
+                cut = _last_sentence_end(content, max(half, end - 100) + 1, end + 1)
+            if cut is not None:
+                end = cut
+
+        chunk = content[position:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        position = end
+    return chunks
+
+
+_FENCE_RE = re.compile(r"\s*(`{3,}|~{3,})")
+_LIST_ITEM_RE = re.compile(r"\s*(?:[-*+•]|\d+[.)])\s+\S")
+_TABLE_SEPARATOR_RE = re.compile(r"\|?\s*:?-{3,}:?\s*(?:\|\s*:?-{3,}:?\s*)*\|?")
+# pymupdf4llm separates pages with a horizontal rule
+_PAGE_BREAK_RE = re.compile(r"-{3,}|\*{3,}|_{3,}")
+_PAGE_HEADING_RE = re.compile(r"#{1,6} Page \d+\s*$")
+
+
+@dataclass
+class StructureBlock:
+    kind: str  # "heading", "page", "code", "table", "list" or "paragraph"
+    text: str
+
+
+def _is_list_continuation(line: str) -> bool:
+    return bool(_LIST_ITEM_RE.match(line)) or (line[:1] in (" ", "\t") and bool(line.strip()))
+
+
+def parse_blocks(content: str) -> list[StructureBlock]:
+    """Split reader output into the Markdown blocks a chunk must not cut"""
+    lines = content.splitlines()
+    blocks: list[StructureBlock] = []
+    paragraph: list[str] = []
+
+    def flush() -> None:
+        if paragraph:
+            blocks.append(StructureBlock("paragraph", "\n".join(paragraph)))
+            paragraph.clear()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+        if not stripped:
+            flush()
+            i += 1
+            continue
+
+        end = i + 1
+        if fence := _FENCE_RE.match(line):
+            # An unclosed fence runs to the end of the document
+            marker = fence.group(1)
+            while end < len(lines) and not lines[end].lstrip().startswith(marker):
+                end += 1
+            kind, end = "code", min(end + 1, len(lines))
+        elif stripped.startswith("|"):
+            while end < len(lines) and lines[end].lstrip().startswith("|"):
+                end += 1
+            kind = "table"
+        elif _HEADING_LINE_RE.match(line.lstrip()):
+            kind = "page" if _PAGE_HEADING_RE.match(line.lstrip()) else "heading"
+        elif _PAGE_BREAK_RE.fullmatch(stripped):
+            kind = "page"
+        elif _LIST_ITEM_RE.match(line):
+            # Items separated by single blank lines are still one list
+            while end < len(lines):
+                if _is_list_continuation(lines[end]):
+                    end += 1
+                elif not lines[end].strip() and end + 1 < len(lines) and _is_list_continuation(lines[end + 1]):
+                    end += 1
+                else:
+                    break
+            kind = "list"
+        else:
+            paragraph.append(line)
+            i += 1
+            continue
+
+        flush()
+        blocks.append(StructureBlock(kind, "\n".join(lines[i:end]).rstrip()))
+        i = end
+    flush()
+    return blocks
+
+
+def _group_units(units: list[str], max_tokens: int, fixed_tokens: int = 0) -> list[list[str]]:
+    """Consecutive units in groups that fit max_tokens next to fixed_tokens of
+    repeated context; a unit too large on its own gets a group to itself"""
+    groups: list[list[str]] = []
+    current: list[str] = []
+    used = fixed_tokens
+    for unit in units:
+        tokens = estimate_tokens(unit) + 1
+        if current and used + tokens > max_tokens:
+            groups.append(current)
+            current, used = [], fixed_tokens
+        current.append(unit)
+        used += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _split_table(text: str, max_tokens: int) -> list[str]:
+    """Split a table into row groups, each repeating the header rows"""
+    lines = text.splitlines()
+    if len(lines) >= 2 and _TABLE_SEPARATOR_RE.fullmatch(lines[1].strip()):
+        header, rows = lines[:2], lines[2:]
+    else:
+        header, rows = lines[:1], lines[1:]
+    if not rows:
+        return _split_oversized(text, max_tokens)
+    fixed = estimate_tokens("\n".join(header)) + 1
+    return ["\n".join(header + group) for group in _group_units(rows, max_tokens, fixed)]
+
+
+def _split_code(text: str, max_tokens: int) -> list[str]:
+    """Split a fenced code block by lines, reopening the fence in every piece"""
+    lines = text.splitlines()
+    opener = lines[0]
+    fence = _FENCE_RE.match(opener)
+    if fence is None:
+        return _split_oversized(text, max_tokens)
+    marker = fence.group(1)
+    closed = len(lines) > 1 and lines[-1].lstrip().startswith(marker)
+    body = lines[1:-1] if closed else lines[1:]
+    if not body:
+        return [text]
+    closer = lines[-1] if closed else marker
+    fixed = estimate_tokens(f"{opener}\n{closer}") + 2
+    return [
+        "\n".join([opener, *group, closer])
+        for group in _group_units(body, max_tokens, fixed)
+    ]
+
+
+def _split_list(text: str, max_tokens: int) -> list[str]:
+    """Split a list between items, keeping each item with its continuation lines"""
+    items: list[list[str]] = []
+    for line in text.splitlines():
+        if items and not _LIST_ITEM_RE.match(line):
+            items[-1].append(line)
+        else:
+            items.append([line])
+    return [
+        "\n".join(group).strip()
+        for group in _group_units(["\n".join(item) for item in items], max_tokens)
+    ]
+
+
+def split_block(block: StructureBlock, max_tokens: int) -> list[str]:
+    """Pieces of a block, none larger than max_tokens where the block allows it"""
+    if estimate_tokens(block.text) <= max_tokens:
+        return [block.text]
+    if block.kind == "table":
+        return _split_table(block.text, max_tokens)
+    if block.kind == "code":
+        return _split_code(block.text, max_tokens)
+    if block.kind == "list":
+        return _split_list(block.text, max_tokens)
+    return _split_oversized(block.text, max_tokens)
+
+
+def chunk_by_structure(content: str, max_tokens: int, balanced: bool = True) -> list[str]:
+    """Pack whole Markdown blocks into chunks of at most max_tokens estimated tokens
+
+    Tables, fenced code and lists are never cut unless they alone exceed the
+    budget; then tables split into row groups that repeat the header, code
+    into fenced line groups and lists between items. Headings stay with the
+    block that follows them, and once a chunk is three quarters full it ends
+    at the next heading or page boundary rather than part way into a section.
+    Chunks share the document evenly unless balanced=False.
+    """
+    total = estimate_tokens(content)
+    if total <= max_tokens:
+        return [content.strip()] if content.strip() else []
+
+    target = math.ceil(total / math.ceil(total / max_tokens)) if balanced else max_tokens
+
+    # (text, tokens, starts a section)
+    pieces: list[tuple[str, int, bool]] = []
+    headings: list[str] = []
+    for block in parse_blocks(content):
+        if block.kind == "heading" or (block.kind == "page" and block.text.startswith("#")):
+            headings.append(block.text)
+            continue
+        if block.kind == "page":
+            pieces.append((block.text, estimate_tokens(block.text), True))
+            continue
+        for i, text in enumerate(split_block(block, max_tokens)):
+            tokens = estimate_tokens(text)
+            if i == 0 and headings:
+                prefix = "\n\n".join(headings)
+                prefix_tokens = estimate_tokens(prefix)
+                headings = []
+                if prefix_tokens + tokens <= max_tokens:
+                    pieces.append((f"{prefix}\n\n{text}", prefix_tokens + tokens + 1, True))
+                    continue
+                pieces.append((prefix, prefix_tokens, True))
+            pieces.append((text, tokens, False))
+    if headings:
+        prefix = "\n\n".join(headings)
+        pieces.append((prefix, estimate_tokens(prefix), True))
+
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    for text, tokens, section in pieces:
+        if current and (
+            current_tokens + tokens > max_tokens
+            or current_tokens >= target
+            or (section and current_tokens >= target * 3 // 4)
+        ):
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+class IncrementalChunker:
+    """Cuts chunks from text that arrives block by block
+
+    Blocks are taken apart into paragraphs, which are buffered until they
+    hold window units of text (as counted by measure) and then split; every
+    chunk but the last is released, since the last may still grow with the
+    next paragraph. What is left at the end goes through finish_split, by
+    default split. Only the paragraphs matter, not how they were grouped
+    into blocks, so a document cuts the same whether it is fed whole or a
+    page at a time. The buffer never holds much more than the window,
+    however long the document.
+    """
+
+    def __init__(
+        self,
+        split: Callable[[str], list[str]],
+        window: int,
+        measure: Callable[[str], int] = len,
+        finish_split: Callable[[str], list[str]] | None = None,
+    ) -> None:
+        self.split = split
+        self.window = window
+        self.measure = measure
+        self.finish_split = finish_split or split
+        self._pieces: list[str] = []
+        self._size = 0
+
+    def feed(self, block: str) -> list[str]:
+        chunks: list[str] = []
+        for paragraph in _PARAGRAPH_RE.split(block):
+            # Keep indentation, which can be Markdown, but no blank lines
+            paragraph = _LEADING_BLANK_LINES_RE.sub("", paragraph.rstrip())
+            if not paragraph:
+                continue
+            self._pieces.append(paragraph)
+            self._size += self.measure(paragraph)
+            if self._size >= self.window:
+                chunks.extend(self.split("\n\n".join(self._pieces)))
+                tail = chunks.pop()
+                self._pieces = [tail]
+                self._size = self.measure(tail)
+        return chunks
+
+    def finish(self) -> list[str]:
+        text = "\n\n".join(self._pieces)
+        self._pieces, self._size = [], 0
+        return [chunk for chunk in self.finish_split(text) if chunk.strip()] if text.strip() else []
+
+
+def iter_chunks(blocks: Iterable[str], chunker: IncrementalChunker) -> Iterator[str]:
+    """Chunks of the concatenated blocks, yielded as soon as each is complete"""
+    for block in blocks:
+        yield from chunker.feed(block)
+    yield from chunker.finish()
@@ -14,13 +14,31 @@ class GeminiConfig(BaseModel):
     model: str = "gemini-1.5-pro"
     temperature: float = 0.3
     max_tokens: int = 4096
+    context_window: int = 1_048_576
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    # USD per million tokens, used for cost estimates
+    input_cost_per_mtok: float = 1.25
+    output_cost_per_mtok: float = 5.0
+    cached_input_cost_per_mtok: float | None = 0.3125
 
 
 class OllamaConfig(BaseModel):
     base_url: str = "http://localhost:11434"
     model: str = "llama3.2:latest"
     temperature: float = 0.3
+    max_tokens: int = 4096
+    context_window: int = 8192
+    num_ctx: int = 0
     timeout: int = 120
+    keep_alive: str = "30m"
+    num_parallel: int = 0
+    native_api: bool = True
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    input_cost_per_mtok: float = 0.0
+    output_cost_per_mtok: float = 0.0
+    cached_input_cost_per_mtok: float | None = None
 
 
 class AnthropicConfig(BaseModel):
@@ -28,29 +46,141 @@ class AnthropicConfig(BaseModel):
     model: str = "claude-3-sonnet-20240229"
     temperature: float = 0.3
     max_tokens: int = 4096
+    context_window: int = 200_000
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    input_cost_per_mtok: float = 3.0
+    output_cost_per_mtok: float = 15.0
+    cached_input_cost_per_mtok: float | None = 0.3
+
+
+class StubConfig(BaseModel):
+    model: str = "stub"
+    temperature: float = 0.0
+    max_tokens: int = 4096
+    context_window: int = 32_768
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    latency_distribution: Literal["fixed", "uniform", "lognormal"] = "lognormal"
+    latency_mean: float = 0.5
+    latency_stddev: float = 0.25
+    tokens_per_second: float = 0.0
+    rate_limit_rate: float = 0.0
+    server_error_rate: float = 0.0
+    seed: int | None = None
+    input_cost_per_mtok: float = 0.0
+    output_cost_per_mtok: float = 0.0
+    cached_input_cost_per_mtok: float | None = None
+
+
+class HTTPConfig(BaseModel):
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = True
+    connect_timeout: float = 10.0
+    read_timeout: float = 600.0
+
+
+class RetryConfig(BaseModel):
+    max_attempts: int = 4
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+
+class CircuitBreakerConfig(BaseModel):
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+
+class HedgingConfig(BaseModel):
+    enabled: bool = False
+    quantile: float = 0.95
+    min_samples: int = 20
+    min_delay: float = 5.0
+    initial_delay: float = 60.0
+
+
+class HealthConfig(BaseModel):
+    timeout: float = 15.0
+    ttl: float = 300.0
+
+
+ProviderName = Literal["gemini", "ollama", "anthropic", "stub"]
+ChunkClass = Literal["table", "code", "noisy", "long", "prose"]
+
+
+class RoutingConfig(BaseModel):
+    enabled: bool = False
+    routes: dict[ChunkClass, ProviderName] = Field(default_factory=dict)
+    table_ratio: float = 0.3
+    code_ratio: float = 0.3
+    noise_ratio: float = 0.15
+    long_tokens: int = 3000
 
 
 class AIConfig(BaseModel):
-    provider: Literal["gemini", "ollama", "anthropic"] = "gemini"
+    provider: ProviderName = "gemini"
     gemini: GeminiConfig = Field(default_factory=GeminiConfig)
     ollama: OllamaConfig = Field(default_factory=OllamaConfig)
     anthropic: AnthropicConfig = Field(default_factory=AnthropicConfig)
+    stub: StubConfig = Field(default_factory=StubConfig)
+    fallback_providers: list[str] = Field(default_factory=list)
+    hedging: HedgingConfig = Field(default_factory=HedgingConfig)
+    health: HealthConfig = Field(default_factory=HealthConfig)
+    routing: RoutingConfig = Field(default_factory=RoutingConfig)
+    direct_requests: bool = True
+    coalesce_requests: bool = True
+    output_token_ratio: float = 2.0
+    http: HTTPConfig = Field(default_factory=HTTPConfig)
+    retry: RetryConfig = Field(default_factory=RetryConfig)
+    circuit_breaker: CircuitBreakerConfig = Field(default_factory=CircuitBreakerConfig)
+
+
+class OfflineBatchConfig(BaseModel):
+    poll_interval: float = 30.0
+    max_requests_per_job: int = 10000
+    max_attempts: int = 3
+    anthropic_base_url: str = "https://api.anthropic.com"
+    gemini_base_url: str = "https://generativelanguage.googleapis.com"
+
+
+class PackingConfig(BaseModel):
+    enabled: bool = False
+    max_tokens: int = 0
+    max_documents: int = 20
+    small_document_tokens: int = 1500
 
 
 class Doc2mdConfig(BaseModel):
     default_style: str = "technical"
+    chunking: Literal["chars", "tokens", "structure"] = "tokens"
     chunk_size: int = 4000
+    chunk_tokens: int = 0
+    chunk_concurrency: int = 4
+    hybrid: bool = False
+    hybrid_threshold: float = 0.7
     preserve_formatting: bool = True
     output_format: str = "markdown"
+    packing: PackingConfig = Field(default_factory=PackingConfig)
+    offline_batch: OfflineBatchConfig = Field(default_factory=OfflineBatchConfig)
 
 
 class ToolsConfig(BaseModel):
     doc2md: Doc2mdConfig = Field(default_factory=Doc2mdConfig)
 
 
+class CacheConfig(BaseModel):
+    enabled: bool = True
+    directory: str = ""
+    max_size_mb: int = 512
+    compress: bool = True
+
+
 class Config(BaseSettings):
     ai: AIConfig = Field(default_factory=AIConfig)
     tools: ToolsConfig = Field(default_factory=ToolsConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
 
     class Config:
         env_prefix = "CLAUDE_CLIS_"
@@ -71,6 +201,10 @@ class ConfigManager:
     def config_file(self) -> Path:
         return self._config_file
 
+    def get_cache_dir(self) -> Path:
+        directory = self.load_config().cache.directory
+        return Path(directory).expanduser() if directory else self._config_dir / "cache"
+
     def ensure_config_dir(self) -> None:
         self._config_dir.mkdir(exist_ok=True)
 
@@ -125,6 +259,8 @@ class ConfigManager:
             return config.ai.ollama.model_dump()
         elif provider == "anthropic":
             return config.ai.anthropic.model_dump()
+        elif provider == "stub":
+            return config.ai.stub.model_dump()
         else:
             raise ValueError(f"Unknown AI provider: {provider}")
 
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .ai_client import AIClient
+    from .config import ConfigManager
+
+
+@dataclass
+class HealthResult:
+    provider: str
+    configured: bool
+    reachable: bool = False
+    latency: float | None = None
+    first_token: float | None = None
+    error: str | None = None
+    checked_at: float = 0.0
+    cached: bool = False
+
+
+def config_fingerprint(config: dict[str, Any]) -> str:
+    """Identifies the provider settings a health result was measured with"""
+    payload = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class HealthCache:
+    """Recent healthy results in a JSON file, so repeated runs skip the probe"""
+
+    def __init__(self, path: Path | str, ttl: float = 300.0) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+
+    def _load(self) -> dict[str, Any]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, provider: str, fingerprint: str) -> HealthResult | None:
+        entry = self._load().get(provider)
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return None
+        try:
+            result = HealthResult(**entry["result"])
+        except (KeyError, TypeError):
+            return None
+        if time.time() - result.checked_at > self.ttl:
+            return None
+        result.cached = True
+        return result
+
+    def put(self, result: HealthResult, fingerprint: str) -> None:
+        data = self._load()
+        data[result.provider] = {"fingerprint": fingerprint, "result": asdict(result)}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Replace the file in one step so concurrent runs never read half of it
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+
+async def check_provider(ai_client: AIClient, provider: str, timeout: float = 15.0) -> HealthResult:
+    """Probe one provider with a tiny streamed request"""
+    if not ai_client.test_provider(provider):
+        return HealthResult(provider, configured=False, error="not configured", checked_at=time.time())
+    try:
+        latency, first_token = await asyncio.wait_for(ai_client.probe(provider), timeout)
+    except TimeoutError:
+        return HealthResult(
+            provider, configured=True, error=f"no answer within {timeout:g}s", checked_at=time.time()
+        )
+    except Exception as e:
+        return HealthResult(provider, configured=True, error=str(e), checked_at=time.time())
+    return HealthResult(
+        provider,
+        configured=True,
+        reachable=True,
+        latency=latency,
+        first_token=first_token,
+        checked_at=time.time(),
+    )
+
+
+async def check_providers(
+    ai_client: AIClient,
+    config_manager: ConfigManager,
+    providers: list[str],
+    refresh: bool = False,
+) -> list[HealthResult]:
+    """Check providers concurrently, reusing recent healthy results
+
+    Failures are never cached, so a provider that was down is probed again
+    on the next run.
+    """
+    health = config_manager.load_config().ai.health
+    cache = HealthCache(config_manager.config_dir / "health.json", ttl=health.ttl)
+    fingerprints = {
+        provider: config_fingerprint(config_manager.get_ai_config(provider))
+        for provider in providers
+    }
+
+    async def check(provider: str) -> HealthResult:
+        if not refresh:
+            cached = cache.get(provider, fingerprints[provider])
+            if cached is not None:
+                return cached
+        return await check_provider(ai_client, provider, health.timeout)
+
+    results = await asyncio.gather(*(check(provider) for provider in providers))
+    for result in results:
+        if result.reachable and not result.cached:
+            cache.put(result, fingerprints[result.provider])
+    return list(results)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import IO, Any
+
+
+def file_digest(path: Path | str) -> str:
+    """SHA-256 of a file's bytes, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1024 * 1024):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_digest(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:16]
+
+
+class ChunkJournal:
+    """Converted chunks of one document, appended as each completes
+
+    The first line records the input's hash and the conversion settings;
+    every later line one chunk's index, text hash and Markdown. A rerun
+    with resume=True reuses the chunks whose index and text still match,
+    provided the input and settings are unchanged. Without resume, or
+    when anything differs, the journal starts over.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        input_hash: str,
+        settings: dict[str, Any],
+        resume: bool = False,
+    ) -> None:
+        self.path = Path(path)
+        self.header = {"input": input_hash, "settings": settings}
+        self.entries: dict[int, tuple[str, str]] = self._load() if resume else {}
+        self.reused = 0
+        self._file: IO[str] | None = None
+
+    def _load(self) -> dict[int, tuple[str, str]]:
+        entries: dict[int, tuple[str, str]] = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = iter(f)
+                header = json.loads(next(lines, "null"))
+                # Normalise through JSON so tuples and lists compare equal
+                if header != json.loads(json.dumps(self.header, default=str)):
+                    return {}
+                for line in lines:
+                    try:
+                        entry = json.loads(line)
+                        entries[entry["index"]] = (entry["chunk"], entry["output"])
+                    except (ValueError, KeyError, TypeError):
+                        # A line cut short by the interruption
+                        break
+        except (OSError, ValueError):
+            return {}
+        return entries
+
+    def get(self, index: int, chunk: str) -> str | None:
+        """The recorded Markdown for this chunk, if it was converted before"""
+        entry = self.entries.get(index)
+        if entry is None or entry[0] != chunk_digest(chunk):
+            return None
+        self.reused += 1
+        return entry[1]
+
+    def record(self, index: int, chunk: str, output: str) -> None:
+        if self._file is None:
+            self._file = self._open()
+        entry = {"index": index, "chunk": chunk_digest(chunk), "output": output}
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        # Flushed per chunk so the entry survives the process being killed
+        self._file.flush()
+
+    def _open(self) -> IO[str]:
+        """Rewrite the journal with the header and the entries still valid"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(self.path, "w", encoding="utf-8")
+        f.write(json.dumps(self.header, ensure_ascii=False, default=str) + "\n")
+        for index, (digest, output) in sorted(self.entries.items()):
+            f.write(json.dumps({"index": index, "chunk": digest, "output": output}, ensure_ascii=False) + "\n")
+        return f
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self) -> None:
+        """Remove the journal once the converted document has been written"""
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+
+class ChunkStore:
+    """Chunk hashes and Markdown of a document's last conversion
+
+    Unlike the journal it survives a successful run: converting an edited
+    version with the same settings reuses the Markdown of every chunk whose
+    text hash is unchanged, wherever the chunk now sits in the document.
+    """
+
+    def __init__(self, path: Path | str, settings: dict[str, Any]) -> None:
+        self.path = Path(path)
+        self.settings = json.loads(json.dumps(settings, default=str))
+        self.previous = self._load()
+        self.chunks: dict[int, tuple[str, str]] = {}
+        self.reused = 0
+
+    def _load(self) -> dict[str, str]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("settings") != self.settings:
+                return {}
+            return {entry["chunk"]: entry["output"] for entry in data["chunks"]}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return {}
+
+    def get(self, chunk: str) -> str | None:
+        """The Markdown of an identical chunk from the last conversion"""
+        output = self.previous.get(chunk_digest(chunk))
+        if output is not None:
+            self.reused += 1
+        return output
+
+    def record(self, index: int, chunk: str, output: str) -> None:
+        self.chunks[index] = (chunk_digest(chunk), output)
+
+    def save(self) -> None:
+        """Replace the stored chunks with this conversion's"""
+        data = {
+            "settings": self.settings,
+            "chunks": [
+                {"chunk": digest, "output": output}
+                for _, (digest, output) in sorted(self.chunks.items())
+            ],
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
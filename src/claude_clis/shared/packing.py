@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import hashlib
+import re
+
+# A marker line of any pack, whatever its nonce
+PACK_MARKER_RE = re.compile(r"=== DOC2MD \w+ DOCUMENT \d+ ===")
+
+
+def pack_marker(nonce: str, index: int) -> str:
+    return f"=== DOC2MD {nonce} DOCUMENT {index} ==="
+
+
+def pack_nonce(documents: list[str]) -> str:
+    """Marker tag derived from the documents, so it can't occur in them by
+    accident and identical packs produce identical prompts"""
+    digest = hashlib.sha256("\0".join(documents).encode("utf-8"))
+    return digest.hexdigest()[:8]
+
+
+def plan_packs(sizes: list[int], budget: int, max_documents: int = 20) -> list[list[int]]:
+    """Group document indices, in order, into packs of at most budget tokens"""
+    packs: list[list[int]] = []
+    current: list[int] = []
+    used = 0
+    for i, size in enumerate(sizes):
+        if current and (used + size > budget or len(current) >= max_documents):
+            packs.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += size
+    if current:
+        packs.append(current)
+    return packs
+
+
+def build_packed_content(documents: list[str], nonce: str) -> str:
+    return "\n\n".join(
+        f"{pack_marker(nonce, i + 1)}\n{document.strip()}"
+        for i, document in enumerate(documents)
+    )
+
+
+def split_packed_response(response: str, nonce: str, count: int) -> list[str] | None:
+    """Per-document Markdown from a packed response, or None if it doesn't
+    hold exactly one non-empty section per document, in order"""
+    marker_re = re.compile(
+        rf"^[ \t]*=== DOC2MD {re.escape(nonce)} DOCUMENT (\d+) ===[ \t]*$", re.MULTILINE
+    )
+    matches = list(marker_re.finditer(response))
+    if not matches or [int(m.group(1)) for m in matches] != list(range(1, count + 1)):
+        return None
+    if response[:matches[0].start()].strip():
+        return None
+
+    sections = [
+        response[m.end():matches[i + 1].start() if i + 1 < len(matches) else len(response)].strip()
+        for i, m in enumerate(matches)
+    ]
+    if not all(sections):
+        return None
+    return sections
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from .tokens import estimate_tokens
+
+if TYPE_CHECKING:
+    from .config import RoutingConfig
+
+CHUNK_CLASSES = ("table", "code", "noisy", "long", "prose")
+
+# Pipe tables, tab-separated cells, or three columns aligned with runs of
+# spaces as PDF text extraction produces them
+_TABLE_LINE_RE = re.compile(r"\|.*\||\t.*\t|\S {2,}\S.* {2,}\S")
+_CODE_LINE_RE = re.compile(
+    r"^(?: {4}|\t)\S"
+    r"|^\s*(?:def|class|function)\s+\w+\s*[(:{]"
+    r"|^\s*(?:import\s+[\w.]+\s*$|from\s+[\w.]+\s+import\b)"
+    r"|^\s*(?:const|let|var)\s+\w+\s*="
+    r"|[{};]\s*$|=>|```"
+)
+_WORD_RE = re.compile(r"[(\[\"'“‘$€£]*\w[\w'’\-]*[%)\]\"'”’.,;:!?]*")
+# Standalone bullets, dashes and operators that are normal in clean text
+_SEPARATOR_RE = re.compile(r"[-–—•·*/&+=#>:|]+")
+
+
+@dataclass
+class ChunkFeatures:
+    tokens: int
+    table_ratio: float
+    code_ratio: float
+    noise_ratio: float
+
+
+def chunk_features(text: str) -> ChunkFeatures:
+    """Cheap structural statistics used to pick a model for a chunk"""
+    lines = [line for line in text.splitlines() if line.strip()]
+    words = text.split()
+
+    noisy = sum(
+        1 for word in words
+        if not (_WORD_RE.fullmatch(word) or _SEPARATOR_RE.fullmatch(word))
+        or (len(word) == 1 and word.isalpha() and word not in "aAI")
+    )
+    return ChunkFeatures(
+        tokens=estimate_tokens(text),
+        table_ratio=sum(1 for line in lines if _TABLE_LINE_RE.search(line)) / len(lines) if lines else 0.0,
+        code_ratio=sum(1 for line in lines if _CODE_LINE_RE.search(line)) / len(lines) if lines else 0.0,
+        noise_ratio=noisy / len(words) if words else 0.0,
+    )
+
+
+def classify_chunk(
+    text: str,
+    table_ratio: float = 0.3,
+    code_ratio: float = 0.3,
+    noise_ratio: float = 0.15,
+    long_tokens: int = 3000,
+) -> str:
+    """One of CHUNK_CLASSES; structure that is hard to convert wins over length"""
+    features = chunk_features(text)
+    if features.table_ratio >= table_ratio:
+        return "table"
+    if features.code_ratio >= code_ratio:
+        return "code"
+    if features.noise_ratio >= noise_ratio:
+        return "noisy"
+    if features.tokens >= long_tokens:
+        return "long"
+    return "prose"
+
+
+class ChunkRouter:
+    """Sends each chunk class to the provider configured for it"""
+
+    def __init__(
+        self,
+        routes: dict[str, str],
+        table_ratio: float = 0.3,
+        code_ratio: float = 0.3,
+        noise_ratio: float = 0.15,
+        long_tokens: int = 3000,
+    ) -> None:
+        self.routes = routes
+        self.table_ratio = table_ratio
+        self.code_ratio = code_ratio
+        self.noise_ratio = noise_ratio
+        self.long_tokens = long_tokens
+        self.counts: Counter[tuple[str, str]] = Counter()
+
+    @classmethod
+    def from_config(cls, config: RoutingConfig) -> ChunkRouter:
+        routes: dict[str, str] = dict(config.routes.items())
+        return cls(
+            routes,
+            table_ratio=config.table_ratio,
+            code_ratio=config.code_ratio,
+            noise_ratio=config.noise_ratio,
+            long_tokens=config.long_tokens,
+        )
+
+    def route(self, text: str) -> tuple[str, str | None]:
+        """Chunk class and the provider for it, or None for the default provider"""
+        chunk_class = classify_chunk(
+            text,
+            table_ratio=self.table_ratio,
+            code_ratio=self.code_ratio,
+            noise_ratio=self.noise_ratio,
+            long_tokens=self.long_tokens,
+        )
+        provider = self.routes.get(chunk_class)
+        self.counts[(chunk_class, provider or "default")] += 1
+        return chunk_class, provider
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+import re
+from collections.abc import AsyncIterator
+from typing import Any
+
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from pydantic_ai.usage import RequestUsage
+
+from .packing import PACK_MARKER_RE
+from .tokens import estimate_tokens
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_BULLET_RE = re.compile(r"^\s*(?:[-*•●◦▪]|\d+[.)])\s+")
+_CONTENT_MARKER = "Document content:\n"
+
+
+def _render_block(lines: list[str]) -> str:
+    if all(_BULLET_RE.match(line) for line in lines):
+        return "\n".join(_BULLET_RE.sub("- ", line) for line in lines)
+    if len(lines) == 1 and len(lines[0]) < 80 and not lines[0].endswith((".", ":", ",", ";")):
+        return f"## {lines[0]}"
+    return " ".join(lines)
+
+
+def render_markdown(prompt: str) -> str:
+    """Deterministic Markdown for the document text in a conversion prompt
+
+    Pack marker lines are copied unchanged onto their own lines, as the
+    packed prompt asks, so packed responses split like a real model's.
+    """
+    text = prompt.split(_CONTENT_MARKER, 1)[-1]
+    blocks = []
+    for paragraph in _PARAGRAPH_RE.split(text.strip()):
+        lines: list[str] = []
+        for line in paragraph.splitlines():
+            line = " ".join(line.split())
+            if PACK_MARKER_RE.fullmatch(line):
+                if lines:
+                    blocks.append(_render_block(lines))
+                    lines = []
+                blocks.append(line)
+            elif line:
+                lines.append(line)
+        if lines:
+            blocks.append(_render_block(lines))
+    return "\n\n".join(blocks)
+
+
+class StubBackend:
+    """Offline stand-in for a provider with realistic latency and failures
+
+    Responses are derived from the prompt only, so they are identical across
+    runs; latency and error injection draw from a seeded generator.
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        self.config = config
+        self.model_name = config.get("model", "stub")
+        self._random = random.Random(config.get("seed"))
+
+    def sample_latency(self) -> float:
+        """Seconds before the first token, drawn from the configured distribution"""
+        mean = max(0.0, float(self.config.get("latency_mean", 0.0)))
+        stddev = max(0.0, float(self.config.get("latency_stddev", 0.0)))
+        distribution = self.config.get("latency_distribution", "fixed")
+
+        if mean == 0 or distribution == "fixed":
+            return mean
+        if distribution == "uniform":
+            return self._random.uniform(max(0.0, mean - stddev), mean + stddev)
+        # lognormal with the requested mean and standard deviation, which
+        # gives the long right tail real APIs show
+        sigma2 = math.log1p((stddev / mean) ** 2)
+        mu = math.log(mean) - sigma2 / 2
+        return self._random.lognormvariate(mu, math.sqrt(sigma2))
+
+    def _inject_failure(self) -> None:
+        roll = self._random.random()
+        rate_limit_rate = self.config.get("rate_limit_rate", 0.0)
+        if roll < rate_limit_rate:
+            raise ModelHTTPError(429, self.model_name, body={"error": "stub rate limit"})
+        if roll < rate_limit_rate + self.config.get("server_error_rate", 0.0):
+            raise ModelHTTPError(503, self.model_name, body={"error": "stub server error"})
+
+    def _output_delay(self, text: str) -> float:
+        tokens_per_second = float(self.config.get("tokens_per_second", 0))
+        if tokens_per_second <= 0:
+            return 0.0
+        return estimate_tokens(text) / tokens_per_second
+
+    async def respond(self, messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        self._inject_failure()
+        prompt = _last_user_prompt(messages)
+        output = render_markdown(prompt)
+        await asyncio.sleep(self.sample_latency() + self._output_delay(output))
+        return ModelResponse(
+            parts=[TextPart(output)],
+            usage=RequestUsage(
+                input_tokens=estimate_tokens(prompt),
+                output_tokens=estimate_tokens(output),
+            ),
+            model_name=self.model_name,
+        )
+
+    async def stream(self, messages: list[ModelMessage], info: AgentInfo) -> AsyncIterator[str]:
+        self._inject_failure()
+        output = render_markdown(_last_user_prompt(messages))
+        await asyncio.sleep(self.sample_latency())
+        for piece in re.findall(r"\S+\s*|\s+", output):
+            await asyncio.sleep(self._output_delay(piece))
+            yield piece
+
+
+def _last_user_prompt(messages: list[ModelMessage]) -> str:
+    for message in reversed(messages):
+        if isinstance(message, ModelRequest):
+            for part in reversed(message.parts):
+                if isinstance(part, UserPromptPart) and isinstance(part.content, str):
+                    return part.content
+    return ""
+
+
+def create_stub_model(config: dict[str, Any]) -> FunctionModel:
+    backend = StubBackend(config)
+    return FunctionModel(
+        backend.respond,
+        stream_function=backend.stream,
+        model_name=backend.model_name,
+    )
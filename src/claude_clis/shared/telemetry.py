@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+_current_file: ContextVar[str | None] = ContextVar("telemetry_file", default=None)
+_current_chunk: ContextVar[int | None] = ContextVar("telemetry_chunk", default=None)
+_queue_wait: ContextVar[float] = ContextVar("telemetry_queue_wait", default=0.0)
+
+
+@contextmanager
+def request_context(
+    file: str | None = None,
+    chunk: int | None = None,
+    queue_wait: float | None = None,
+) -> Iterator[None]:
+    """Attribute the requests made inside the block to a file and chunk
+
+    queue_wait is time the caller already spent waiting for a slot, added to
+    the client-side wait of each request.
+    """
+    resets: list[tuple[ContextVar[Any], Token[Any]]] = []
+    if file is not None:
+        resets.append((_current_file, _current_file.set(file)))
+    if chunk is not None:
+        resets.append((_current_chunk, _current_chunk.set(chunk)))
+    if queue_wait is not None:
+        resets.append((_queue_wait, _queue_wait.set(queue_wait)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(resets):
+            var.reset(token)
+
+
+@dataclass
+class TokenUsage:
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_input_tokens: int = 0
+
+    @classmethod
+    def from_usage(cls, usage: Any) -> TokenUsage:
+        """Convert a pydantic-ai RunUsage or RequestUsage"""
+        return cls(
+            input_tokens=usage.input_tokens or 0,
+            output_tokens=usage.output_tokens or 0,
+            cached_input_tokens=usage.cache_read_tokens or 0,
+        )
+
+
+def estimate_cost(usage: TokenUsage, pricing: dict[str, Any]) -> float:
+    """Cost in USD from per-million-token prices in a provider config"""
+    input_price = pricing.get("input_cost_per_mtok") or 0.0
+    cached_price = pricing.get("cached_input_cost_per_mtok")
+    if cached_price is None:
+        cached_price = input_price
+    output_price = pricing.get("output_cost_per_mtok") or 0.0
+
+    uncached = max(0, usage.input_tokens - usage.cached_input_tokens)
+    return (
+        uncached * input_price
+        + usage.cached_input_tokens * cached_price
+        + usage.output_tokens * output_price
+    ) / 1_000_000
+
+
+@dataclass
+class RequestRecord:
+    file: str | None
+    chunk: int | None
+    provider: str
+    model: str
+    status: str
+    attempts: int
+    queue_wait: float
+    latency: float
+    input_tokens: int
+    output_tokens: int
+    cached_input_tokens: int
+    cost: float
+    timestamp: float
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class MetricsRecorder:
+    """Collects one record per model call, tagged with the current file and chunk
+
+    status is ok, error, truncated (cut off at the output limit) or cached.
+    """
+
+    def __init__(self) -> None:
+        self.records: list[RequestRecord] = []
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        status: str,
+        usage: TokenUsage | None = None,
+        latency: float = 0.0,
+        queue_wait: float = 0.0,
+        attempts: int = 1,
+        cost: float = 0.0,
+    ) -> RequestRecord:
+        usage = usage or TokenUsage()
+        record = RequestRecord(
+            file=_current_file.get(),
+            chunk=_current_chunk.get(),
+            provider=provider,
+            model=model,
+            status=status,
+            attempts=attempts,
+            queue_wait=queue_wait + _queue_wait.get(),
+            latency=latency,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            cached_input_tokens=usage.cached_input_tokens,
+            cost=cost,
+            timestamp=time.time(),
+        )
+        self.records.append(record)
+        return record
+
+    def summary(self, records: list[RequestRecord] | None = None) -> dict[str, Any]:
+        records = self.records if records is None else records
+        answered = [r for r in records if r.status == "ok"]
+        latencies = [r.latency for r in answered]
+        busy = sum(latencies)
+        output_tokens = sum(r.output_tokens for r in records)
+        return {
+            "requests": len(records),
+            "errors": sum(1 for r in records if r.status == "error"),
+            "truncated": sum(1 for r in records if r.status == "truncated"),
+            "cache_hits": sum(1 for r in records if r.status == "cached"),
+            "latency_p50": percentile(latencies, 0.50),
+            "latency_p95": percentile(latencies, 0.95),
+            "latency_p99": percentile(latencies, 0.99),
+            "queue_wait_p95": percentile([r.queue_wait for r in records], 0.95),
+            "input_tokens": sum(r.input_tokens for r in records),
+            "cached_input_tokens": sum(r.cached_input_tokens for r in records),
+            "output_tokens": output_tokens,
+            "output_tokens_per_second": (
+                sum(r.output_tokens for r in answered) / busy if busy else None
+            ),
+            "cost": sum(r.cost for r in records),
+        }
+
+    def by_file(self) -> dict[str, dict[str, Any]]:
+        files: dict[str, list[RequestRecord]] = {}
+        for record in self.records:
+            files.setdefault(record.file or "-", []).append(record)
+        return {file: self.summary(records) for file, records in files.items()}
+
+    def write_json(self, path: Path | str) -> None:
+        data = {
+            "summary": self.summary(),
+            "files": self.by_file(),
+            "records": [asdict(record) for record in self.records],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import math
+import re
+
+# Han, kana and Hangul characters each cost roughly one token in the
+# tokenizers of the providers we support, unlike Latin text where a token
+# covers about four characters.
+_CJK_RE = re.compile(
+    r"[\u1100-\u11ff\u3040-\u30ff\u3100-\u312f\u31f0-\u31ff"
+    r"\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]"
+)
+_SYMBOL_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """Offline token estimate that holds up for both Latin and CJK text"""
+    if not text:
+        return 0
+
+    cjk = len(_CJK_RE.findall(text))
+    symbols = len(_SYMBOL_RE.findall(text))
+    spaces = len(_SPACE_RE.findall(text))
+    other = max(0, len(text) - cjk - symbols - spaces)
+
+    return max(1, math.ceil(cjk + symbols * 0.5 + other / 4 + spaces / 16))
+
+
+def chunk_token_budget(
+    context_window: int,
+    max_output_tokens: int,
+    prompt_overhead: int = 400,
+    output_ratio: float = 1.15,
+) -> int:
+    """Largest chunk (in tokens) whose conversion fits the model's limits
+
+    A Markdown conversion is roughly as long as its input, so the output
+    limit usually binds before the context window does.
+    """
+    input_room = context_window - max_output_tokens - prompt_overhead
+    output_room = int(max_output_tokens / output_ratio)
+    return max(256, min(input_room, output_room))
@@ -2,14 +2,44 @@ from __future__ import annotations
 
 import asyncio
 import sys
+from collections.abc import Awaitable, Callable
+from functools import partial
 from pathlib import Path
+from typing import TypeVar
 
 import click
 
 from ...shared.config import config_manager
-from ...shared.utils import CLIContext
+from ...shared.utils import CLIContext, console, format_duration, print_table
 from .processor import Doc2mdProcessor, ProcessorError
 
+T = TypeVar("T")
+
+
+def _resolve_chunking(chunking: str | None, chunk_size: int | None) -> tuple[str | None, int]:
+    """An explicit --chunk-size means character chunking unless --chunking says otherwise"""
+    if chunk_size is None:
+        return chunking, config_manager.load_config().tools.doc2md.chunk_size
+    return chunking or "chars", chunk_size
+
+
+async def _run_and_close(processor: Doc2mdProcessor, job: Awaitable[T]) -> T:
+    """Run a processor job, then shut down its connections on the same loop"""
+    try:
+        return await job
+    finally:
+        await processor.aclose()
+
+
+async def _preflight_and_run(
+    processor: Doc2mdProcessor,
+    ai_provider: str | None,
+    job: Callable[[], Awaitable[T]],
+) -> T:
+    """Check the provider's health, then start the job"""
+    await processor.preflight(ai_provider)
+    return await job()
+
 
 @click.group(name="doc2md")
 @click.pass_context
@@ -46,12 +76,12 @@ def doc2md(ctx: click.Context) -> None:
 @click.argument("input_file", type=click.Path(exists=True, path_type=Path))
 @click.option(
     "-o", "--output", "output_file",
-    type=click.Path(path_type=Path),
-    help="Output file path (default: input_file.md)"
+    type=click.Path(path_type=Path, allow_dash=True),
+    help="Output file path, or - for stdout (default: input_file.md)"
 )
 @click.option(
     "--ai-provider",
-    type=click.Choice(["gemini", "ollama", "anthropic"]),
+    type=click.Choice(["gemini", "ollama", "anthropic", "stub"]),
     help="AI provider to use (overrides config)"
 )
 @click.option(
@@ -66,17 +96,68 @@ def doc2md(ctx: click.Context) -> None:
     default="auto",
     help="Section handling strategy"
 )
+@click.option(
+    "--chunking",
+    type=click.Choice(["chars", "tokens", "structure"]),
+    default=None,
+    help="Chunk by model token budget, by token budget keeping tables, code and lists whole, "
+         "or by --chunk-size characters (default: chars if --chunk-size is given, else from config)"
+)
 @click.option(
     "--chunk-size",
-    type=int,
-    default=4000,
-    help="Text chunk size for processing"
+    type=click.IntRange(min=1),
+    default=None,
+    help="Characters per chunk; implies --chunking chars unless --chunking is given "
+         "(default: from config)"
+)
+@click.option(
+    "--chunk-tokens",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Token budget per chunk (default: derived from the provider's limits)"
+)
+@click.option(
+    "--chunk-concurrency",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Chunks converted in parallel per document (default: from config)"
 )
 @click.option(
     "--no-formatting",
     is_flag=True,
     help="Don't preserve original formatting"
 )
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Bypass the response cache"
+)
+@click.option(
+    "--stream",
+    is_flag=True,
+    help="Write Markdown to the output as the model generates it"
+)
+@click.option(
+    "--hybrid/--no-hybrid",
+    default=None,
+    help="Keep well-formed reader output and send only doubtful blocks to the model (default: from config)"
+)
+@click.option(
+    "--metrics-json",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Write per-request token, latency and cost records to this JSON file"
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Reuse the chunks an interrupted conversion already converted"
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only convert chunks that changed since the last incremental conversion to the same output"
+)
 @click.pass_obj
 def convert(
     cli_ctx: CLIContext,
@@ -85,8 +166,17 @@ def convert(
     ai_provider: str | None,
     style: str,
     sections: str,
-    chunk_size: int,
+    chunking: str | None,
+    chunk_size: int | None,
+    chunk_tokens: int | None,
+    chunk_concurrency: int | None,
     no_formatting: bool,
+    no_cache: bool,
+    stream: bool,
+    hybrid: bool | None,
+    metrics_json: Path | None,
+    resume: bool,
+    incremental: bool,
 ) -> None:
     """🔄 Convert a single document to Markdown
     
@@ -94,9 +184,21 @@ def convert(
     
     The tool will automatically detect the file format and use the appropriate
     reader to extract content, then convert it to clean Markdown using AI.
+    
+    Converted chunks are journaled next to the output until it is written;
+    rerun with --resume after an interruption to convert only the rest.
+    
+    With --incremental the chunk boundaries follow the content, and a later
+    --incremental run on an edited document only converts the chunks that
+    changed, splicing in the Markdown of the rest.
     """
+    if output_file is not None and str(output_file) == "-":
+        # Keep status messages out of the Markdown written to stdout
+        console.stderr = True
+    
+    chunking, chunk_size = _resolve_chunking(chunking, chunk_size)
     try:
-        processor = Doc2mdProcessor(cli_ctx)
+        processor = Doc2mdProcessor(cli_ctx, use_cache=not no_cache)
         
         # Check if file format is supported
         if not processor.is_supported_format(input_file):
@@ -104,24 +206,30 @@ def convert(
             cli_ctx.error(f"Unsupported file format. Supported: {supported}")
             sys.exit(1)
         
-        # Validate AI provider
-        if ai_provider:
-            if not processor.ai_client.test_provider(ai_provider):
-                cli_ctx.error(f"AI provider '{ai_provider}' is not properly configured")
-                cli_ctx.info("Run: claude-clis config init")
-                sys.exit(1)
-        
-        # Run conversion
-        result_path = asyncio.run(processor.convert_file(
-            input_file=input_file,
-            output_file=output_file,
-            ai_provider=ai_provider,
-            style=style,
-            preserve_formatting=not no_formatting,
-            chunk_size=chunk_size,
-        ))
+        # Run conversion once the provider has passed its health check
+        result_path = asyncio.run(_run_and_close(processor, _preflight_and_run(
+            processor,
+            ai_provider,
+            partial(
+                processor.convert_file,
+                input_file=input_file,
+                output_file=output_file,
+                ai_provider=ai_provider,
+                style=style,
+                preserve_formatting=not no_formatting,
+                chunk_size=chunk_size,
+                chunk_concurrency=chunk_concurrency,
+                stream=stream,
+                chunking=chunking,
+                chunk_tokens=chunk_tokens,
+                hybrid=hybrid,
+                resume=resume,
+                incremental=incremental,
+            ),
+        )))
         
         cli_ctx.info(f"📝 Output saved to: {result_path}")
+        processor.report_metrics(metrics_json)
         
     except ProcessorError as e:
         cli_ctx.error(str(e))
@@ -151,7 +259,7 @@ def convert(
 )
 @click.option(
     "--ai-provider",
-    type=click.Choice(["gemini", "ollama", "anthropic"]),
+    type=click.Choice(["gemini", "ollama", "anthropic", "stub"]),
     help="AI provider to use (overrides config)"
 )
 @click.option(
@@ -160,23 +268,84 @@ def convert(
     default="technical",
     help="Output style"
 )
+@click.option(
+    "--chunking",
+    type=click.Choice(["chars", "tokens", "structure"]),
+    default=None,
+    help="Chunk by model token budget, by token budget keeping tables, code and lists whole, "
+         "or by --chunk-size characters (default: chars if --chunk-size is given, else from config)"
+)
 @click.option(
     "--chunk-size",
-    type=int,
-    default=4000,
-    help="Text chunk size for processing"
+    type=click.IntRange(min=1),
+    default=None,
+    help="Characters per chunk; implies --chunking chars unless --chunking is given "
+         "(default: from config)"
+)
+@click.option(
+    "--chunk-tokens",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Token budget per chunk (default: derived from the provider's limits)"
+)
+@click.option(
+    "--chunk-concurrency",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Chunks converted in parallel per document (default: from config)"
 )
 @click.option(
     "--no-formatting",
     is_flag=True,
     help="Don't preserve original formatting"
 )
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Bypass the response cache"
+)
+@click.option(
+    "--stream",
+    is_flag=True,
+    help="Write Markdown to the output as the model generates it"
+)
+@click.option(
+    "--hybrid/--no-hybrid",
+    default=None,
+    help="Keep well-formed reader output and send only doubtful blocks to the model (default: from config)"
+)
+@click.option(
+    "--metrics-json",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Write per-request token, latency and cost records to this JSON file"
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Reuse the chunks an interrupted conversion already converted"
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only convert chunks that changed since the last incremental conversion to the same output"
+)
 @click.option(
     "--max-concurrent",
     type=int,
     default=3,
     help="Maximum concurrent conversions"
 )
+@click.option(
+    "--pack/--no-pack",
+    default=None,
+    help="Convert small documents several to a request (default: from config)"
+)
+@click.option(
+    "--offline-batch",
+    is_flag=True,
+    help="Submit through the provider's batch API (cheaper, results within 24h; resumable)"
+)
 @click.pass_obj
 def batch(
     cli_ctx: CLIContext,
@@ -185,9 +354,20 @@ def batch(
     pattern: str,
     ai_provider: str | None,
     style: str,
-    chunk_size: int,
+    chunking: str | None,
+    chunk_size: int | None,
+    chunk_tokens: int | None,
+    chunk_concurrency: int | None,
     no_formatting: bool,
+    no_cache: bool,
+    stream: bool,
+    hybrid: bool | None,
+    metrics_json: Path | None,
+    resume: bool,
+    incremental: bool,
     max_concurrent: int,
+    pack: bool | None,
+    offline_batch: bool,
 ) -> None:
     """📁 Convert multiple documents in a directory
     
@@ -195,28 +375,43 @@ def batch(
     
     Recursively finds all supported documents in the directory and converts
     them to Markdown. The directory structure is preserved in the output.
+    
+    With --pack short documents are converted several to a request, which
+    helps when per-request overhead and rate limits dominate.
+    
+    With --offline-batch the requests are queued on the provider's batch API
+    (Anthropic or Gemini). Rerunning the same command after an interruption
+    resumes the submitted jobs.
     """
+    chunking, chunk_size = _resolve_chunking(chunking, chunk_size)
     try:
-        processor = Doc2mdProcessor(cli_ctx)
-        
-        # Validate AI provider
-        if ai_provider:
-            if not processor.ai_client.test_provider(ai_provider):
-                cli_ctx.error(f"AI provider '{ai_provider}' is not properly configured")
-                cli_ctx.info("Run: claude-clis config init")
-                sys.exit(1)
+        processor = Doc2mdProcessor(cli_ctx, use_cache=not no_cache)
         
-        # Run batch conversion
-        results = asyncio.run(processor.batch_convert(
-            input_dir=input_dir,
-            output_dir=output_dir,
-            pattern=pattern,
-            ai_provider=ai_provider,
-            style=style,
-            preserve_formatting=not no_formatting,
-            chunk_size=chunk_size,
-            max_concurrent=max_concurrent,
-        ))
+        # Run batch conversion once the provider has passed its health check
+        results = asyncio.run(_run_and_close(processor, _preflight_and_run(
+            processor,
+            ai_provider,
+            partial(
+                processor.batch_convert,
+                input_dir=input_dir,
+                output_dir=output_dir,
+                pattern=pattern,
+                ai_provider=ai_provider,
+                style=style,
+                preserve_formatting=not no_formatting,
+                chunk_size=chunk_size,
+                max_concurrent=max_concurrent,
+                chunk_concurrency=chunk_concurrency,
+                stream=stream,
+                chunking=chunking,
+                chunk_tokens=chunk_tokens,
+                hybrid=hybrid,
+                pack=pack,
+                offline_batch=offline_batch,
+                resume=resume,
+                incremental=incremental,
+            ),
+        )))
         
         if results:
             cli_ctx.success(f"🎉 Successfully converted {len(results)} files")
@@ -225,6 +420,7 @@ def batch(
                     cli_ctx.info(f"   ✓ {path}")
         else:
             cli_ctx.warning("⚠️ No files were converted")
+        processor.report_metrics(metrics_json)
         
     except ProcessorError as e:
         cli_ctx.error(str(e))
@@ -302,12 +498,19 @@ def info(cli_ctx: CLIContext, file_path: Path) -> None:
 
 
 @doc2md.command()
+@click.option(
+    "--refresh",
+    is_flag=True,
+    help="Probe every provider again instead of reusing recent results"
+)
 @click.pass_obj
-def test(cli_ctx: CLIContext) -> None:
+def test(cli_ctx: CLIContext, refresh: bool) -> None:
     """🧪 Test AI providers and document readers
     
-    Checks the availability and configuration of all AI providers
-    and document format readers.
+    Checks the availability of the document format readers and sends a tiny
+    request to every configured AI provider at once, measuring round-trip
+    latency and time to first token. Healthy results are reused for a few
+    minutes (ai.health.ttl).
     """
     processor = Doc2mdProcessor(cli_ctx)
     
@@ -325,16 +528,24 @@ def test(cli_ctx: CLIContext) -> None:
     cli_ctx.info("   Text/Markdown: ✅ Always available")
     
     # Test AI providers
-    cli_ctx.info("\n🤖 AI Providers:")
+    cli_ctx.info("")
     
-    providers = processor.ai_client.get_available_providers()
-    for provider in providers:
-        try:
-            is_configured = processor.ai_client.test_provider(provider)
-            status = "✅ Configured" if is_configured else "❌ Not configured"
-            cli_ctx.info(f"   {provider.title()}: {status}")
-        except Exception as e:
-            cli_ctx.info(f"   {provider.title()}: ❌ Error - {str(e)}")
+    def seconds(value: float | None) -> str:
+        return format_duration(value) if value is not None else "-"
+    
+    results = asyncio.run(_run_and_close(processor, processor.check_health(refresh=refresh)))
+    rows = []
+    for result in results:
+        if result.reachable:
+            status = "✅ Healthy" + (" (cached)" if result.cached else "")
+        elif result.configured:
+            status = f"⚠️ Unreachable: {result.error}"
+        else:
+            status = "❌ Not configured"
+        rows.append([
+            result.provider.title(), status, seconds(result.latency), seconds(result.first_token),
+        ])
+    print_table("🤖 AI Providers", ["Provider", "Status", "Round trip", "First token"], rows)
     
     # Show current configuration
     current_provider = config_manager.get_ai_provider()
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import statistics
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from ...shared.routing import chunk_features
+
+if TYPE_CHECKING:
+    from ...shared.ai_client import DocumentProcessor
+
+_HEADING_RE = re.compile(r"^#{1,6}\s+\S")
+_LIST_ITEM_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+\S")
+_TABLE_SEPARATOR_RE = re.compile(r"^\|?\s*:?-{3,}:?\s*(?:\|\s*:?-{3,}:?\s*)*\|?$")
+_HYPHEN_BREAK_RE = re.compile(r"\w-\n\w")
+# Inline emphasis, code, link targets and URLs, which aren't OCR noise
+_MARKUP_RE = re.compile(r"https?://\S+|\]\([^)]*\)|[*_`~\[\]]+")
+
+
+@dataclass
+class Block:
+    text: str
+    kind: str
+    score: float
+
+
+@dataclass
+class Segment:
+    """Consecutive blocks that are either kept as-is or converted together"""
+
+    text: str
+    passthrough: bool
+    blocks: int
+
+
+def split_blocks(content: str) -> list[str]:
+    """Split reader output on blank lines, keeping fenced code blocks whole"""
+    blocks: list[str] = []
+    current: list[str] = []
+    in_fence = False
+    for line in content.splitlines():
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        if not line.strip() and not in_fence:
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            continue
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def _score_table(lines: list[str]) -> float:
+    if len(lines) < 2 or not _TABLE_SEPARATOR_RE.match(lines[1].strip()):
+        return 0.2
+    widths = {line.strip().strip("|").count("|") for line in lines}
+    if len(widths) > 1:
+        return 0.2
+    cells = [cell.strip() for line in lines[2:] for cell in line.strip().strip("|").split("|")]
+    # Merged cells come out of extraction as runs of empty ones
+    if cells and sum(1 for cell in cells if not cell) / len(cells) > 0.5:
+        return 0.4
+    return 1.0
+
+
+def _score_text(block: str, lines: list[str]) -> float:
+    features = chunk_features(_MARKUP_RE.sub("", block))
+    score = 1.0 - min(1.0, features.noise_ratio * 4)
+    if features.table_ratio >= 0.3:
+        # Column-aligned text is a table whose structure was lost
+        score -= 0.6
+    if _HYPHEN_BREAK_RE.search(block):
+        score -= 0.2
+    if len(lines) >= 3 and statistics.median(len(line) for line in lines) < 40:
+        # Many short lines: layout fragments rather than prose
+        score -= 0.4
+    return max(0.0, score)
+
+
+def score_block(block: str) -> Block:
+    """Classify a block and score how likely it already is clean Markdown"""
+    lines = block.splitlines()
+    first = lines[0].lstrip()
+
+    if first.startswith("```"):
+        closed = len(lines) > 1 and lines[-1].strip().startswith("```")
+        return Block(block, "code", 1.0 if closed else 0.3)
+    if len(lines) == 1 and _HEADING_RE.match(first):
+        return Block(block, "heading", 1.0 if len(first) < 200 else 0.5)
+    if all(line.lstrip().startswith("|") for line in lines):
+        return Block(block, "table", _score_table(lines))
+    if _LIST_ITEM_RE.match(lines[0]) and all(
+        _LIST_ITEM_RE.match(line) or line.startswith(("  ", "\t")) for line in lines
+    ):
+        return Block(block, "list", min(0.9, _score_text(block, [])))
+    return Block(block, "paragraph", _score_text(block, lines))
+
+
+def plan_segments(content: str, threshold: float = 0.7) -> list[Segment]:
+    """Group blocks into pass-through runs and regions that need the model"""
+    segments: list[Segment] = []
+    for block in map(score_block, split_blocks(content)):
+        passthrough = block.score >= threshold
+        if segments and segments[-1].passthrough == passthrough:
+            last = segments[-1]
+            last.text = f"{last.text}\n\n{block.text}"
+            last.blocks += 1
+        else:
+            segments.append(Segment(block.text, passthrough, 1))
+    return segments
+
+
+class HybridConverter:
+    """Keep well-formed reader output and send only doubtful regions to the model"""
+
+    def __init__(self, doc_processor: DocumentProcessor, threshold: float = 0.7) -> None:
+        self.doc_processor = doc_processor
+        self.threshold = threshold
+
+    def plan(self, content: str) -> list[Segment]:
+        return plan_segments(content, self.threshold)
+
+    async def convert(
+        self,
+        segments: list[Segment],
+        chunk_concurrency: int = 4,
+        **kwargs: Any
+    ) -> str:
+        """Convert the model regions concurrently and reassemble the document"""
+        # One limit for the chunks of every region together
+        semaphore = asyncio.Semaphore(max(1, chunk_concurrency))
+
+        async def convert_region(segment: Segment) -> str:
+            if segment.passthrough:
+                return segment.text
+            return await self.doc_processor.process_large_content(
+                content=segment.text, semaphore=semaphore, **kwargs
+            )
+
+        tasks = [asyncio.ensure_future(convert_region(segment)) for segment in segments]
+        try:
+            return "\n\n".join(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def stream(
+        self,
+        segments: list[Segment],
+        chunk_concurrency: int = 4,
+        **kwargs: Any
+    ) -> AsyncIterator[str]:
+        """Yield the document in order, streaming model regions as they convert"""
+        for i, segment in enumerate(segments):
+            if i > 0:
+                yield "\n\n"
+            if segment.passthrough:
+                yield segment.text
+                continue
+            async for text in self.doc_processor.stream_large_content(
+                content=segment.text, chunk_concurrency=chunk_concurrency, **kwargs
+            ):
+                yield text
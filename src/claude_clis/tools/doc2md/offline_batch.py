@@ -0,0 +1,620 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import shutil
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import httpx
+
+from ...shared.ai_client import AIClientError
+from ...shared.config import OfflineBatchConfig, config_manager
+
+if TYPE_CHECKING:
+    from .processor import Doc2mdProcessor
+
+
+# Anthropic accepts custom ids of up to 64 letters, digits, "_" and "-"
+MAX_CUSTOM_ID_LENGTH = 64
+
+
+class OfflineBatchError(Exception):
+    pass
+
+
+@dataclass
+class BatchRequest:
+    custom_id: str
+    prompt: str
+    system_prompt: str
+
+
+@dataclass
+class BatchResult:
+    """Response text of one request, None if it failed; truncated when the
+    response stopped at the output limit"""
+    text: str | None
+    truncated: bool = False
+
+
+class BatchBackend(ABC):
+    """Submits requests to a provider's asynchronous batch API"""
+
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient,
+        api_key: str,
+        model: str,
+        max_tokens: int,
+        temperature: float | None,
+        base_url: str,
+    ) -> None:
+        self.http_client = http_client
+        self.api_key = api_key
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.base_url = base_url.rstrip("/")
+
+    @abstractmethod
+    async def submit(self, requests: list[BatchRequest]) -> str:
+        """Create a batch job and return its id"""
+
+    @abstractmethod
+    async def poll(self, job_id: str) -> str:
+        """Return "running", "ended" or "failed" """
+
+    @abstractmethod
+    async def fetch_results(self, job_id: str) -> dict[str, BatchResult]:
+        """Map custom ids to their results"""
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        try:
+            response = await self.http_client.request(method, url, **kwargs)
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            raise OfflineBatchError(
+                f"Batch API returned {e.response.status_code}: {e.response.text[:500]}"
+            ) from e
+        except httpx.HTTPError as e:
+            raise OfflineBatchError(f"Batch API request failed: {e}") from e
+        return response
+
+
+class AnthropicBatchBackend(BatchBackend):
+    def _headers(self) -> dict[str, str]:
+        return {
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01",
+        }
+
+    async def submit(self, requests: list[BatchRequest]) -> str:
+        body = {
+            "requests": [
+                {
+                    "custom_id": request.custom_id,
+                    "params": {
+                        "model": self.model,
+                        "max_tokens": self.max_tokens,
+                        "system": request.system_prompt,
+                        "messages": [{"role": "user", "content": request.prompt}],
+                        **({"temperature": self.temperature} if self.temperature is not None else {}),
+                    },
+                }
+                for request in requests
+            ]
+        }
+        response = await self._request(
+            "POST", f"{self.base_url}/v1/messages/batches", json=body, headers=self._headers()
+        )
+        return str(response.json()["id"])
+
+    async def poll(self, job_id: str) -> str:
+        response = await self._request(
+            "GET", f"{self.base_url}/v1/messages/batches/{job_id}", headers=self._headers()
+        )
+        return "ended" if response.json().get("processing_status") == "ended" else "running"
+
+    async def fetch_results(self, job_id: str) -> dict[str, BatchResult]:
+        batch = (await self._request(
+            "GET", f"{self.base_url}/v1/messages/batches/{job_id}", headers=self._headers()
+        )).json()
+        if not batch.get("results_url"):
+            raise OfflineBatchError(f"Batch {job_id} has no results")
+
+        response = await self._request("GET", batch["results_url"], headers=self._headers())
+        results: dict[str, BatchResult] = {}
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            result = entry.get("result", {})
+            if result.get("type") != "succeeded":
+                results[entry["custom_id"]] = BatchResult(None)
+                continue
+            message = result["message"]
+            results[entry["custom_id"]] = BatchResult(
+                "".join(
+                    block.get("text", "") for block in message.get("content", [])
+                    if block.get("type") == "text"
+                ),
+                truncated=message.get("stop_reason") == "max_tokens",
+            )
+        return results
+
+
+class GeminiBatchBackend(BatchBackend):
+    _FAILED_STATES = {"BATCH_STATE_FAILED", "BATCH_STATE_CANCELLED", "BATCH_STATE_EXPIRED"}
+
+    def _headers(self) -> dict[str, str]:
+        return {"x-goog-api-key": self.api_key}
+
+    async def submit(self, requests: list[BatchRequest]) -> str:
+        generation_config: dict[str, Any] = {"maxOutputTokens": self.max_tokens}
+        if self.temperature is not None:
+            generation_config["temperature"] = self.temperature
+        body = {
+            "batch": {
+                "display_name": "doc2md",
+                "input_config": {
+                    "requests": {
+                        "requests": [
+                            {
+                                "request": {
+                                    "contents": [{"role": "user", "parts": [{"text": request.prompt}]}],
+                                    "system_instruction": {"parts": [{"text": request.system_prompt}]},
+                                    "generation_config": generation_config,
+                                },
+                                "metadata": {"key": request.custom_id},
+                            }
+                            for request in requests
+                        ]
+                    }
+                },
+            }
+        }
+        response = await self._request(
+            "POST",
+            f"{self.base_url}/v1beta/models/{self.model}:batchGenerateContent",
+            json=body,
+            headers=self._headers(),
+        )
+        return str(response.json()["name"])
+
+    async def _get(self, job_id: str) -> dict[str, Any]:
+        response = await self._request(
+            "GET", f"{self.base_url}/v1beta/{job_id}", headers=self._headers()
+        )
+        operation: dict[str, Any] = response.json()
+        return operation
+
+    async def poll(self, job_id: str) -> str:
+        state = (await self._get(job_id)).get("metadata", {}).get("state", "")
+        if state == "BATCH_STATE_SUCCEEDED":
+            return "ended"
+        if state in self._FAILED_STATES:
+            return "failed"
+        return "running"
+
+    async def fetch_results(self, job_id: str) -> dict[str, BatchResult]:
+        operation = await self._get(job_id)
+        output = operation.get("response") or operation.get("metadata", {}).get("output", {})
+        results: dict[str, BatchResult] = {}
+        for entry in output.get("inlinedResponses", {}).get("inlinedResponses", []):
+            key = entry.get("metadata", {}).get("key")
+            if key is None:
+                continue
+            candidates = entry.get("response", {}).get("candidates") or []
+            finish_reason = candidates[0].get("finishReason") if candidates else None
+            if not candidates or finish_reason not in (None, "STOP", "MAX_TOKENS"):
+                results[key] = BatchResult(None)
+                continue
+            results[key] = BatchResult(
+                "".join(
+                    part.get("text", "")
+                    for part in candidates[0].get("content", {}).get("parts", [])
+                ),
+                truncated=finish_reason == "MAX_TOKENS",
+            )
+        return results
+
+
+_BACKENDS: dict[str, type[BatchBackend]] = {
+    "anthropic": AnthropicBatchBackend,
+    "gemini": GeminiBatchBackend,
+}
+
+
+class OfflineBatchRunner:
+    """Converts a set of documents through the provider's batch API
+
+    Progress is kept in a state directory inside the output directory so an
+    interrupted run picks up its submitted jobs instead of paying for them twice.
+    A request whose response stops at the output limit is replaced by two
+    requests for the halves of its content, as in online conversion.
+    """
+
+    STATE_DIR = ".doc2md-batch"
+
+    def __init__(
+        self,
+        processor: Doc2mdProcessor,
+        ai_provider: str | None = None,
+        config: OfflineBatchConfig | None = None,
+        backend: BatchBackend | None = None,
+    ) -> None:
+        self.processor = processor
+        self.cli_ctx = processor.cli_ctx
+        self.config = config or config_manager.load_config().tools.doc2md.offline_batch
+        self.model_info = processor.ai_client.get_model_info(ai_provider)
+        self.provider = self.model_info["provider"]
+        self.backend = backend or self._create_backend()
+
+    def _create_backend(self) -> BatchBackend:
+        backend_cls = _BACKENDS.get(self.provider)
+        if backend_cls is None:
+            supported = ", ".join(_BACKENDS)
+            raise OfflineBatchError(
+                f"Provider '{self.provider}' has no batch API. "
+                f"Offline batch mode supports: {supported}"
+            )
+
+        ai_client = self.processor.ai_client
+        try:
+            api_key = ai_client.get_api_key(self.provider)
+        except AIClientError as e:
+            raise OfflineBatchError(str(e)) from e
+        provider_config = config_manager.get_ai_config(self.provider)
+        return backend_cls(
+            ai_client.http_client,
+            api_key,
+            self.model_info["model"],
+            provider_config["max_tokens"],
+            self.model_info["temperature"],
+            getattr(self.config, f"{self.provider}_base_url"),
+        )
+
+    async def run(
+        self,
+        files: list[Path],
+        output_dir: Path,
+        style: str = "technical",
+        preserve_formatting: bool = True,
+        chunk_size: int = 4000,
+        chunk_tokens: int | None = None,
+        structured: bool = False,
+    ) -> list[Path]:
+        """Convert files, returning the outputs that were written"""
+        state_dir = output_dir / self.STATE_DIR
+        settings = {
+            # Custom ids number the files in this order
+            "files": [str(file) for file in files],
+            "provider": self.provider,
+            "model": self.model_info["model"],
+            "temperature": self.model_info["temperature"],
+            "style": style,
+            "preserve_formatting": preserve_formatting,
+            "chunk_size": chunk_size,
+            "chunk_tokens": chunk_tokens,
+            "structured": structured,
+        }
+
+        manifest = self._load_manifest(state_dir, settings)
+        if manifest is None:
+            manifest = await self._prepare(
+                state_dir, files, output_dir, settings,
+                style, preserve_formatting, chunk_size, chunk_tokens, structured,
+            )
+        requests = self._load_requests(state_dir)
+        results = self._load_results(state_dir)
+        self._collect_cached(state_dir, requests, results)
+
+        written = await self._process(state_dir, manifest, requests, results)
+
+        unfinished = [entry for entry in manifest["files"] if not entry["written"]]
+        for entry in unfinished:
+            self.cli_ctx.warning(f"❌ No complete result for {Path(entry['input']).name}")
+        if not unfinished:
+            shutil.rmtree(state_dir, ignore_errors=True)
+        return written
+
+    async def _prepare(
+        self,
+        state_dir: Path,
+        files: list[Path],
+        output_dir: Path,
+        settings: dict[str, Any],
+        style: str,
+        preserve_formatting: bool,
+        chunk_size: int,
+        chunk_tokens: int | None,
+        structured: bool,
+    ) -> dict[str, Any]:
+        """Extract every document and record the requests that convert it"""
+        state_dir.mkdir(parents=True, exist_ok=True)
+        doc_processor = self.processor.doc_processor
+        entries = []
+
+        with open(state_dir / "requests.jsonl", "w", encoding="utf-8") as f:
+            for file_index, file in enumerate(files):
+                try:
+                    content = await self.processor._extract_content(file)
+                except Exception as e:
+                    self.cli_ctx.warning(f"Skipping {file.name}: {e}")
+                    continue
+                if not content.strip():
+                    self.cli_ctx.warning(f"Skipping {file.name}: no readable content")
+                    continue
+
+                ids = []
+                pairs = doc_processor.build_requests(
+                    content, chunk_size, style, preserve_formatting, chunk_tokens, structured
+                )
+                for chunk_index, (prompt, system_prompt) in enumerate(pairs):
+                    custom_id = f"f{file_index}-c{chunk_index}"
+                    ids.append(custom_id)
+                    f.write(json.dumps({
+                        "custom_id": custom_id,
+                        "prompt": prompt,
+                        "system_prompt": system_prompt,
+                        "cache_key": doc_processor.cache_key(prompt, self.provider, system_prompt),
+                    }, ensure_ascii=False) + "\n")
+                entries.append({
+                    "input": str(file),
+                    "output": str(output_dir / f"{file.stem}.md"),
+                    "requests": ids,
+                    "written": False,
+                })
+
+        manifest = {
+            "settings": settings, "files": entries, "jobs": [], "attempts": {}, "splits": {},
+        }
+        self._save_manifest(state_dir, manifest)
+        return manifest
+
+    async def _process(
+        self,
+        state_dir: Path,
+        manifest: dict[str, Any],
+        requests: dict[str, dict[str, Any]],
+        results: dict[str, str],
+    ) -> list[Path]:
+        written: list[Path] = []
+        attempts: dict[str, int] = manifest["attempts"]
+        splits: dict[str, list[str]] = manifest.setdefault("splits", {})
+
+        for job in manifest["jobs"]:
+            if job["status"] == "submitting":
+                # Interrupted between recording the job and learning its id
+                self.cli_ctx.warning(
+                    f"A batch of {len(job['requests'])} requests may have been submitted "
+                    "before the last run was interrupted; submitting them again"
+                )
+                job["status"] = "interrupted"
+
+        while True:
+            written.extend(self._write_completed(manifest, results))
+            self._save_manifest(state_dir, manifest)
+
+            active = [job for job in manifest["jobs"] if job["status"] == "running"]
+            in_flight = {custom_id for job in active for custom_id in job["requests"]}
+            pending = [
+                custom_id for custom_id in requests
+                if custom_id not in results
+                and custom_id not in splits
+                and custom_id not in in_flight
+                and attempts.get(custom_id, 0) < self.config.max_attempts
+            ]
+
+            size = max(1, self.config.max_requests_per_job)
+            for start in range(0, len(pending), size):
+                group = pending[start:start + size]
+                for custom_id in group:
+                    attempts[custom_id] = attempts.get(custom_id, 0) + 1
+                job = {"id": None, "requests": group, "status": "submitting"}
+                manifest["jobs"].append(job)
+                self._save_manifest(state_dir, manifest)
+                job["id"] = await self.backend.submit([
+                    BatchRequest(
+                        custom_id,
+                        requests[custom_id]["prompt"],
+                        requests[custom_id]["system_prompt"],
+                    )
+                    for custom_id in group
+                ])
+                job["status"] = "running"
+                active.append(job)
+                self._save_manifest(state_dir, manifest)
+                self.cli_ctx.info(f"📨 Submitted batch {job['id']} ({len(group)} requests)")
+
+            if not active:
+                return written
+
+            finished = False
+            for job in active:
+                status = await self.backend.poll(job["id"])
+                if status == "running":
+                    continue
+                finished = True
+                if status == "ended":
+                    fetched = await self.backend.fetch_results(job["id"])
+                    self._store_results(state_dir, requests, results, {
+                        custom_id: result.text
+                        for custom_id, result in fetched.items() if not result.truncated
+                    })
+                    for custom_id, result in fetched.items():
+                        if result.truncated:
+                            self._split_request(
+                                state_dir, splits, requests, results, custom_id, result.text or ""
+                            )
+                else:
+                    self.cli_ctx.warning(f"Batch {job['id']} failed")
+                job["status"] = status
+                self.cli_ctx.debug(f"Batch {job['id']}: {status}")
+
+            if not finished:
+                self.cli_ctx.debug(
+                    f"{len(active)} batches running, next check in {self.config.poll_interval:.0f}s"
+                )
+                await asyncio.sleep(self.config.poll_interval)
+
+    def _write_completed(
+        self, manifest: dict[str, Any], results: dict[str, str]
+    ) -> list[Path]:
+        """Write every document whose chunks have all come back"""
+        written = []
+        splits = manifest.get("splits", {})
+        for entry in manifest["files"]:
+            if entry["written"]:
+                continue
+            texts = [self._result(r, splits, results) for r in entry["requests"]]
+            if any(text is None for text in texts):
+                continue
+            input_path = Path(entry["input"])
+            output_path = Path(entry["output"])
+            metadata = self.processor._generate_metadata(
+                input_path, self.provider, manifest["settings"]["style"]
+            )
+            markdown_content = self.processor.doc_processor.combine_results(
+                [text for text in texts if text is not None]
+            )
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(f"{metadata}\n\n{markdown_content}")
+            entry["written"] = True
+            written.append(output_path)
+            self.cli_ctx.success(f"✅ Converted {input_path.name} → {output_path.name}")
+        return written
+
+    def _result(
+        self, custom_id: str, splits: dict[str, list[str]], results: dict[str, str]
+    ) -> str | None:
+        """Response for a request, joined from its halves if it was split"""
+        if custom_id in results:
+            return results[custom_id]
+        if custom_id not in splits:
+            return None
+        halves = [self._result(half, splits, results) for half in splits[custom_id]]
+        if any(text is None for text in halves):
+            return None
+        return self.processor.doc_processor.join_halves(
+            [text for text in halves if text is not None]
+        )
+
+    def _split_request(
+        self,
+        state_dir: Path,
+        splits: dict[str, list[str]],
+        requests: dict[str, dict[str, Any]],
+        results: dict[str, str],
+        custom_id: str,
+        output: str,
+    ) -> None:
+        """Replace a request whose response was cut off by requests for its halves"""
+        request = requests.get(custom_id)
+        if request is None:
+            return
+        doc_processor = self.processor.doc_processor
+        prompts = doc_processor.split_request(request["prompt"])
+        ids = [f"{custom_id}_{i}" for i in range(len(prompts or ()))]
+        if prompts is None or len(ids[-1]) > MAX_CUSTOM_ID_LENGTH:
+            # Too short to split: keep what came back, as online conversion does
+            self._store_results(state_dir, requests, results, {custom_id: output})
+            return
+        with open(state_dir / "requests.jsonl", "a", encoding="utf-8") as f:
+            for half_id, prompt in zip(ids, prompts, strict=True):
+                requests[half_id] = {
+                    "custom_id": half_id,
+                    "prompt": prompt,
+                    "system_prompt": request["system_prompt"],
+                    "cache_key": doc_processor.cache_key(
+                        prompt, self.provider, request["system_prompt"]
+                    ),
+                }
+                f.write(json.dumps(requests[half_id], ensure_ascii=False) + "\n")
+        splits[custom_id] = ids
+        self.cli_ctx.debug(f"Response for {custom_id} was cut off; splitting it in two")
+
+    def _store_results(
+        self,
+        state_dir: Path,
+        requests: dict[str, dict[str, Any]],
+        results: dict[str, str],
+        fetched: dict[str, str | None],
+    ) -> None:
+        cache = self.processor.response_cache
+        with open(state_dir / "results.jsonl", "a", encoding="utf-8") as f:
+            for custom_id, text in fetched.items():
+                if text is None or custom_id not in requests:
+                    continue
+                results[custom_id] = text
+                f.write(json.dumps({"custom_id": custom_id, "text": text}, ensure_ascii=False) + "\n")
+                if cache is not None:
+                    cache.put(requests[custom_id]["cache_key"], text)
+
+    def _collect_cached(
+        self,
+        state_dir: Path,
+        requests: dict[str, dict[str, Any]],
+        results: dict[str, str],
+    ) -> None:
+        """Answer requests from the response cache before submitting anything"""
+        cache = self.processor.response_cache
+        if cache is None:
+            return
+        hits: dict[str, str | None] = {}
+        for custom_id, request in requests.items():
+            if custom_id not in results:
+                hits[custom_id] = cache.get(request["cache_key"])
+        self._store_results(state_dir, requests, results, hits)
+        self.processor.doc_processor.cache_hits += sum(1 for text in hits.values() if text is not None)
+
+    def _load_manifest(
+        self, state_dir: Path, settings: dict[str, Any]
+    ) -> dict[str, Any] | None:
+        path = state_dir / "manifest.json"
+        if not path.exists():
+            return None
+        with open(path, encoding="utf-8") as f:
+            manifest: dict[str, Any] = json.load(f)
+        if manifest.get("settings") != settings:
+            raise OfflineBatchError(
+                f"{state_dir} holds an unfinished batch with different settings. "
+                f"Rerun with the same options or remove the directory."
+            )
+        self.cli_ctx.info(f"♻️  Resuming offline batch from {state_dir}")
+        return manifest
+
+    def _save_manifest(self, state_dir: Path, manifest: dict[str, Any]) -> None:
+        path = state_dir / "manifest.json"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        tmp.replace(path)
+
+    def _load_requests(self, state_dir: Path) -> dict[str, dict[str, Any]]:
+        requests = {}
+        with open(state_dir / "requests.jsonl", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    request = json.loads(line)
+                    requests[request["custom_id"]] = request
+        return requests
+
+    def _load_results(self, state_dir: Path) -> dict[str, str]:
+        path = state_dir / "results.jsonl"
+        results: dict[str, str] = {}
+        if not path.exists():
+            return results
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed mid-write leaves a partial last line
+                    continue
+                results[entry["custom_id"]] = entry["text"]
+        return results
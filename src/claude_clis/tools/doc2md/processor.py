@@ -1,13 +1,23 @@
 from __future__ import annotations
 
 import asyncio
+import sys
 import time
+from collections.abc import AsyncIterator, Iterator
 from pathlib import Path
 from typing import Any
 
-from ...shared.ai_client import AIClient, DocumentProcessor
+from ...shared.ai_client import AIClient, AIClientError, DocumentProcessor
+from ...shared.cache import ResponseCache, ResponseCacheError, open_response_cache
 from ...shared.config import config_manager
-from ...shared.utils import CLIContext, format_duration, format_file_size
+from ...shared.health import HealthResult, check_providers
+from ...shared.journal import ChunkJournal, ChunkStore, file_digest
+from ...shared.packing import plan_packs
+from ...shared.routing import ChunkRouter
+from ...shared.telemetry import request_context
+from ...shared.tokens import estimate_tokens
+from ...shared.utils import CLIContext, format_duration, format_file_size, print_table
+from .hybrid import HybridConverter, Segment
 from .readers.pdf import PDFReader, PDFReaderError
 from .readers.word import WordReader, WordReaderError
 
@@ -16,11 +26,45 @@ class ProcessorError(Exception):
     pass
 
 
+# Most bytes a file can take per estimated token of its text. Plain text
+# can't exceed 16 (a token of whitespace); PDF and Word files also carry
+# fonts, images and markup, so theirs is a generous guess. Files larger
+# than this allows for are too big to pack and are never read to check.
+_BYTES_PER_TOKEN = {'.txt': 16, '.md': 16, '.pdf': 256, '.docx': 256, '.doc': 256}
+
+
+def _iter_text_blocks(file_path: Path, block_chars: int = 64 * 1024) -> Iterator[str]:
+    """Yield a text file in pieces of about block_chars, cut at blank lines"""
+    with open(file_path, encoding='utf-8') as f:
+        lines: list[str] = []
+        size = 0
+        for line in f:
+            if size >= block_chars and not line.strip():
+                yield "".join(lines)
+                lines, size = [], 0
+                continue
+            lines.append(line)
+            size += len(line)
+        if lines:
+            yield "".join(lines)
+
+
 class Doc2mdProcessor:
-    def __init__(self, cli_ctx: CLIContext) -> None:
+    def __init__(self, cli_ctx: CLIContext, use_cache: bool = True) -> None:
         self.cli_ctx = cli_ctx
         self.ai_client = AIClient(config_manager)
-        self.doc_processor = DocumentProcessor(self.ai_client)
+        self.response_cache = self._open_cache() if use_cache else None
+        routing = config_manager.load_config().ai.routing
+        self.doc_processor = DocumentProcessor(
+            self.ai_client,
+            cache=self.response_cache,
+            router=ChunkRouter.from_config(routing) if routing.enabled else None,
+        )
+        self._warmed_up: set[str] = set()
+        self.hybrid = HybridConverter(
+            self.doc_processor,
+            threshold=config_manager.load_config().tools.doc2md.hybrid_threshold,
+        )
         
         # Initialize readers
         try:
@@ -35,6 +79,24 @@ class Doc2mdProcessor:
             self.cli_ctx.warning(f"Word reader unavailable: {e}")
             self.word_reader = None
 
+    def _open_cache(self) -> ResponseCache | None:
+        """Open the persistent response cache if it is enabled"""
+        if not config_manager.load_config().cache.enabled:
+            return None
+        try:
+            cache = open_response_cache(config_manager)
+            cache.stats()
+            return cache
+        except ResponseCacheError as e:
+            self.cli_ctx.warning(f"Response cache unavailable: {e}")
+            return None
+
+    async def aclose(self) -> None:
+        """Release pooled connections and the cache handle"""
+        await self.ai_client.aclose()
+        if self.response_cache is not None:
+            self.response_cache.close()
+
     def get_supported_formats(self) -> list[str]:
         """Get list of supported document formats"""
         formats = []
@@ -58,9 +120,32 @@ class Doc2mdProcessor:
         style: str = "technical",
         preserve_formatting: bool = True,
         chunk_size: int = 4000,
+        chunk_concurrency: int | None = None,
+        stream: bool = False,
+        chunking: str | None = None,
+        chunk_tokens: int | None = None,
+        hybrid: bool | None = None,
+        resume: bool = False,
+        incremental: bool = False,
+        content: str | None = None,
         **kwargs: Any
     ) -> Path:
-        """Convert a single document to Markdown"""
+        """Convert a single document to Markdown
+
+        With stream=True the output is written as the model generates it;
+        an output_file of "-" streams to stdout. With hybrid=True only the
+        parts of the reader output that don't look like clean Markdown are
+        sent to the model.
+
+        Converted chunks are journaled next to the output until it is
+        written; resume=True reuses the chunks of an interrupted run. With
+        incremental=True chunk boundaries follow the content and chunks
+        unchanged since the last incremental conversion to this output are
+        copied from it instead of being converted again.
+
+        content is the document's text when the caller has already
+        extracted it, so the file isn't read again.
+        """
         input_path = Path(input_file)
         
         if not input_path.exists():
@@ -78,9 +163,11 @@ class Doc2mdProcessor:
             output_path = Path(output_file)
         else:
             output_path = input_path.with_suffix('.md')
+        to_stdout = str(output_path) == "-"
         
         # Ensure output directory exists
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+        if not to_stdout:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
         
         start_time = time.time()
         file_size = input_path.stat().st_size
@@ -91,50 +178,122 @@ class Doc2mdProcessor:
         self.cli_ctx.debug(f"AI Provider: {ai_provider or 'default'}")
         self.cli_ctx.debug(f"Style: {style}")
         
-        try:
-            # Extract content
-            content = await self._extract_content(input_path)
-            
-            if not content.strip():
-                raise ProcessorError("No readable content found in document")
-            
-            self.cli_ctx.debug(f"Extracted content length: {len(content)} characters")
-            
-            # Process with AI
-            self.cli_ctx.info("🤖 Converting to Markdown...")
-            markdown_content = await self.doc_processor.process_large_content(
-                content=content,
-                provider=ai_provider,
-                chunk_size=chunk_size,
-                style=style,
-                preserve_formatting=preserve_formatting,
-                **kwargs
-            )
+        await self._warm_up(ai_provider)
+        with request_context(file=str(input_path)):
+            try:
+                if hybrid is None:
+                    hybrid = config_manager.load_config().tools.doc2md.hybrid
+                
+                segments: list[Segment] | None = None
+                if incremental and (stream or hybrid or to_stdout):
+                    self.cli_ctx.warning(
+                        "⚠️ Incremental conversion needs a regular conversion to a file; "
+                        "converting the whole document"
+                    )
+                if stream or hybrid:
+                    # Streamed output and hybrid planning need the whole text first;
+                    # otherwise chunks are converted while the reader is still going
+                    if content is None:
+                        content = await self._extract_content(input_path)
+                
+                    if not content.strip():
+                        raise ProcessorError("No readable content found in document")
+                
+                    self.cli_ctx.debug(f"Extracted content length: {len(content)} characters")
+                    segments = self._plan_hybrid(content) if hybrid else None
             
-            # Add metadata header
-            metadata = self._generate_metadata(input_path, ai_provider or "default", style)
-            final_content = f"{metadata}\n\n{markdown_content}"
+                # Process with AI
+                self.cli_ctx.info("🤖 Converting to Markdown...")
+                if chunk_concurrency is None:
+                    chunk_concurrency = config_manager.load_config().tools.doc2md.chunk_concurrency
+                chunk_tokens = self._resolve_chunk_tokens(ai_provider, chunking, chunk_tokens)
+                if chunk_tokens:
+                    self.cli_ctx.debug(f"Chunk budget: {chunk_tokens} tokens")
+                metadata = self._generate_metadata(input_path, ai_provider or "default", style)
             
-            # Save output
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(final_content)
+                options: dict[str, Any] = {
+                    "provider": ai_provider,
+                    "chunk_size": chunk_size,
+                    "style": style,
+                    "preserve_formatting": preserve_formatting,
+                    "chunk_concurrency": chunk_concurrency,
+                    "chunk_tokens": chunk_tokens,
+                    "structured": self._structured_chunking(chunking),
+                    **kwargs,
+                }
+                if stream:
+                    if segments is not None:
+                        chunks = self.hybrid.stream(segments, **options)
+                    else:
+                        # Extracted above: streaming needs the whole text
+                        assert content is not None
+                        chunks = self.doc_processor.stream_large_content(content=content, **options)
+                    await self._stream_output(output_path, metadata, chunks)
+                    if to_stdout:
+                        return output_path
+                else:
+                    journal: ChunkJournal | None = None
+                    store: ChunkStore | None = None
+                    if segments is not None:
+                        markdown_content = await self.hybrid.convert(segments, **options)
+                    else:
+                        if not to_stdout:
+                            journal = await self._open_journal(input_path, output_path, options, resume)
+                            if incremental:
+                                store = ChunkStore(
+                                    output_path.with_name(f".{output_path.name}.chunks.json"),
+                                    self._conversion_settings(options),
+                                )
+                        try:
+                            markdown_content = await self.doc_processor.process_block_stream(
+                                self._stream_blocks(input_path) if content is None
+                                else self._content_blocks(content),
+                                journal=journal,
+                                store=store,
+                                **options
+                            )
+                        finally:
+                            if journal is not None:
+                                journal.close()
+                        if journal is not None and journal.reused:
+                            self.cli_ctx.info(f"♻️ Resumed {journal.reused} chunks from the journal")
+                        if store is not None:
+                            self.cli_ctx.info(
+                                f"♻️ Incremental: reused {store.reused}/{len(store.chunks)} chunks "
+                                "from the previous conversion"
+                            )
+                
+                    # Add metadata header
+                    final_content = f"{metadata}\n\n{markdown_content}"
+                
+                    if to_stdout:
+                        sys.stdout.write(f"{final_content}\n")
+                        return output_path
+                
+                    # Save output
+                    with open(output_path, 'w', encoding='utf-8') as f:
+                        f.write(final_content)
+                    if journal is not None:
+                        journal.discard()
+                    if store is not None:
+                        store.save()
             
-            duration = time.time() - start_time
-            output_size = output_path.stat().st_size
+                duration = time.time() - start_time
+                output_size = output_path.stat().st_size
             
-            self.cli_ctx.success(
-                f"✅ Converted {input_path.name} → {output_path.name} "
-                f"({format_file_size(output_size)}) in {format_duration(duration)}"
-            )
+                self.cli_ctx.success(
+                    f"✅ Converted {input_path.name} → {output_path.name} "
+                    f"({format_file_size(output_size)}) in {format_duration(duration)}"
+                )
             
-            return output_path
+                return output_path
             
-        except Exception as e:
-            duration = time.time() - start_time
-            self.cli_ctx.error(
-                f"❌ Failed to convert {input_path.name} after {format_duration(duration)}: {str(e)}"
-            )
-            raise ProcessorError(f"Conversion failed: {str(e)}") from e
+            except Exception as e:
+                duration = time.time() - start_time
+                self.cli_ctx.error(
+                    f"❌ Failed to convert {input_path.name} after {format_duration(duration)}: {str(e)}"
+                )
+                raise ProcessorError(f"Conversion failed: {str(e)}") from e
 
     async def batch_convert(
         self,
@@ -146,9 +305,23 @@ class Doc2mdProcessor:
         preserve_formatting: bool = True,
         chunk_size: int = 4000,
         max_concurrent: int = 3,
+        chunk_concurrency: int | None = None,
+        stream: bool = False,
+        chunking: str | None = None,
+        chunk_tokens: int | None = None,
+        hybrid: bool | None = None,
+        pack: bool | None = None,
+        offline_batch: bool = False,
+        resume: bool = False,
+        incremental: bool = False,
         **kwargs: Any
     ) -> list[Path]:
-        """Convert multiple documents in batch"""
+        """Convert multiple documents in batch
+
+        With pack=True small documents are converted several to a request.
+        With offline_batch=True every request goes through the provider's
+        discounted batch API and results are collected when the jobs finish.
+        """
         input_path = Path(input_dir)
         
         if not input_path.exists():
@@ -181,6 +354,44 @@ class Doc2mdProcessor:
         self.cli_ctx.info(f"📁 Found {len(files)} files to convert")
         self.cli_ctx.info(f"📤 Output directory: {output_path}")
         
+        if offline_batch:
+            return await self._offline_batch_convert(
+                files,
+                output_path,
+                ai_provider=ai_provider,
+                style=style,
+                preserve_formatting=preserve_formatting,
+                chunk_size=chunk_size,
+                chunk_tokens=self._resolve_chunk_tokens(ai_provider, chunking, chunk_tokens),
+                structured=self._structured_chunking(chunking),
+            )
+        
+        await self._warm_up(ai_provider)
+        start_time = time.time()
+        packed: list[Path] = []
+        extracted: dict[Path, str] = {}
+        doc2md_config = config_manager.load_config().tools.doc2md
+        if pack is None:
+            pack = doc2md_config.packing.enabled
+        if hybrid is None:
+            hybrid = doc2md_config.hybrid
+        # Streaming, hybrid and incremental conversion work on one document at a time
+        if pack and not stream and not hybrid and not incremental:
+            packed, files, extracted = await self._convert_packed(
+                files,
+                output_path,
+                ai_provider=ai_provider,
+                style=style,
+                preserve_formatting=preserve_formatting,
+                budget=(
+                    doc2md_config.packing.max_tokens
+                    or self._resolve_chunk_tokens(ai_provider, chunking, chunk_tokens)
+                    or chunk_size // 4
+                ),
+                max_concurrent=max_concurrent,
+                **kwargs
+            )
+        
         # Process files with concurrency control
         semaphore = asyncio.Semaphore(max_concurrent)
         tasks = []
@@ -196,6 +407,14 @@ class Doc2mdProcessor:
                         style=style,
                         preserve_formatting=preserve_formatting,
                         chunk_size=chunk_size,
+                        chunk_concurrency=chunk_concurrency,
+                        stream=stream,
+                        chunking=chunking,
+                        chunk_tokens=chunk_tokens,
+                        hybrid=hybrid,
+                        resume=resume,
+                        incremental=incremental,
+                        content=extracted.pop(file, None),
                         **kwargs
                     )
                 except ProcessorError:
@@ -206,12 +425,11 @@ class Doc2mdProcessor:
             tasks.append(convert_with_semaphore(file))
         
         # Execute with progress tracking
-        start_time = time.time()
         results = await asyncio.gather(*tasks, return_exceptions=True)
         duration = time.time() - start_time
         
         # Process results
-        successful = []
+        successful = list(packed)
         failed = 0
         
         for result in results:
@@ -228,11 +446,347 @@ class Doc2mdProcessor:
         self.cli_ctx.info(f"   Success: {len(successful)} files")
         if failed > 0:
             self.cli_ctx.warning(f"   Failed: {failed} files")
+        if self.response_cache is not None:
+            self.cli_ctx.info(f"   Cache hits: {self.doc_processor.cache_hits} requests")
+        router = self.doc_processor.router
+        if router is not None and router.counts:
+            routed = ", ".join(
+                f"{chunk_class} → {provider}: {count}"
+                for (chunk_class, provider), count in sorted(router.counts.items())
+            )
+            self.cli_ctx.info(f"   Routed chunks: {routed}")
+        request_stats = self.ai_client.get_request_stats()
+        if request_stats["coalesced_requests"]:
+            self.cli_ctx.info(
+                f"   Deduplicated requests: {request_stats['coalesced_requests']}/"
+                f"{request_stats['prompt_requests']} "
+                f"({request_stats['coalesced_requests'] / request_stats['prompt_requests']:.0%})"
+            )
+        if request_stats["hedged_requests"] or request_stats["failovers"]:
+            self.cli_ctx.info(
+                f"   Hedged requests: {request_stats['hedged_requests']} "
+                f"({request_stats['hedge_wins']} won), "
+                f"failovers: {request_stats['failovers']}"
+            )
+        
+        return successful
+
+    async def _offline_batch_convert(
+        self,
+        files: list[Path],
+        output_path: Path,
+        ai_provider: str | None,
+        style: str,
+        preserve_formatting: bool,
+        chunk_size: int,
+        chunk_tokens: int | None,
+        structured: bool = False,
+    ) -> list[Path]:
+        """Convert files through the provider's batch API"""
+        from .offline_batch import OfflineBatchError, OfflineBatchRunner
+        
+        start_time = time.time()
+        try:
+            runner = OfflineBatchRunner(self, ai_provider)
+            successful = await runner.run(
+                files,
+                output_path,
+                style=style,
+                preserve_formatting=preserve_formatting,
+                chunk_size=chunk_size,
+                chunk_tokens=chunk_tokens,
+                structured=structured,
+            )
+        except OfflineBatchError as e:
+            raise ProcessorError(f"Offline batch failed: {e}") from e
+        duration = time.time() - start_time
+        
+        self.cli_ctx.success(
+            f"✅ Offline batch completed in {format_duration(duration)}"
+        )
+        self.cli_ctx.info(f"   Success: {len(successful)} files")
+        if len(successful) < len(files):
+            self.cli_ctx.warning(f"   Failed: {len(files) - len(successful)} files")
+        if self.response_cache is not None:
+            self.cli_ctx.info(f"   Cache hits: {self.doc_processor.cache_hits} requests")
         
         return successful
 
+    async def _convert_packed(
+        self,
+        files: list[Path],
+        output_path: Path,
+        ai_provider: str | None,
+        style: str,
+        preserve_formatting: bool,
+        budget: int,
+        max_concurrent: int,
+        **kwargs: Any
+    ) -> tuple[list[Path], list[Path], dict[Path, str]]:
+        """Convert small files several to a request
+
+        Returns the files written, the files left to convert one by one,
+        which includes every file of a pack whose response didn't split,
+        and the text already extracted from some of those.
+        """
+        packing = config_manager.load_config().tools.doc2md.packing
+        limit = min(budget, packing.small_document_tokens)
+        small: list[tuple[Path, str]] = []
+        remaining: list[Path] = []
+        extracted: dict[Path, str] = {}
+        for file in files:
+            try:
+                if file.stat().st_size > limit * _BYTES_PER_TOKEN.get(file.suffix.lower(), 0):
+                    remaining.append(file)
+                    continue
+                content = await self._extract_content(file)
+            except Exception:
+                # convert_file reports the error
+                remaining.append(file)
+                continue
+            if content.strip() and estimate_tokens(content) <= limit:
+                small.append((file, content))
+            else:
+                remaining.append(file)
+                extracted[file] = content
+        
+        packs = plan_packs(
+            [estimate_tokens(content) for _, content in small], budget, packing.max_documents
+        )
+        for pack in packs:
+            if len(pack) == 1:
+                file, content = small[pack[0]]
+                remaining.append(file)
+                extracted[file] = content
+        packs = [pack for pack in packs if len(pack) > 1]
+        if not packs:
+            return [], remaining, extracted
+        
+        semaphore = asyncio.Semaphore(max_concurrent)
+        fallbacks: list[Path] = []
+        
+        async def convert_pack(pack: list[int]) -> list[Path]:
+            entries = [small[i] for i in pack]
+            async with semaphore:
+                with request_context(file=" + ".join(str(file) for file, _ in entries)):
+                    try:
+                        sections = await self.doc_processor.convert_packed(
+                            [content for _, content in entries],
+                            provider=ai_provider,
+                            style=style,
+                            preserve_formatting=preserve_formatting,
+                            **kwargs
+                        )
+                    except Exception as e:
+                        self.cli_ctx.debug(f"Packed request failed: {e}")
+                        sections = None
+            if sections is None:
+                fallbacks.extend(file for file, _ in entries)
+                extracted.update(entries)
+                return []
+            
+            written = []
+            for (file, _), markdown in zip(entries, sections, strict=True):
+                output_file = output_path / f"{file.stem}.md"
+                metadata = self._generate_metadata(file, ai_provider or "default", style)
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    f.write(f"{metadata}\n\n{markdown}")
+                self.cli_ctx.debug(f"Converted {file.name} → {output_file.name} (packed)")
+                written.append(output_file)
+            return written
+        
+        results = await asyncio.gather(*(convert_pack(pack) for pack in packs))
+        written = [path for paths in results for path in paths]
+        self.cli_ctx.info(
+            f"📦 Packed {len(written)} files into {len(packs)} requests"
+            + (f", {len(fallbacks)} files fell back to single requests" if fallbacks else "")
+        )
+        return written, remaining + fallbacks, extracted
+
+    def report_metrics(self, metrics_json: Path | str | None = None) -> None:
+        """Print request telemetry for the run and optionally save the raw records"""
+        metrics = self.ai_client.metrics
+        if metrics_json:
+            metrics.write_json(metrics_json)
+            self.cli_ctx.debug(f"Metrics written to {metrics_json}")
+        if not metrics.records or self.cli_ctx.quiet:
+            return
+        
+        def seconds(value: float | None) -> str:
+            return format_duration(value) if value is not None else "-"
+        
+        summary = metrics.summary()
+        rate = summary["output_tokens_per_second"]
+        print_table(
+            "Request Metrics",
+            ["Metric", "Value"],
+            [
+                ["Requests", f"{summary['requests']:,}"],
+                ["Errors", f"{summary['errors']:,}"],
+                ["Truncated (split and retried)", f"{summary['truncated']:,}"],
+                ["Cache hits", f"{summary['cache_hits']:,}"],
+                ["Latency p50 / p95 / p99", " / ".join(
+                    seconds(summary[key]) for key in ("latency_p50", "latency_p95", "latency_p99")
+                )],
+                ["Queue wait p95", seconds(summary["queue_wait_p95"])],
+                ["Input tokens", f"{summary['input_tokens']:,} ({summary['cached_input_tokens']:,} cached)"],
+                ["Output tokens", f"{summary['output_tokens']:,}"],
+                ["Tokens/s", f"{rate:.1f}" if rate is not None else "-"],
+                ["Estimated cost", f"${summary['cost']:.4f}"],
+            ],
+        )
+        
+        by_file = metrics.by_file()
+        if self.cli_ctx.verbose and len(by_file) > 1:
+            print_table(
+                "Per File",
+                ["File", "Requests", "Latency p95", "Input", "Output", "Cost"],
+                [
+                    [
+                        Path(file).name,
+                        str(stats["requests"]),
+                        seconds(stats["latency_p95"]),
+                        f"{stats['input_tokens']:,}",
+                        f"{stats['output_tokens']:,}",
+                        f"${stats['cost']:.4f}",
+                    ]
+                    for file, stats in sorted(
+                        by_file.items(), key=lambda item: item[1]["cost"], reverse=True
+                    )
+                ],
+            )
+
+    async def check_health(
+        self,
+        providers: list[str] | None = None,
+        refresh: bool = False,
+    ) -> list[HealthResult]:
+        """Probe providers concurrently; recent healthy results come from cache"""
+        return await check_providers(
+            self.ai_client,
+            config_manager,
+            providers or self.ai_client.get_available_providers(),
+            refresh=refresh,
+        )
+
+    async def preflight(self, ai_provider: str | None = None) -> None:
+        """Check every provider the run can send requests to
+
+        Fails early if the provider, or one that routing sends chunks to,
+        isn't configured; warns about fallbacks that aren't and about any
+        provider that doesn't answer.
+        """
+        ai_config = config_manager.load_config().ai
+        required = [ai_provider or config_manager.get_ai_provider()]
+        # Routing only picks providers when none was chosen explicitly
+        if ai_provider is None and ai_config.routing.enabled:
+            required.extend(
+                provider for provider in dict.fromkeys(ai_config.routing.routes.values())
+                if provider not in required
+            )
+        available = self.ai_client.get_available_providers()
+        fallbacks = [
+            provider for provider in dict.fromkeys(ai_config.fallback_providers)
+            if provider not in required and provider in available
+        ]
+        
+        for result in await self.check_health(required + fallbacks):
+            provider = result.provider
+            if not result.configured:
+                if provider in required:
+                    raise ProcessorError(
+                        f"AI provider '{provider}' is not properly configured. "
+                        "Run: claude-clis config init"
+                    )
+                self.cli_ctx.warning(f"Fallback provider '{provider}' is not configured")
+            elif not result.reachable:
+                self.cli_ctx.warning(f"AI provider '{provider}' did not answer a health check: {result.error}")
+            elif not result.cached:
+                self.cli_ctx.debug(f"{provider} answered in {format_duration(result.latency or 0)}")
+
+    async def _warm_up(self, ai_provider: str | None) -> None:
+        """Load a local model once, before the first conversion waits for it"""
+        provider = ai_provider or config_manager.get_ai_provider()
+        if provider in self._warmed_up:
+            return
+        self._warmed_up.add(provider)
+        
+        start_time = time.time()
+        try:
+            if not await self.ai_client.warm_up(provider):
+                return
+        except AIClientError as e:
+            self.cli_ctx.warning(f"Model warm-up failed: {e}")
+            return
+        parallelism = self.ai_client.get_parallelism(provider)
+        self.cli_ctx.debug(
+            f"Model loaded in {format_duration(time.time() - start_time)}; "
+            + (f"{parallelism} parallel requests" if parallelism else "parallelism not limited")
+        )
+
+    def _plan_hybrid(self, content: str) -> list[Segment]:
+        """Split reader output into kept blocks and regions for the model"""
+        segments = self.hybrid.plan(content)
+        kept = sum(segment.blocks for segment in segments if segment.passthrough)
+        total = sum(segment.blocks for segment in segments)
+        model_chars = sum(len(segment.text) for segment in segments if not segment.passthrough)
+        regions = sum(1 for segment in segments if not segment.passthrough)
+        self.cli_ctx.info(
+            f"🧩 Hybrid: kept {kept}/{total} blocks as-is, {regions} regions "
+            f"({model_chars / max(1, len(content)):.0%} of the text) go to the model"
+        )
+        return segments
+
+    def _resolve_chunk_tokens(
+        self,
+        ai_provider: str | None,
+        chunking: str | None,
+        chunk_tokens: int | None,
+    ) -> int | None:
+        """Token budget per chunk, or None when chunking by characters"""
+        doc2md_config = config_manager.load_config().tools.doc2md
+        if (chunking or doc2md_config.chunking) not in ("tokens", "structure"):
+            return None
+        return (
+            chunk_tokens
+            or doc2md_config.chunk_tokens
+            or self.ai_client.get_chunk_token_budget(ai_provider)
+        )
+
+    def _structured_chunking(self, chunking: str | None) -> bool:
+        """Whether chunks keep tables, code blocks and lists whole"""
+        return (chunking or config_manager.load_config().tools.doc2md.chunking) == "structure"
+
+    async def _stream_output(
+        self,
+        output_path: Path,
+        metadata: str,
+        chunks: AsyncIterator[str],
+    ) -> None:
+        """Write the metadata header, then append Markdown as it arrives"""
+        if str(output_path) == "-":
+            out = sys.stdout
+            out.write(f"{metadata}\n\n")
+            async for text in chunks:
+                out.write(text)
+                out.flush()
+            out.write("\n")
+            out.flush()
+            return
+        
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(f"{metadata}\n\n")
+            f.flush()
+            async for text in chunks:
+                f.write(text)
+                f.flush()
+            f.write("\n")
+
     async def _extract_content(self, file_path: Path) -> str:
-        """Extract content from various file formats"""
+        """Extract content from various file formats in a worker thread"""
+        return await asyncio.to_thread(self._read_content, file_path)
+
+    def _read_content(self, file_path: Path) -> str:
         extension = file_path.suffix.lower()
         
         if extension == '.pdf':
@@ -252,6 +806,71 @@ class Doc2mdProcessor:
         else:
             raise ProcessorError(f"Unsupported file format: {extension}")
 
+    def _conversion_settings(self, options: dict[str, Any]) -> dict[str, Any]:
+        """Every setting that changes the chunks or their Markdown"""
+        return {
+            **self.ai_client.get_model_info(options["provider"]),
+            **{
+                key: value for key, value in options.items()
+                if key not in ("provider", "chunk_concurrency")
+            },
+        }
+
+    async def _open_journal(
+        self,
+        input_path: Path,
+        output_path: Path,
+        options: dict[str, Any],
+        resume: bool,
+    ) -> ChunkJournal:
+        """Journal for one conversion, keyed by the input's hash and settings"""
+        return ChunkJournal(
+            output_path.with_name(f".{output_path.name}.journal"),
+            await asyncio.to_thread(file_digest, input_path),
+            self._conversion_settings(options),
+            resume=resume,
+        )
+
+    def _iter_blocks(self, file_path: Path) -> Iterator[str]:
+        """Reader output in pieces: pages, body elements or runs of lines"""
+        extension = file_path.suffix.lower()
+        
+        if extension == '.pdf':
+            if not self.pdf_reader:
+                raise ProcessorError("PDF reader not available")
+            return self.pdf_reader.iter_pages(file_path)
+            
+        elif extension in ['.docx', '.doc']:
+            if not self.word_reader:
+                raise ProcessorError("Word reader not available")
+            return self.word_reader.iter_blocks(file_path)
+            
+        elif extension in ['.txt', '.md']:
+            return _iter_text_blocks(file_path)
+                
+        else:
+            raise ProcessorError(f"Unsupported file format: {extension}")
+
+    async def _stream_blocks(self, file_path: Path) -> AsyncIterator[str]:
+        """Reader output piece by piece, read in a worker thread so requests
+        for earlier chunks run meanwhile"""
+        blocks = self._iter_blocks(file_path)
+        extracted = 0
+        while (block := await asyncio.to_thread(next, blocks, None)) is not None:
+            if block.strip():
+                extracted += len(block)
+                yield block
+        
+        if not extracted:
+            raise ProcessorError("No readable content found in document")
+        self.cli_ctx.debug(f"Extracted content length: {extracted} characters")
+
+    async def _content_blocks(self, content: str) -> AsyncIterator[str]:
+        """Text extracted earlier, as a single block"""
+        if not content.strip():
+            raise ProcessorError("No readable content found in document")
+        yield content
+
     def _generate_metadata(self, input_file: Path, ai_provider: str, style: str) -> str:
         """Generate metadata header for converted document"""
         return f"""<!-- 
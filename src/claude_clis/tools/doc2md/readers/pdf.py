@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
 from pathlib import Path
 
 try:
@@ -21,8 +22,7 @@ class PDFReader:
                 "PyMuPDF is not available. Install with: pip install pymupdf pymupdf4llm"
             )
 
-    def read_pdf(self, file_path: Path | str) -> str:
-        """Read PDF content and extract text"""
+    def _check_path(self, file_path: Path | str) -> Path:
         file_path = Path(file_path)
         
         if not file_path.exists():
@@ -31,6 +31,12 @@ class PDFReader:
         if not file_path.suffix.lower() == '.pdf':
             raise PDFReaderError(f"Not a PDF file: {file_path}")
         
+        return file_path
+
+    def read_pdf(self, file_path: Path | str) -> str:
+        """Read PDF content and extract text"""
+        file_path = self._check_path(file_path)
+        
         try:
             # Use pymupdf4llm for better LLM-optimized extraction
             content = pymupdf4llm.to_markdown(str(file_path))
@@ -44,6 +50,41 @@ class PDFReader:
                     f"Failed to read PDF: {str(e)}. Fallback also failed: {str(fallback_e)}"
                 ) from e
 
+    def iter_pages(self, file_path: Path | str) -> Iterator[str]:
+        """Yield the text of each page in turn, so conversion can start
+        before a long PDF has been read to the end"""
+        file_path = self._check_path(file_path)
+        
+        try:
+            doc = fitz.open(str(file_path))
+        except Exception as e:
+            raise PDFReaderError(f"Failed to read PDF: {str(e)}") from e
+        
+        try:
+            try:
+                # Heading levels come from font sizes across the whole document
+                headers = pymupdf4llm.IdentifyHeaders(doc)
+            except Exception:
+                headers = None
+            
+            found = False
+            for page_num in range(len(doc)):
+                try:
+                    text = pymupdf4llm.to_markdown(doc, pages=[page_num], hdr_info=headers)
+                except Exception:
+                    # Same fallback as read_pdf, for this page only
+                    text = doc.load_page(page_num).get_text()
+                    text = f"## Page {page_num + 1}\n\n{text}" if text.strip() else ""
+                
+                if text.strip():
+                    found = True
+                    yield text
+            
+            if not found:
+                raise PDFReaderError("No readable text found in PDF")
+        finally:
+            doc.close()
+
     def _extract_with_pymupdf(self, file_path: Path) -> str:
         """Fallback extraction using basic PyMuPDF"""
         doc = fitz.open(str(file_path))
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
 from pathlib import Path
 
 try:
@@ -25,8 +26,7 @@ class WordReader:
                 "python-docx is not available. Install with: pip install python-docx"
             )
 
-    def read_docx(self, file_path: Path | str) -> str:
-        """Read DOCX content and convert to structured text"""
+    def _check_path(self, file_path: Path | str) -> Path:
         file_path = Path(file_path)
         
         if not file_path.exists():
@@ -35,6 +35,12 @@ class WordReader:
         if not file_path.suffix.lower() in ['.docx', '.doc']:
             raise WordReaderError(f"Not a Word document: {file_path}")
         
+        return file_path
+
+    def read_docx(self, file_path: Path | str) -> str:
+        """Read DOCX content and convert to structured text"""
+        file_path = self._check_path(file_path)
+        
         try:
             doc = Document(str(file_path))
             content = self._extract_content(doc)
@@ -42,23 +48,32 @@ class WordReader:
         except Exception as e:
             raise WordReaderError(f"Failed to read Word document: {str(e)}") from e
 
+    def iter_blocks(self, file_path: Path | str) -> Iterator[str]:
+        """Yield each paragraph and table as Markdown, in document order"""
+        file_path = self._check_path(file_path)
+        
+        try:
+            doc = Document(str(file_path))
+            yield from self._iter_elements(doc)
+        except Exception as e:
+            raise WordReaderError(f"Failed to read Word document: {str(e)}") from e
+
     def _extract_content(self, doc: DocxDocument) -> str:
         """Extract content from Word document preserving structure"""
-        content_parts = []
-        
+        return "\n\n".join(self._iter_elements(doc))
+
+    def _iter_elements(self, doc: DocxDocument) -> Iterator[str]:
         for element in doc.element.body:
             if isinstance(element, CT_P):
                 paragraph = Paragraph(element, doc)
                 text = self._process_paragraph(paragraph)
                 if text:
-                    content_parts.append(text)
+                    yield text
             elif isinstance(element, CT_Tbl):
                 table = Table(element, doc)
                 table_md = self._process_table(table)
                 if table_md:
-                    content_parts.append(table_md)
-        
-        return "\n\n".join(content_parts)
+                    yield table_md
 
     def _process_paragraph(self, paragraph: Paragraph) -> str:
         """Process a paragraph and return formatted text"""
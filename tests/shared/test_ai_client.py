@@ -0,0 +1,727 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from claude_clis.shared.ai_client import (
+    AIClient,
+    AIClientError,
+    CircuitBreaker,
+    CircuitOpenError,
+    DocumentProcessor,
+    MarkdownStreamCleaner,
+    RateLimiter,
+    TokenBucket,
+    TruncatedResponseError,
+    check_truncation,
+    get_retry_after,
+    is_retryable_error,
+)
+from claude_clis.shared.chunking import iter_chunks
+from claude_clis.shared.config import ConfigManager
+from claude_clis.shared.journal import ChunkJournal, ChunkStore
+from claude_clis.shared.routing import ChunkRouter
+from claude_clis.shared.telemetry import TokenUsage, request_context
+
+
+@pytest.fixture
+def config_manager(tmp_path):
+    """Create a ConfigManager backed by a temporary directory"""
+    manager = ConfigManager()
+    manager._config_dir = tmp_path
+    manager._config_file = tmp_path / "config.yaml"
+    manager._config = None
+    return manager
+
+
+class ScriptedAIClient(AIClient):
+    """AIClient whose providers answer after a fixed delay, or fail"""
+
+    def __init__(self, config_manager, delays: dict[str, float | None]) -> None:
+        super().__init__(config_manager)
+        self.delays = delays
+        self.calls: list[str] = []
+
+    async def _run_on_provider(self, provider, prompt, system_prompt=None, **kwargs):
+        self.calls.append(provider)
+        delay = self.delays[provider]
+        if delay is None:
+            raise AIClientError(f"{provider} is down")
+        await asyncio.sleep(delay)
+        return provider
+
+
+class FakeAIClient:
+    """Stand-in AIClient that echoes the chunk marker found in the prompt"""
+
+    def __init__(self) -> None:
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+
+    async def run_prompt(self, prompt, provider=None, system_prompt=None, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        marker = re.search(r"CHUNK-(\d+)", prompt).group(1)
+        # Later chunks finish first to prove results are reordered
+        await asyncio.sleep(0.01 / (int(marker) + 1))
+        self.active -= 1
+        return f"converted {marker}"
+
+    async def stream_prompt(self, prompt, provider=None, system_prompt=None, **kwargs):
+        text = await self.run_prompt(prompt, provider, system_prompt, **kwargs)
+        yield "```markdown\n"
+        for word in text.split(" "):
+            yield word + " "
+        yield "\n```"
+
+
+def _document(chunks: int) -> str:
+    return "\n\n".join(f"CHUNK-{i} " + "x" * 90 + "." for i in range(chunks))
+
+
+def test_process_large_content_preserves_order():
+    """Test that concurrently converted chunks are reassembled in order"""
+    client = FakeAIClient()
+    processor = DocumentProcessor(client)
+
+    result = asyncio.run(processor.process_large_content(
+        _document(8), chunk_size=100, chunk_concurrency=4
+    ))
+
+    assert result == "\n\n---\n\n".join(f"converted {i}" for i in range(8))
+    assert client.calls == 8
+    assert 1 < client.max_active <= 4
+
+
+def test_process_large_content_sequential():
+    """Test that a concurrency of one converts chunks one at a time"""
+    client = FakeAIClient()
+    processor = DocumentProcessor(client)
+
+    asyncio.run(processor.process_large_content(
+        _document(4), chunk_size=100, chunk_concurrency=1
+    ))
+
+    assert client.max_active == 1
+
+
+def test_stream_large_content_preserves_order():
+    """Test that streamed chunks come out cleaned and in document order"""
+    client = FakeAIClient()
+    processor = DocumentProcessor(client)
+
+    async def collect() -> str:
+        parts = []
+        async for text in processor.stream_large_content(
+            _document(5), chunk_size=100, chunk_concurrency=3
+        ):
+            parts.append(text)
+        return "".join(parts)
+
+    result = asyncio.run(collect())
+    assert result == "\n\n---\n\n".join(f"converted {i}" for i in range(5))
+
+
+def test_process_block_stream_converts_while_reading():
+    """Test that chunks are converted as blocks arrive, in order and with bounded read-ahead"""
+    client = FakeAIClient()
+    processor = DocumentProcessor(client)
+    calls_when_read = []
+
+    async def blocks():
+        for i in range(10):
+            calls_when_read.append(client.calls)
+            yield f"CHUNK-{i} " + "x" * 90 + "."
+
+    result = asyncio.run(processor.process_block_stream(
+        blocks(), chunk_size=100, chunk_concurrency=2
+    ))
+
+    assert result == "\n\n---\n\n".join(f"converted {i}" for i in range(10))
+    assert calls_when_read[-1] > 0
+    assert all(i - calls <= 4 for i, calls in enumerate(calls_when_read))
+    assert client.max_active <= 2
+
+
+def test_process_block_stream_resumes_from_journal(tmp_path):
+    """Test that chunks recorded by an interrupted run aren't requested again"""
+    path = tmp_path / ".out.md.journal"
+
+    async def blocks():
+        for i in range(6):
+            yield f"CHUNK-{i} " + "x" * 90 + "."
+
+    class FailingAIClient(FakeAIClient):
+        async def run_prompt(self, prompt, provider=None, system_prompt=None, **kwargs):
+            if "CHUNK-4" in prompt:
+                raise AIClientError("connection reset")
+            return await super().run_prompt(prompt, provider, system_prompt, **kwargs)
+
+    journal = ChunkJournal(path, "input", {})
+    with pytest.raises(AIClientError):
+        asyncio.run(DocumentProcessor(FailingAIClient()).process_block_stream(
+            blocks(), chunk_size=100, chunk_concurrency=1, journal=journal
+        ))
+    journal.close()
+
+    client = FakeAIClient()
+    journal = ChunkJournal(path, "input", {}, resume=True)
+    result = asyncio.run(DocumentProcessor(client).process_block_stream(
+        blocks(), chunk_size=100, chunk_concurrency=1, journal=journal
+    ))
+
+    assert result == "\n\n---\n\n".join(f"converted {i}" for i in range(6))
+    assert journal.reused == 4
+    assert client.calls == 2
+
+
+def test_process_block_stream_journals_chunks_in_flight_when_one_fails(tmp_path):
+    """Test that chunks sent alongside a failing one are journaled before the error"""
+    path = tmp_path / ".out.md.journal"
+    sent = []
+
+    async def blocks():
+        for i in range(6):
+            yield f"CHUNK-{i} " + "x" * 90 + "."
+
+    class FailingAIClient(FakeAIClient):
+        async def run_prompt(self, prompt, provider=None, system_prompt=None, **kwargs):
+            sent.append(prompt)
+            if "CHUNK-1" in prompt:
+                raise AIClientError("connection reset")
+            return await super().run_prompt(prompt, provider, system_prompt, **kwargs)
+
+    journal = ChunkJournal(path, "input", {})
+    with pytest.raises(AIClientError):
+        asyncio.run(DocumentProcessor(FailingAIClient()).process_block_stream(
+            blocks(), chunk_size=100, chunk_concurrency=4, journal=journal
+        ))
+    journal.close()
+
+    client = FakeAIClient()
+    journal = ChunkJournal(path, "input", {}, resume=True)
+    result = asyncio.run(DocumentProcessor(client).process_block_stream(
+        blocks(), chunk_size=100, chunk_concurrency=4, journal=journal
+    ))
+
+    assert result == "\n\n---\n\n".join(f"converted {i}" for i in range(6))
+    assert len(sent) >= 4
+    assert journal.reused == len(sent) - 1
+    assert client.calls == 6 - journal.reused
+
+
+def test_incremental_conversion_only_sends_changed_chunks(tmp_path):
+    """Test that reconverting an edited document reuses the unchanged chunks"""
+    paragraphs = [f"CHUNK-{i} " + " ".join(f"w{i}x{j}" for j in range(i % 20 + 5)) + "." for i in range(120)]
+
+    def convert(client: FakeAIClient) -> tuple[str, ChunkStore]:
+        async def blocks():
+            for paragraph in paragraphs:
+                yield paragraph
+
+        store = ChunkStore(tmp_path / ".out.md.chunks.json", {})
+        result = asyncio.run(DocumentProcessor(client).process_block_stream(
+            blocks(), chunk_tokens=150, store=store
+        ))
+        store.save()
+        return result, store
+
+    first_client = FakeAIClient()
+    convert(first_client)
+    paragraphs[60] = paragraphs[60].replace(".", " with an edit.")
+    client = FakeAIClient()
+    _, store = convert(client)
+
+    assert first_client.calls > 10
+    assert 1 <= client.calls <= 3
+    assert store.reused == len(store.chunks) - client.calls
+
+
+def test_markdown_stream_cleaner():
+    """Test incremental removal of code fences around a response"""
+    cleaner = MarkdownStreamCleaner()
+    pieces = ["``", "`mark", "down\n# Ti", "tle\n\nBody\n`", "``\n"]
+    output = "".join(cleaner.feed(piece) for piece in pieces) + cleaner.finish()
+    assert output == "# Title\n\nBody"
+
+    cleaner = MarkdownStreamCleaner()
+    output = cleaner.feed("  plain text with ```code``` inside  ") + cleaner.finish()
+    assert output == "plain text with ```code``` inside"
+
+
+def test_token_bucket_waits_for_refill():
+    """Test that the bucket delays callers once its burst capacity is spent"""
+    async def run() -> float:
+        bucket = TokenBucket(capacity=2, refill_per_second=20)
+        start = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+    assert 0.08 <= elapsed < 0.5
+
+
+def test_token_bucket_caps_oversized_requests():
+    """Test that a request larger than the bucket does not block forever"""
+    bucket = TokenBucket(capacity=10, refill_per_second=1)
+    assert asyncio.run(bucket.acquire(1000)) == 0.0
+
+
+def test_rate_limiter_unlimited():
+    """Test that zero limits never wait"""
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=0)
+    assert asyncio.run(limiter.acquire(10_000)) == 0.0
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int, headers: dict[str, str] | None = None) -> None:
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+def test_retry_classification():
+    """Test which failures are retried"""
+    assert is_retryable_error(StatusError(429))
+    assert is_retryable_error(StatusError(503))
+    assert not is_retryable_error(StatusError(401))
+    assert not is_retryable_error(StatusError(400))
+    assert is_retryable_error(httpx.ConnectError("connection refused"))
+    assert not is_retryable_error(ValueError("bad config"))
+
+    # Status codes are found on wrapped exceptions too
+    try:
+        raise RuntimeError("wrapped") from StatusError(502)
+    except RuntimeError as e:
+        assert is_retryable_error(e)
+
+
+def test_get_retry_after():
+    """Test Retry-After header parsing"""
+    assert get_retry_after(StatusError(429, {"retry-after": "7"})) == 7.0
+    assert get_retry_after(StatusError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert get_retry_after(StatusError(429)) is None
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """Test that the breaker sheds load and lets a probe through after the timeout"""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+
+    breaker.before_request("gemini")
+    breaker.record_failure()
+    breaker.before_request("gemini")
+    breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request("gemini")
+
+    time.sleep(0.06)
+    breaker.before_request("gemini")  # Probe request
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request("gemini")  # Only one probe at a time
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_request("gemini")
+
+
+def test_cancelled_half_open_probe_releases_the_breaker(config_manager):
+    """Test that cancelling the probe request doesn't leave the breaker half-open"""
+    client = AIClient(config_manager)
+    breaker = client._get_circuit_breaker("anthropic")
+    breaker.reset_timeout = 0
+    for _ in range(breaker.failure_threshold):
+        breaker.before_request("anthropic")
+        breaker.record_failure()
+
+    async def hang():
+        await asyncio.sleep(10)
+        return "late", TokenUsage()
+
+    async def answer():
+        return "ok", TokenUsage()
+
+    async def scenario():
+        probe = asyncio.ensure_future(client._with_retries("anthropic", 10, hang))
+        await asyncio.sleep(0.01)
+        assert breaker.state == "half_open"
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        return await client._with_retries("anthropic", 10, answer)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_failover_to_fallback_provider(config_manager):
+    """Test that a failing provider falls through to the next in the chain"""
+    config_manager.load_config().ai.fallback_providers = ["anthropic", "ollama"]
+    client = ScriptedAIClient(config_manager, {"gemini": None, "anthropic": 0, "ollama": 0})
+
+    assert asyncio.run(client.run_prompt("hello", "gemini")) == "anthropic"
+    assert client.calls == ["gemini", "anthropic"]
+    assert client.failovers == 1
+
+
+def test_all_providers_failing(config_manager):
+    """Test the error raised when the whole chain fails"""
+    config_manager.load_config().ai.fallback_providers = ["anthropic"]
+    client = ScriptedAIClient(config_manager, {"gemini": None, "anthropic": None})
+
+    with pytest.raises(AIClientError, match="All AI providers failed"):
+        asyncio.run(client.run_prompt("hello", "gemini"))
+
+
+def test_hedged_request_keeps_first_answer(config_manager):
+    """Test that a slow request is hedged to the secondary provider"""
+    ai_config = config_manager.load_config().ai
+    ai_config.fallback_providers = ["anthropic"]
+    ai_config.hedging.enabled = True
+    ai_config.hedging.initial_delay = 0.02
+    client = ScriptedAIClient(config_manager, {"gemini": 5, "anthropic": 0.01})
+
+    start = time.monotonic()
+    assert asyncio.run(client.run_prompt("hello", "gemini")) == "anthropic"
+    assert time.monotonic() - start < 1
+    assert client.hedged_requests == 1
+    assert client.hedge_wins == 1
+
+
+def test_identical_concurrent_prompts_share_one_request(config_manager):
+    """Test that concurrent identical prompts are coalesced into one call"""
+    client = ScriptedAIClient(config_manager, {"gemini": 0.01})
+
+    async def scenario():
+        return await asyncio.gather(
+            client.run_prompt("footer", "gemini"),
+            client.run_prompt("footer", "gemini"),
+            client.run_prompt("other", "gemini"),
+        )
+
+    assert asyncio.run(scenario()) == ["gemini", "gemini", "gemini"]
+    assert client.calls == ["gemini", "gemini"]
+    assert client.get_request_stats()["coalesced_requests"] == 1
+    assert client._in_flight == {}
+
+
+class PackingAIClient:
+    """Stand-in AIClient that converts a packed prompt, optionally dropping markers"""
+
+    def __init__(self, keep_markers: bool = True) -> None:
+        self.keep_markers = keep_markers
+        self.calls = 0
+
+    async def run_prompt(self, prompt, provider=None, system_prompt=None, **kwargs):
+        self.calls += 1
+        content = prompt.split(DocumentProcessor.CONTENT_MARKER, 1)[1]
+        if not self.keep_markers:
+            content = re.sub(r"^=== .* ===$", "", content, flags=re.MULTILINE)
+        return "```markdown\n" + content.replace("memo", "# Memo") + "\n```"
+
+
+def test_convert_packed_splits_per_document():
+    """Test that one packed request yields one Markdown document per input"""
+    client = PackingAIClient()
+    processor = DocumentProcessor(client)
+
+    result = asyncio.run(processor.convert_packed(["memo 1", "memo 2", "memo 3"]))
+
+    assert result == ["# Memo 1", "# Memo 2", "# Memo 3"]
+    assert client.calls == 1
+
+
+def test_convert_packed_reports_unsplittable_response():
+    """Test that a response without the markers returns None for fallback"""
+    processor = DocumentProcessor(PackingAIClient(keep_markers=False))
+
+    assert asyncio.run(processor.convert_packed(["memo 1", "memo 2"])) is None
+
+
+class TruncatingAIClient:
+    """Stand-in AIClient that cuts off answers to prompts longer than a limit"""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.prompts: list[str] = []
+
+    async def run_prompt(self, prompt, provider=None, system_prompt=None, **kwargs):
+        content = prompt.split(DocumentProcessor.CONTENT_MARKER, 1)[1]
+        self.prompts.append(content)
+        if len(content) > self.limit:
+            raise TruncatedResponseError(content[:self.limit])
+        return content.upper()
+
+
+def test_truncated_chunk_is_split_and_retried():
+    """Test that a cut-off answer is replaced by converting the chunk in halves"""
+    client = TruncatingAIClient(limit=300)
+    processor = DocumentProcessor(client)
+    content = "\n\n".join(f"para {i} " + "x" * 140 for i in range(4))
+
+    result = asyncio.run(processor.process_large_content(content, chunk_size=10_000))
+
+    assert result == content.upper()
+    assert len(client.prompts) == 3
+
+
+def test_split_request_matches_online_halves():
+    """Test that an offline request splits into the prompts online splitting sends"""
+    processor = DocumentProcessor(TruncatingAIClient(limit=300))
+    chunks = ["para 0 " + "x" * 140, "para 1 " + "x" * 140]
+    prompt = processor._create_chunk_prompt("\n\n".join(chunks), 1)
+
+    assert processor.split_request(prompt) == [
+        processor._create_chunk_prompt(chunk, 1) for chunk in chunks
+    ]
+    assert processor.split_request(processor._create_chunk_prompt("short", 0)) is None
+
+
+def test_check_truncation():
+    """Test finish reasons and the full-budget fallback"""
+    check_truncation("ok", TokenUsage(output_tokens=10), 100, "end_turn")
+    check_truncation("ok", TokenUsage(output_tokens=99), 100)
+    with pytest.raises(TruncatedResponseError):
+        check_truncation("cut", TokenUsage(output_tokens=10), 100, "MAX_TOKENS")
+    with pytest.raises(TruncatedResponseError):
+        check_truncation("cut", TokenUsage(output_tokens=100), 100)
+
+
+def test_ollama_native_requests_respect_parallelism(config_manager):
+    """Test warm-up and that requests never exceed the server's parallel slots"""
+    ollama = config_manager.load_config().ai.ollama
+    ollama.num_parallel = 2
+    ollama.num_ctx = 16384
+    seen: list[dict] = []
+    active = 0
+    max_active = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal active, max_active
+        body = json.loads(request.content)
+        seen.append({"path": request.url.path, **body})
+        if request.url.path == "/api/generate":
+            return httpx.Response(200, json={"done": True})
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return httpx.Response(200, json={
+            "message": {"content": body["messages"][-1]["content"].upper()},
+            "done_reason": "stop",
+            "prompt_eval_count": 10,
+            "eval_count": 5,
+        })
+
+    client = AIClient(config_manager)
+    client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def scenario():
+        assert await client.warm_up("ollama")
+        return await asyncio.gather(*(
+            client.run_prompt(f"doc {i}", "ollama", system_prompt="convert") for i in range(5)
+        ))
+
+    assert asyncio.run(scenario()) == [f"DOC {i}" for i in range(5)]
+    assert max_active == 2
+    assert seen[0]["path"] == "/api/generate"
+    assert seen[0]["keep_alive"] == "30m"
+    assert {request["options"]["num_ctx"] for request in seen} == {16384}
+    assert seen[1]["messages"][0] == {"role": "system", "content": "convert"}
+
+
+def test_providers_share_one_http_client(config_manager):
+    """Every provider's SDK uses the pooled client, which aclose() closes once"""
+    config_manager.load_config().ai.anthropic.api_key = "key"
+    closed = 0
+
+    class CountingClient(httpx.AsyncClient):
+        async def aclose(self) -> None:
+            nonlocal closed
+            closed += 1
+            await super().aclose()
+
+    client = AIClient(config_manager)
+    pooled = client._http_client = CountingClient()
+
+    assert client._get_model("anthropic").client._client is pooled
+    assert client._get_model("ollama").client._client is pooled
+
+    asyncio.run(client.aclose())
+    asyncio.run(client.aclose())
+
+    assert closed == 1
+    assert client.http_client is not pooled
+
+
+def test_gemini_provider_shares_the_pooled_client_or_its_settings(config_manager):
+    """Gemini gets the pooled client where google-genai takes one, else its settings"""
+    from google.genai.types import HttpOptions
+
+    client = AIClient(config_manager)
+    options = client._create_google_provider("key").client._api_client._http_options
+
+    if "httpx_async_client" in HttpOptions.model_fields:
+        assert options.httpx_async_client is client.http_client
+    else:
+        assert options.async_client_args == client._http_options()
+
+
+def test_agents_are_reused_per_model_and_system_prompt(config_manager):
+    """One agent serves every request with the same model and system prompt"""
+    client = AIClient(config_manager)
+    agent = client.create_agent("stub", "convert")
+
+    assert client.create_agent("stub", "convert") is agent
+    assert client.create_agent("stub", "summarise") is not agent
+    assert client.create_agent("ollama", "convert") is not agent
+    assert client.create_agent("stub", "summarise").model is agent.model
+
+
+def test_direct_requests_match_the_agent_path(config_manager):
+    """complete() returns the agent's text and records the same usage"""
+    config = config_manager.load_config()
+    config.ai.stub.latency_distribution = "fixed"
+    config.ai.stub.latency_mean = 0.0
+    client = AIClient(config_manager)
+    prompt = f"{DocumentProcessor.CONTENT_MARKER}Title\n\nSome text to convert."
+
+    async def scenario():
+        config.ai.direct_requests = False
+        via_agent = await client.run_prompt(prompt, "stub", system_prompt="convert")
+        config.ai.direct_requests = True
+        direct = await client.run_prompt(prompt, "stub", system_prompt="convert")
+        return via_agent, direct
+
+    via_agent, direct = asyncio.run(scenario())
+
+    assert direct == via_agent
+    agent_record, direct_record = client.metrics.records
+    assert (direct_record.input_tokens, direct_record.output_tokens) == (
+        agent_record.input_tokens, agent_record.output_tokens
+    )
+    assert direct_record.output_tokens > 0
+    assert len(client._agents) == 1
+
+
+def test_chunk_requests_share_a_stable_prefix():
+    """Instructions live in one system prompt; only the user prompt varies"""
+    processor = DocumentProcessor(FakeAIClient())
+    requests = processor.build_requests(_document(3), chunk_size=100)
+
+    assert len(requests) == 3
+    assert len({system_prompt for _, system_prompt in requests}) == 1
+    assert "Style: technical" in requests[0][1]
+    for i, (prompt, _) in enumerate(requests):
+        assert prompt.startswith(f"This is part {i+1} of a larger document")
+        assert "Requirements" not in prompt
+
+
+class RecordingAIClient(FakeAIClient):
+    """FakeAIClient that keeps every prompt it is sent"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.prompts: list[str] = []
+
+    async def run_prompt(self, prompt, provider=None, system_prompt=None, **kwargs):
+        self.prompts.append(prompt)
+        return await super().run_prompt(prompt, provider, system_prompt, **kwargs)
+
+
+def _pages(count: int) -> list[str]:
+    """Reader-style pages of uneven length, with headings and tables"""
+    pages = []
+    for i in range(count):
+        paragraphs = [
+            f"CHUNK-{i} " + " ".join(f"w{k}" for k in range(5 + (i * 7 + j * 13) % 60)) + "."
+            for j in range(1 + i % 5)
+        ]
+        if i % 3 == 0:
+            paragraphs.insert(0, f"## Section {i}")
+        if i % 4 == 1:
+            paragraphs.append("| a | b |\n|---|---|\n" + "\n".join(f"| {j} | {j * i} |" for j in range(8)))
+        pages.append("\n\n".join(paragraphs))
+    return pages
+
+
+def test_streamed_chunks_equal_whole_document_chunks():
+    """Page by page and whole-document chunking cut at the same places"""
+    pages = _pages(40)
+    content = "\n\n".join(pages)
+    processor = DocumentProcessor(FakeAIClient())
+
+    for options in (
+        {"chunk_size": 700},
+        {"chunk_tokens": 150},
+        {"chunk_tokens": 150, "structured": True},
+    ):
+        whole = processor._split_content(content, **options)
+        streamed = list(iter_chunks(pages, processor.make_chunker(**options)))
+
+        assert len(whole) > 5
+        assert streamed == whole
+
+
+def test_every_path_sends_the_same_chunk_prompts():
+    """Streamed, in-memory and offline conversion share prompts and so cache entries"""
+    pages = _pages(12)
+    content = "\n\n".join(pages)
+    streamed = RecordingAIClient()
+    in_memory = RecordingAIClient()
+
+    async def blocks():
+        for page in pages:
+            yield page
+
+    asyncio.run(DocumentProcessor(streamed).process_block_stream(blocks(), chunk_tokens=150))
+    asyncio.run(DocumentProcessor(in_memory).process_large_content(content, chunk_tokens=150))
+    offline = DocumentProcessor(FakeAIClient()).build_requests(content, chunk_tokens=150)
+
+    assert len(offline) > 2
+    assert sorted(streamed.prompts) == sorted(in_memory.prompts) == sorted(p for p, _ in offline)
+
+
+def test_with_retries_records_metrics(config_manager):
+    """Each call is recorded with its file, chunk, usage and estimated cost"""
+    client = AIClient(config_manager)
+
+    async def request():
+        return "ok", TokenUsage(input_tokens=1000, output_tokens=500)
+
+    async def scenario():
+        with request_context(file="a.pdf", chunk=2):
+            return await client._with_retries("anthropic", 10, request)
+
+    assert asyncio.run(scenario()) == "ok"
+    record = client.metrics.records[0]
+    assert (record.file, record.chunk, record.status) == ("a.pdf", 2, "ok")
+    assert record.cost == pytest.approx((1000 * 3.0 + 500 * 15.0) / 1_000_000)
+
+
+def test_router_picks_provider_per_chunk():
+    """Routed chunks go to their class's provider unless one is given explicitly"""
+    client = FakeAIClient()
+    providers = []
+    run_prompt = client.run_prompt
+
+    async def recording_run_prompt(prompt, provider=None, system_prompt=None, **kwargs):
+        providers.append(provider)
+        return await run_prompt(prompt, provider, system_prompt, **kwargs)
+
+    client.run_prompt = recording_run_prompt
+    processor = DocumentProcessor(client, router=ChunkRouter({"prose": "ollama"}))
+
+    asyncio.run(processor.process_large_content(_document(3), chunk_size=100))
+    asyncio.run(processor.process_large_content(_document(2), provider="gemini", chunk_size=100))
+
+    assert providers == ["ollama"] * 3 + ["gemini"] * 2
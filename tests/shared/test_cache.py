@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from claude_clis.shared.cache import ResponseCache, make_cache_key
+
+
+@pytest.fixture
+def cache():
+    """Create a ResponseCache in a temporary directory"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        response_cache = ResponseCache(Path(tmpdir) / "responses.db", max_size_mb=1)
+        yield response_cache
+        response_cache.close()
+
+
+def test_make_cache_key_is_stable():
+    """Test that cache keys depend on every request parameter"""
+    key = make_cache_key("prompt", "system", "gemini", "gemini-1.5-pro", 0.3)
+
+    assert key == make_cache_key("prompt", "system", "gemini", "gemini-1.5-pro", 0.3)
+    assert key != make_cache_key("prompt", "system", "gemini", "gemini-1.5-pro", 0.5)
+    assert key != make_cache_key("prompt", "system", "ollama", "gemini-1.5-pro", 0.3)
+    assert key != make_cache_key("prompt", None, "gemini", "gemini-1.5-pro", 0.3)
+    assert key != make_cache_key("prompt!", "system", "gemini", "gemini-1.5-pro", 0.3)
+
+
+def test_cache_round_trip(cache):
+    """Test storing and retrieving responses"""
+    assert cache.get("missing") is None
+
+    cache.put("key", "# Heading\n\nSome *markdown* — ünïcode")
+    assert cache.get("key") == "# Heading\n\nSome *markdown* — ünïcode"
+
+    stats = cache.stats()
+    assert stats.entries == 1
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.hit_rate == 0.5
+
+
+def test_cache_compression(cache):
+    """Test that repetitive responses are stored compressed"""
+    content = "| a | b |\n" * 1000
+    cache.put("table", content)
+
+    assert cache.stats().total_bytes < len(content)
+    assert cache.get("table") == content
+
+
+def test_cache_lru_eviction():
+    """Test that least recently used entries are evicted first"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = ResponseCache(Path(tmpdir) / "responses.db", max_size_mb=0.01, compress=False)
+        entry = "x" * 3000
+
+        cache.put("first", entry)
+        cache.put("second", entry)
+        cache.get("first")  # Touch so "second" becomes least recently used
+        cache.put("third", entry)
+        cache.put("fourth", entry)
+
+        assert cache.get("second") is None
+        assert cache.get("fourth") == entry
+        assert cache.stats().total_bytes <= cache.max_bytes
+        cache.close()
+
+
+def test_cache_clear(cache):
+    """Test clearing the cache"""
+    cache.put("a", "one")
+    cache.put("b", "two")
+
+    assert cache.clear() == 2
+    assert cache.stats().entries == 0
+    assert cache.get("a") is None
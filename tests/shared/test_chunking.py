@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+from claude_clis.shared.chunking import (
+    IncrementalChunker,
+    chunk_by_anchors,
+    chunk_by_chars,
+    chunk_by_structure,
+    chunk_by_tokens,
+    iter_chunks,
+    parse_blocks,
+    split_in_half,
+)
+from claude_clis.shared.tokens import estimate_tokens
+
+
+def _paragraphs(count: int, words: int = 60) -> str:
+    return "\n\n".join(
+        " ".join(f"word{i}x{j}" for j in range(words)) + "." for i in range(count)
+    )
+
+
+def test_chunk_by_tokens_small_content():
+    """Test that content within budget is a single chunk"""
+    assert chunk_by_tokens("Short paragraph.", 100) == ["Short paragraph."]
+    assert chunk_by_tokens("   ", 100) == []
+
+
+def test_chunk_by_tokens_respects_budget():
+    """Test that every chunk fits the budget and no text is lost"""
+    content = _paragraphs(40)
+    chunks = chunk_by_tokens(content, 500)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 500 for chunk in chunks)
+    assert "\n\n".join(chunks) == content
+
+
+def test_chunk_by_tokens_balances_chunks():
+    """Test that chunks are filled evenly instead of leaving a tiny tail"""
+    chunks = chunk_by_tokens(_paragraphs(21), 1000)
+    sizes = [estimate_tokens(chunk) for chunk in chunks]
+
+    assert min(sizes) > max(sizes) / 2
+
+
+def test_chunk_by_tokens_balances_varied_paragraphs():
+    """Test that uneven paragraphs still fill as few chunks as the budget allows, evenly"""
+    content = "\n\n".join(
+        " ".join(f"w{j}" for j in range(5 + i * 37 % 150)) + "." for i in range(150)
+    )
+    chunks = chunk_by_tokens(content, 1000)
+    sizes = [estimate_tokens(chunk) for chunk in chunks]
+
+    assert len(chunks) == len(chunk_by_tokens(content, 1000, balanced=False))
+    assert max(sizes) <= 1000
+    assert min(sizes) > max(sizes) * 3 / 4
+    assert "\n\n".join(chunks) == content
+
+
+def test_chunk_by_tokens_oversized_paragraph():
+    """Test splitting text without paragraph or sentence boundaries"""
+    content = "x" * 20000
+    chunks = chunk_by_tokens(content, 1000)
+
+    assert all(estimate_tokens(chunk) <= 1000 for chunk in chunks)
+    assert "".join(chunks) == content
+
+
+def test_chunk_by_tokens_cjk():
+    """Test that CJK text gets smaller chunks than Latin text of equal length"""
+    cjk = "这是一个测试句子。" * 2000
+    latin = "abcdefgh." * 2000
+
+    assert len(chunk_by_tokens(cjk, 1000)) > len(chunk_by_tokens(latin, 1000))
+
+
+def test_split_in_half_prefers_paragraph_breaks():
+    """The cut lands on the paragraph break nearest the middle"""
+    paragraphs = [f"Paragraph {i}. " + "word " * 30 for i in range(4)]
+    first, second = split_in_half("\n\n".join(paragraphs))
+
+    assert first == "\n\n".join(paragraphs[:2]).strip()
+    assert second == "\n\n".join(paragraphs[2:]).strip()
+
+
+def test_split_in_half_falls_back_to_sentences():
+    """Without line breaks the text is cut after a sentence"""
+    text = " ".join(f"Sentence number {i} is here." for i in range(20))
+    first, second = split_in_half(text)
+
+    assert first.endswith(".")
+    assert f"{first} {second}" == text
+
+
+def test_split_in_half_short_text():
+    """Text too short to split is left alone"""
+    assert split_in_half("Too short.") is None
+
+
+def test_chunk_by_chars_cuts_at_paragraphs():
+    """Chunks end after the last paragraph break near the size limit"""
+    paragraphs = [f"Paragraph {i} " + "x" * 80 for i in range(10)]
+    chunks = chunk_by_chars("\n\n".join(paragraphs), chunk_size=300)
+
+    assert chunks == ["\n\n".join(paragraphs[i:i + 3]) for i in range(0, 10, 3)]
+
+
+def test_chunk_by_chars_cuts_before_headings():
+    """A heading starts a new chunk even without a blank line before it"""
+    content = "x" * 250 + "\n## Next section\n" + "y" * 200
+    chunks = chunk_by_chars(content, chunk_size=300)
+
+    assert chunks[0] == "x" * 250
+    assert chunks[1].startswith("## Next section")
+
+
+def test_chunk_by_chars_without_newlines():
+    """Text without line breaks is cut after sentences, else at the size limit"""
+    sentences = "".join(f"Sentence {i:03d} is here. " for i in range(100))
+    chunks = chunk_by_chars(sentences, chunk_size=500)
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert " ".join(chunks) == sentences.strip()
+
+    assert chunk_by_chars("x" * 1000, chunk_size=300) == ["x" * 300] * 3 + ["x" * 100]
+
+
+def _table(rows: int) -> str:
+    lines = ["| Name | Value | Notes |", "| --- | --- | --- |"]
+    lines += [f"| item{i} | {i * 7} | row {i} of the table |" for i in range(rows)]
+    return "\n".join(lines)
+
+
+def test_parse_blocks_kinds():
+    """Test that reader output is split into headings, tables, code, lists and pages"""
+    content = (
+        "## Page 1\n\nIntro text.\n\n" + _table(2)
+        + "\n\n```python\nx = 1\n\ny = 2\n```\n\n- one\n\n- two\n  more\n\n-----\n\n# Title"
+    )
+    kinds = [block.kind for block in parse_blocks(content)]
+
+    assert kinds == ["page", "paragraph", "table", "code", "list", "page", "heading"]
+    assert parse_blocks(content)[3].text == "```python\nx = 1\n\ny = 2\n```"
+
+
+def test_chunk_by_structure_keeps_blocks_whole():
+    """Test that tables and code blocks are never cut between chunks"""
+    table = _table(12)
+    code = "```\n" + "\n".join(f"line {i} = compute({i})" for i in range(20)) + "\n```"
+    content = "\n\n".join([_paragraphs(6), table, _paragraphs(3), code, _paragraphs(6)])
+    chunks = chunk_by_structure(content, 600)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 600 for chunk in chunks)
+    assert sum(table in chunk for chunk in chunks) == 1
+    assert sum(code in chunk for chunk in chunks) == 1
+    assert "\n\n".join(chunks) == content
+
+
+def test_chunk_by_structure_splits_oversized_table_by_rows():
+    """Test that a table over budget is split into row groups repeating the header"""
+    table = _table(200)
+    chunks = chunk_by_structure("# Results\n\n" + table, 500)
+    header = "| Name | Value | Notes |\n| --- | --- | --- |"
+
+    assert len(chunks) > 1
+    assert chunks[0].startswith("# Results\n\n" + header)
+    assert all(header in chunk for chunk in chunks)
+    rows = [line for chunk in chunks for line in chunk.splitlines()[2:] if line.startswith("| item")]
+    assert rows == table.splitlines()[2:]
+
+
+def test_chunk_by_structure_keeps_headings_with_their_section():
+    """Test that a chunk never ends with a heading and sections start chunks"""
+    content = "\n\n".join(f"## Section {i}\n\n{_paragraphs(3)}" for i in range(8))
+    chunks = chunk_by_structure(content, 1000)
+
+    assert len(chunks) > 1
+    assert all(chunk.startswith("## Section") for chunk in chunks)
+    assert "\n\n".join(chunks) == content
+
+
+def test_iter_chunks_is_lazy_and_complete():
+    """Test that chunks are released while blocks still arrive and no text is lost"""
+    blocks = [_paragraphs(3) for _ in range(20)]
+    read = []
+
+    def source():
+        for i, block in enumerate(blocks):
+            read.append(i)
+            yield block
+
+    chunker = IncrementalChunker(lambda text: chunk_by_tokens(text, 500), 1000, estimate_tokens)
+    chunks = []
+    for chunk in iter_chunks(source(), chunker):
+        if not chunks:
+            first_at = len(read)
+        chunks.append(chunk)
+
+    assert first_at < len(blocks) // 2
+    assert all(estimate_tokens(chunk) <= 500 for chunk in chunks)
+    assert "\n\n".join(chunks) == "\n\n".join(blocks)
+
+
+def test_chunk_by_anchors_keeps_chunks_stable_across_edits():
+    """Test that an edit changes only the chunks near it"""
+    paragraphs = [
+        " ".join(f"p{i}w{j}" for j in range(10 + i * 7 % 90)) + "." for i in range(300)
+    ]
+    before = chunk_by_anchors("\n\n".join(paragraphs), 600)
+    paragraphs[150] += " An inserted sentence."
+    paragraphs.insert(40, "A new paragraph.")
+    after = chunk_by_anchors("\n\n".join(paragraphs), 600)
+
+    assert len(before) > 10
+    assert all(estimate_tokens(chunk) <= 600 for chunk in before)
+    assert "\n\n".join(after) == "\n\n".join(paragraphs)
+    assert len(set(after) - set(before)) <= 4
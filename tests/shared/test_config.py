@@ -119,4 +119,11 @@ def test_config_file_format(config_manager):
         file_content = yaml.safe_load(f)
     
     assert file_content["ai"]["provider"] == "ollama"
-    assert file_content["ai"]["gemini"]["api_key"] == "test-key"
\ No newline at end of file
+    assert file_content["ai"]["gemini"]["api_key"] == "test-key"
+
+def test_get_cache_dir(config_manager, tmp_path):
+    """Test response cache directory resolution"""
+    assert config_manager.get_cache_dir() == config_manager.config_dir / "cache"
+
+    config_manager.set_config_value("cache.directory", str(tmp_path))
+    assert config_manager.get_cache_dir() == tmp_path
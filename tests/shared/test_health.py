@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from claude_clis.shared.health import HealthCache, HealthResult, check_providers
+
+
+class FakeAIClient:
+    """Providers answer after a delay, fail, or aren't configured"""
+
+    def __init__(self, delays: dict[str, float | None]) -> None:
+        self.delays = delays
+        self.probes: list[str] = []
+
+    def test_provider(self, provider):
+        return provider in self.delays
+
+    async def probe(self, provider):
+        self.probes.append(provider)
+        delay = self.delays[provider]
+        if delay is None:
+            raise ConnectionError("connection refused")
+        await asyncio.sleep(delay)
+        return delay, delay / 2
+
+
+def make_config_manager(tmp_path, ttl=300.0, timeout=0.5):
+    config = SimpleNamespace(ai=SimpleNamespace(health=SimpleNamespace(ttl=ttl, timeout=timeout)))
+    return SimpleNamespace(
+        config_dir=tmp_path,
+        load_config=lambda: config,
+        get_ai_config=lambda provider: {"model": f"{provider}-model"},
+    )
+
+
+def test_providers_are_checked_concurrently(tmp_path):
+    """Slow, failing and unconfigured providers are reported in one pass"""
+    client = FakeAIClient({"fast": 0.1, "slow": 5, "down": None})
+
+    start = time.monotonic()
+    results = asyncio.run(check_providers(
+        client, make_config_manager(tmp_path), ["fast", "slow", "down", "missing"]
+    ))
+
+    assert time.monotonic() - start < 1
+    fast, slow, down, missing = results
+    assert (fast.reachable, fast.latency, fast.first_token) == (True, 0.1, 0.05)
+    assert not slow.reachable and "within" in slow.error
+    assert not down.reachable and down.error == "connection refused"
+    assert not missing.configured
+
+
+def test_healthy_results_are_cached(tmp_path):
+    """A second run reuses healthy results and probes failed providers again"""
+    client = FakeAIClient({"fast": 0, "down": None})
+    config_manager = make_config_manager(tmp_path)
+
+    asyncio.run(check_providers(client, config_manager, ["fast", "down"]))
+    results = asyncio.run(check_providers(client, config_manager, ["fast", "down"]))
+
+    assert results[0].cached
+    assert client.probes == ["fast", "down", "down"]
+
+    asyncio.run(check_providers(client, config_manager, ["fast"], refresh=True))
+    assert client.probes[-1] == "fast"
+
+
+def test_cache_expires_and_tracks_config(tmp_path):
+    """Entries expire after the TTL and don't apply to changed settings"""
+    cache = HealthCache(tmp_path / "health.json", ttl=60)
+    cache.put(HealthResult("gemini", True, True, 0.2, 0.1, checked_at=time.time()), "abc")
+    cache.put(HealthResult("ollama", True, True, 0.2, 0.1, checked_at=time.time() - 120), "abc")
+
+    assert cache.get("gemini", "abc").latency == 0.2
+    assert cache.get("gemini", "changed") is None
+    assert cache.get("ollama", "abc") is None
+
+
+def test_unreadable_cache_is_ignored(tmp_path):
+    """A corrupt cache file behaves like an empty one"""
+    path = tmp_path / "health.json"
+    path.write_text("{not json")
+
+    assert HealthCache(path).get("gemini", "abc") is None
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from claude_clis.shared.journal import ChunkJournal, ChunkStore
+
+SETTINGS = {"model": "m", "style": "technical", "chunk_tokens": 500}
+
+
+def test_journal_resumes_matching_chunks(tmp_path):
+    """Test that a resumed journal returns recorded chunks whose text is unchanged"""
+    path = tmp_path / ".out.md.journal"
+    journal = ChunkJournal(path, "abc", SETTINGS)
+    journal.record(0, "first chunk", "# First")
+    journal.record(1, "second chunk", "Second")
+    journal.close()
+
+    resumed = ChunkJournal(path, "abc", SETTINGS, resume=True)
+    assert resumed.get(0, "first chunk") == "# First"
+    assert resumed.get(1, "edited chunk") is None
+    assert resumed.get(2, "third chunk") is None
+    assert resumed.reused == 1
+
+
+def test_journal_starts_over_when_input_or_settings_differ(tmp_path):
+    """Test that entries are ignored for another input, other settings or without resume"""
+    path = tmp_path / ".out.md.journal"
+    journal = ChunkJournal(path, "abc", SETTINGS)
+    journal.record(0, "chunk", "Done")
+    journal.close()
+
+    assert ChunkJournal(path, "def", SETTINGS, resume=True).get(0, "chunk") is None
+    assert ChunkJournal(path, "abc", {**SETTINGS, "style": "casual"}, resume=True).get(0, "chunk") is None
+    assert ChunkJournal(path, "abc", SETTINGS).get(0, "chunk") is None
+
+
+def test_journal_tolerates_a_cut_off_entry(tmp_path):
+    """Test that a half-written last line from a killed run is dropped"""
+    path = tmp_path / ".out.md.journal"
+    journal = ChunkJournal(path, "abc", SETTINGS)
+    journal.record(0, "chunk", "Done")
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"index": 1, "chunk": "12')
+
+    resumed = ChunkJournal(path, "abc", SETTINGS, resume=True)
+    assert resumed.get(0, "chunk") == "Done"
+    resumed.record(1, "next", "Next")
+    resumed.discard()
+    assert not path.exists()
+
+
+def test_chunk_store_reuses_chunks_by_content(tmp_path):
+    """Test that stored chunks are found by their text, at any position"""
+    path = tmp_path / ".out.md.chunks.json"
+    store = ChunkStore(path, SETTINGS)
+    store.record(0, "intro", "# Intro")
+    store.record(1, "body", "Body")
+    store.save()
+
+    store = ChunkStore(path, SETTINGS)
+    assert store.get("body") == "Body"
+    assert store.get("edited intro") is None
+    assert store.reused == 1
+    assert ChunkStore(path, {**SETTINGS, "model": "other"}).get("body") is None
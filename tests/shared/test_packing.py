@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from claude_clis.shared.packing import (
+    build_packed_content,
+    pack_marker,
+    pack_nonce,
+    plan_packs,
+    split_packed_response,
+)
+
+
+def test_plan_packs_respects_budget_and_count():
+    """Documents are grouped in order without exceeding either limit"""
+    assert plan_packs([100, 200, 300, 50], budget=400) == [[0, 1], [2, 3]]
+    assert plan_packs([10] * 5, budget=1000, max_documents=2) == [[0, 1], [2, 3], [4]]
+    # An oversized document still gets a pack of its own
+    assert plan_packs([500, 10], budget=100) == [[0], [1]]
+
+
+def test_nonce_is_stable_and_content_specific():
+    """Identical packs give identical markers; different packs don't"""
+    assert pack_nonce(["a", "b"]) == pack_nonce(["a", "b"])
+    assert pack_nonce(["a", "b"]) != pack_nonce(["ab"])
+
+
+def test_split_round_trip():
+    """A response that repeats every marker splits back per document"""
+    nonce = pack_nonce(["one", "two"])
+    packed = build_packed_content(["one", "two"], nonce)
+    response = packed.replace("one", "# One").replace("two", "# Two")
+
+    assert split_packed_response(response, nonce, 2) == ["# One", "# Two"]
+
+
+def test_split_rejects_malformed_responses():
+    """Missing, reordered or empty sections and stray preamble fail validation"""
+    nonce = "abc12345"
+    first, second = pack_marker(nonce, 1), pack_marker(nonce, 2)
+
+    assert split_packed_response(f"{first}\n# One", nonce, 2) is None
+    assert split_packed_response(f"{second}\n# Two\n{first}\n# One", nonce, 2) is None
+    assert split_packed_response(f"{first}\n\n{second}\n# Two", nonce, 2) is None
+    assert split_packed_response(f"Sure!\n{first}\n# One\n{second}\n# Two", nonce, 2) is None
+    assert split_packed_response("# One\n# Two", nonce, 2) is None
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from claude_clis.shared.routing import ChunkRouter, chunk_features, classify_chunk
+
+PROSE = (
+    "The quarterly report covers revenue, costs and the outlook for the next year. "
+    "Growth was driven by new customers in the enterprise segment.\n\n"
+    "Margins improved slightly as infrastructure spending stabilised."
+)
+
+
+def test_classify_prose():
+    """Plain paragraphs are prose"""
+    assert classify_chunk(PROSE) == "prose"
+    assert classify_chunk(PROSE, long_tokens=20) == "long"
+
+
+def test_classify_tables():
+    """Pipe tables and column-aligned extracted tables are tables"""
+    pipe = "| Name | Age |\n|---|---|\n| John | 25 |\n| Jane | 30 |"
+    aligned = "Region     Q1      Q2\nNorth      120     140\nSouth      98      101"
+
+    assert classify_chunk(pipe) == "table"
+    assert classify_chunk(aligned) == "table"
+
+
+def test_classify_code():
+    """Source code is recognised from indentation and syntax"""
+    code = "def convert(path):\n    with open(path) as f:\n        return f.read()\n\nimport os"
+
+    assert classify_chunk(code) == "code"
+
+
+def test_classify_ocr_noise():
+    """Garbled OCR output is noisy"""
+    noisy = "Th~ qu@rt#rly r€p0rt c ov ers rev}nue , c0sts ~~ and t he out|ook ^^ f or"
+
+    assert chunk_features(noisy).noise_ratio > 0.15
+    assert classify_chunk(noisy) == "noisy"
+    assert chunk_features(PROSE).noise_ratio < 0.05
+
+
+def test_router_routes_and_counts():
+    """Classes map to their configured provider, others to the default"""
+    router = ChunkRouter({"prose": "ollama", "table": "anthropic"})
+
+    assert router.route(PROSE) == ("prose", "ollama")
+    assert router.route("| a | b |\n| 1 | 2 |") == ("table", "anthropic")
+    assert router.route("def f():\n    return 1") == ("code", None)
+    assert router.counts[("prose", "ollama")] == 1
+    assert router.counts[("code", "default")] == 1
+
+
+def test_bullet_lists_are_not_noise():
+    """Bullets and dashes in clean text don't count as OCR noise"""
+    bullets = "• First item\n• Second item\n- Third item — with a dash\n1. Numbered"
+
+    assert classify_chunk(bullets) == "prose"
+
+
+def test_wrapped_prose_is_not_code():
+    """Extracted lines that start with keywords like "for" stay prose"""
+    wrapped = (
+        "Revenue grew in every region\nfor the third year in a row, and\n"
+        "if the trend holds the target\nfrom last year will be met"
+    )
+
+    assert classify_chunk(wrapped) == "prose"
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from claude_clis.shared.ai_client import AIClient, AIClientError, DocumentProcessor
+from claude_clis.shared.config import ConfigManager
+from claude_clis.shared.stub_model import StubBackend, render_markdown
+
+
+@pytest.fixture
+def config_manager(tmp_path):
+    """ConfigManager with the stub provider answering instantly"""
+    manager = ConfigManager()
+    manager._config_dir = tmp_path
+    manager._config_file = tmp_path / "config.yaml"
+    manager._config = None
+    config = manager.load_config()
+    config.ai.provider = "stub"
+    config.ai.stub.latency_mean = 0.0
+    config.ai.retry.base_delay = 0.0
+    return manager
+
+
+def test_render_markdown_is_deterministic():
+    """Headings, lists and paragraphs are derived from the document text only"""
+    prompt = (
+        "This is part 1 of a larger document.\n\n"
+        "Document content:\nIntroduction\n\nSome   text\nwrapped here.\n\n• one\n• two"
+    )
+
+    expected = "## Introduction\n\nSome text wrapped here.\n\n- one\n- two"
+    assert render_markdown(prompt) == expected
+    assert render_markdown(prompt) == render_markdown(prompt)
+
+
+def test_latency_distributions():
+    """Sampled latency follows the configured distribution"""
+    assert StubBackend({"latency_mean": 0.3}).sample_latency() == 0.3
+
+    uniform = StubBackend({
+        "latency_distribution": "uniform", "latency_mean": 1.0, "latency_stddev": 0.5, "seed": 1,
+    })
+    assert all(0.5 <= uniform.sample_latency() <= 1.5 for _ in range(100))
+
+    lognormal = StubBackend({
+        "latency_distribution": "lognormal", "latency_mean": 1.0, "latency_stddev": 0.5, "seed": 1,
+    })
+    samples = [lognormal.sample_latency() for _ in range(5000)]
+    assert min(samples) > 0
+    assert sum(samples) / len(samples) == pytest.approx(1.0, rel=0.05)
+
+
+def test_stub_provider_end_to_end(config_manager):
+    """run_prompt and stream_prompt answer through the stub model"""
+    client = AIClient(config_manager)
+
+    async def scenario():
+        text = await client.run_prompt("Document content:\nHello world", system_prompt="sys")
+        streamed = [d async for d in client.stream_prompt("Document content:\nHello world")]
+        return text, "".join(streamed)
+
+    text, streamed = asyncio.run(scenario())
+    assert text == "## Hello world"
+    assert streamed == text
+
+
+def test_stub_provider_splits_packed_documents(config_manager):
+    """Marker lines stay on their own lines, so a packed response splits per document"""
+    processor = DocumentProcessor(AIClient(config_manager))
+    documents = ["Alpha\n\nSome   text\nwrapped here.", "• one\n• two", "Gamma closes the pack."]
+
+    sections = asyncio.run(processor.convert_packed(documents))
+
+    assert sections == ["## Alpha\n\nSome text wrapped here.", "- one\n- two", "Gamma closes the pack."]
+
+
+def test_stub_injected_errors_are_retried(config_manager):
+    """Injected 429s go through the retry path and finally surface as errors"""
+    config_manager.load_config().ai.stub.rate_limit_rate = 1.0
+    client = AIClient(config_manager)
+
+    with pytest.raises(AIClientError, match="after 4 attempts"):
+        asyncio.run(client.run_prompt("Document content:\nHello"))
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+from pydantic_ai.usage import RequestUsage, RunUsage
+
+from claude_clis.shared.telemetry import (
+    MetricsRecorder,
+    TokenUsage,
+    estimate_cost,
+    percentile,
+    request_context,
+)
+
+
+def test_token_usage_from_pydantic_ai_usage():
+    """Run and single-request usage both carry the cache-read tokens"""
+    run = TokenUsage.from_usage(RunUsage(
+        input_tokens=1200, output_tokens=300, cache_read_tokens=1000
+    ))
+    request = TokenUsage.from_usage(RequestUsage(input_tokens=300, cache_read_tokens=100))
+
+    assert run == TokenUsage(1200, 300, 1000)
+    assert request == TokenUsage(300, 0, 100)
+
+
+def test_estimate_cost():
+    """Cached input is billed at its own rate, or the input rate when unset"""
+    usage = TokenUsage(input_tokens=2_000_000, output_tokens=1_000_000, cached_input_tokens=1_000_000)
+
+    assert estimate_cost(usage, {
+        "input_cost_per_mtok": 3.0, "output_cost_per_mtok": 15.0, "cached_input_cost_per_mtok": 0.3,
+    }) == pytest.approx(18.3)
+    assert estimate_cost(usage, {
+        "input_cost_per_mtok": 3.0, "output_cost_per_mtok": 15.0, "cached_input_cost_per_mtok": None,
+    }) == pytest.approx(21.0)
+
+
+def test_request_context_is_per_task():
+    """Concurrent tasks attribute their requests to their own file and chunk"""
+    metrics = MetricsRecorder()
+
+    async def convert(file: str, chunks: int) -> None:
+        with request_context(file=file):
+            for chunk in range(chunks):
+                with request_context(chunk=chunk, queue_wait=0.5):
+                    await asyncio.sleep(0)
+                    metrics.record("stub", "stub", "ok", latency=1.0, queue_wait=0.25)
+
+    async def scenario():
+        await asyncio.gather(convert("a.pdf", 2), convert("b.pdf", 1))
+
+    asyncio.run(scenario())
+    tagged = sorted((r.file, r.chunk) for r in metrics.records)
+    assert tagged == [("a.pdf", 0), ("a.pdf", 1), ("b.pdf", 0)]
+    assert all(r.queue_wait == 0.75 for r in metrics.records)
+    assert metrics.record("stub", "stub", "ok").file is None
+
+
+def test_summary_and_json(tmp_path):
+    """Summary covers percentiles, throughput and cost; JSON holds raw records"""
+    metrics = MetricsRecorder()
+    for i in range(100):
+        with request_context(file="a.pdf" if i % 2 else "b.pdf", chunk=i):
+            metrics.record(
+                "stub", "stub", "ok",
+                usage=TokenUsage(input_tokens=100, output_tokens=50),
+                latency=(i + 1) / 100,
+                cost=0.01,
+            )
+    metrics.record("stub", "stub", "cached")
+    metrics.record("stub", "stub", "error", latency=30.0)
+
+    summary = metrics.summary()
+    assert summary["requests"] == 102
+    assert (summary["errors"], summary["cache_hits"]) == (1, 1)
+    assert summary["latency_p50"] == pytest.approx(0.51)
+    assert summary["latency_p99"] == pytest.approx(1.0)
+    assert summary["output_tokens_per_second"] == pytest.approx(5000 / 50.5)
+    assert summary["cost"] == pytest.approx(1.0)
+    assert set(metrics.by_file()) == {"a.pdf", "b.pdf", "-"}
+
+    path = tmp_path / "metrics.json"
+    metrics.write_json(path)
+    data = json.loads(path.read_text())
+    assert len(data["records"]) == 102
+    assert data["files"]["a.pdf"]["requests"] == 50
+
+
+def test_percentile_empty():
+    """No samples means no percentile"""
+    assert percentile([], 0.5) is None
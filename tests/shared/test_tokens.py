@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from claude_clis.shared.tokens import chunk_token_budget, estimate_tokens
+
+
+def test_estimate_tokens_latin():
+    """Test that Latin text averages about four characters per token"""
+    text = "The quick brown fox jumps over the lazy dog. " * 20
+    assert 0.15 < estimate_tokens(text) / len(text) < 0.35
+
+
+def test_estimate_tokens_cjk():
+    """Test that CJK characters are counted close to one token each"""
+    text = "这是一个用于测试的中文句子" * 20
+    assert estimate_tokens(text) >= len(text)
+    assert estimate_tokens(text) > estimate_tokens("a" * len(text)) * 3
+
+
+def test_estimate_tokens_empty():
+    """Test the empty string"""
+    assert estimate_tokens("") == 0
+
+
+def test_chunk_token_budget():
+    """Test that the output limit binds for large context windows"""
+    assert chunk_token_budget(1_048_576, 8192) == int(8192 / 1.15)
+    # A small context window leaves room for the prompt and the answer
+    assert chunk_token_budget(8192, 4096) <= 8192 - 4096
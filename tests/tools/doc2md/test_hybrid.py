@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+
+from claude_clis.tools.doc2md.hybrid import (
+    HybridConverter,
+    plan_segments,
+    score_block,
+    split_blocks,
+)
+
+CLEAN_DOCX = """# Annual Report
+
+## Summary
+
+Revenue grew **12%** year over year, driven by the [enterprise](https://example.com/x) segment.
+
+| Region | Q1 | Q2 |
+| --- | --- | --- |
+| North | 120 | 140 |
+| South | 98 | 101 |
+
+- First point
+- Second point"""
+
+GARBLED = """Region     Q1      Q2
+North      120     140
+South      98      101"""
+
+
+class FakeDocumentProcessor:
+    def __init__(self) -> None:
+        self.converted: list[str] = []
+
+    async def process_large_content(self, content, semaphore=None, **kwargs):
+        self.converted.append(content)
+        return f"<converted {len(self.converted)}>"
+
+    async def stream_large_content(self, content, **kwargs):
+        self.converted.append(content)
+        yield "<streamed>"
+
+
+def test_split_blocks_keeps_code_fences_whole():
+    """Blank lines inside a fenced block don't split it"""
+    content = "Intro\n\n```python\na = 1\n\nb = 2\n```\n\nOutro"
+
+    assert split_blocks(content) == ["Intro", "```python\na = 1\n\nb = 2\n```", "Outro"]
+
+
+def test_clean_docx_output_passes_through():
+    """Headings, well-formed tables, lists and prose need no model call"""
+    assert all(segment.passthrough for segment in plan_segments(CLEAN_DOCX))
+    assert len(plan_segments(CLEAN_DOCX)) == 1
+
+
+def test_low_confidence_blocks():
+    """Broken tables, column-aligned text and short layout fragments score low"""
+    ragged = "| a | b |\n| --- | --- |\n| 1 | 2 | 3 |"
+    no_separator = "| a | b |\n| 1 | 2 |"
+    fragments = "Total\nrevenue for\nthe year\nwas up"
+
+    assert score_block(ragged).score < 0.7
+    assert score_block(no_separator).score < 0.7
+    assert score_block(GARBLED).score < 0.7
+    assert score_block(fragments).score < 0.7
+    assert score_block("| a | b |\n|---|---|\n| 1 | 2 |").score == 1.0
+
+
+def test_hybrid_converts_only_doubtful_regions():
+    """Only low-confidence regions reach the model; order is preserved"""
+    content = f"{CLEAN_DOCX}\n\n{GARBLED}\n\n## Closing\n\nThanks for reading."
+    doc_processor = FakeDocumentProcessor()
+    converter = HybridConverter(doc_processor)
+
+    segments = converter.plan(content)
+    result = asyncio.run(converter.convert(segments, chunk_concurrency=2))
+
+    assert [s.passthrough for s in segments] == [True, False, True]
+    assert doc_processor.converted == [GARBLED]
+    assert result == f"{CLEAN_DOCX}\n\n<converted 1>\n\n## Closing\n\nThanks for reading."
+
+
+def test_hybrid_stream_preserves_order():
+    """Streaming yields kept text and converted regions in document order"""
+    content = f"# Title\n\n{GARBLED}\n\nEnd of document."
+    converter = HybridConverter(FakeDocumentProcessor())
+
+    async def collect():
+        return "".join([t async for t in converter.stream(converter.plan(content))])
+
+    assert asyncio.run(collect()) == "# Title\n\n<streamed>\n\nEnd of document."
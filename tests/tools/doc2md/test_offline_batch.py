@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from claude_clis.shared.config import OfflineBatchConfig
+from claude_clis.tools.doc2md.offline_batch import (
+    AnthropicBatchBackend,
+    BatchBackend,
+    BatchRequest,
+    BatchResult,
+    GeminiBatchBackend,
+    OfflineBatchError,
+    OfflineBatchRunner,
+)
+
+
+class FakeBackend(BatchBackend):
+    def __init__(
+        self, fail_first: set[str] | None = None, truncate_first: set[str] | None = None
+    ) -> None:
+        self.jobs: dict[str, list[BatchRequest]] = {}
+        self.fail_first = set(fail_first or ())
+        self.truncate_first = set(truncate_first or ())
+
+    async def submit(self, requests):
+        job_id = f"job{len(self.jobs)}"
+        self.jobs[job_id] = requests
+        return job_id
+
+    async def poll(self, job_id):
+        return "ended"
+
+    async def fetch_results(self, job_id):
+        results = {}
+        for request in self.jobs[job_id]:
+            if request.custom_id in self.fail_first:
+                self.fail_first.discard(request.custom_id)
+                results[request.custom_id] = BatchResult(None)
+            elif request.custom_id in self.truncate_first:
+                self.truncate_first.discard(request.custom_id)
+                results[request.custom_id] = BatchResult(f"cut {request.custom_id}", truncated=True)
+            else:
+                results[request.custom_id] = BatchResult(f"converted {request.custom_id}")
+        return results
+
+
+class FakeDocumentProcessor:
+    cache_hits = 0
+
+    def build_requests(self, content, chunk_size, style, preserve_formatting, chunk_tokens, structured=False):
+        return [(f"prompt {part}", "system") for part in content.split("|")]
+
+    def cache_key(self, prompt, provider=None, system_prompt=None):
+        return prompt
+
+    def combine_results(self, results):
+        return "\n\n---\n\n".join(results)
+
+    def split_request(self, prompt):
+        words = prompt.split()[1:]
+        if len(words) < 2:
+            return None
+        middle = len(words) // 2
+        return [f"prompt {' '.join(words[:middle])}", f"prompt {' '.join(words[middle:])}"]
+
+    def join_halves(self, results):
+        return "\n\n".join(results)
+
+
+def make_processor() -> SimpleNamespace:
+    async def extract(path: Path) -> str:
+        return path.read_text()
+
+    messages = []
+    cli_ctx = SimpleNamespace(
+        messages=messages,
+        info=messages.append,
+        debug=messages.append,
+        success=messages.append,
+        warning=messages.append,
+    )
+    return SimpleNamespace(
+        cli_ctx=cli_ctx,
+        ai_client=SimpleNamespace(
+            get_model_info=lambda provider: {
+                "provider": "anthropic", "model": "test-model", "temperature": 0.1,
+            }
+        ),
+        doc_processor=FakeDocumentProcessor(),
+        response_cache=None,
+        _extract_content=extract,
+        _generate_metadata=lambda path, provider, style: f"<!-- {path.name} -->",
+    )
+
+
+def test_runner_writes_documents_and_cleans_up(tmp_path):
+    """Every document is written from its chunk results in order"""
+    (tmp_path / "a.txt").write_text("one|two")
+    (tmp_path / "b.txt").write_text("three")
+    out = tmp_path / "out"
+    backend = FakeBackend()
+    runner = OfflineBatchRunner(
+        make_processor(), config=OfflineBatchConfig(poll_interval=0), backend=backend
+    )
+
+    written = asyncio.run(runner.run(
+        [tmp_path / "a.txt", tmp_path / "b.txt"], out
+    ))
+
+    assert sorted(p.name for p in written) == ["a.md", "b.md"]
+    assert (out / "a.md").read_text() == (
+        "<!-- a.txt -->\n\nconverted f0-c0\n\n---\n\nconverted f0-c1"
+    )
+    assert len(backend.jobs) == 1
+    assert not (out / OfflineBatchRunner.STATE_DIR).exists()
+
+
+def test_runner_resubmits_failed_requests(tmp_path):
+    """Requests that fail inside a job are submitted again in a new job"""
+    (tmp_path / "a.txt").write_text("one|two")
+    backend = FakeBackend(fail_first={"f0-c1"})
+    runner = OfflineBatchRunner(
+        make_processor(), config=OfflineBatchConfig(poll_interval=0), backend=backend
+    )
+
+    written = asyncio.run(runner.run([tmp_path / "a.txt"], tmp_path / "out"))
+
+    assert len(written) == 1
+    assert [[r.custom_id for r in job] for job in backend.jobs.values()] == [
+        ["f0-c0", "f0-c1"], ["f0-c1"],
+    ]
+
+
+def test_runner_keeps_state_when_requests_give_up(tmp_path):
+    """State is kept for a later resume when a document can't be completed"""
+    (tmp_path / "a.txt").write_text("one")
+    out = tmp_path / "out"
+    backend = FakeBackend(fail_first={"f0-c0"})
+    runner = OfflineBatchRunner(
+        make_processor(),
+        config=OfflineBatchConfig(poll_interval=0, max_attempts=1),
+        backend=backend,
+    )
+
+    assert asyncio.run(runner.run([tmp_path / "a.txt"], out)) == []
+    manifest = json.loads((out / OfflineBatchRunner.STATE_DIR / "manifest.json").read_text())
+    assert manifest["attempts"] == {"f0-c0": 1}
+
+
+def test_runner_splits_truncated_requests(tmp_path):
+    """A response cut off at the output limit is replaced by its halves"""
+    (tmp_path / "a.txt").write_text("one two")
+    (tmp_path / "b.txt").write_text("three")
+    out = tmp_path / "out"
+    backend = FakeBackend(truncate_first={"f0-c0", "f1-c0"})
+    runner = OfflineBatchRunner(
+        make_processor(), config=OfflineBatchConfig(poll_interval=0), backend=backend
+    )
+
+    asyncio.run(runner.run([tmp_path / "a.txt", tmp_path / "b.txt"], out))
+
+    assert [[r.custom_id for r in job] for job in backend.jobs.values()] == [
+        ["f0-c0", "f1-c0"], ["f0-c0_0", "f0-c0_1"],
+    ]
+    assert [r.prompt for r in backend.jobs["job1"]] == ["prompt one", "prompt two"]
+    # The id format the Message Batches API accepts
+    assert all(
+        re.fullmatch(r"[a-zA-Z0-9_-]{1,64}", r.custom_id)
+        for job in backend.jobs.values() for r in job
+    )
+    assert (out / "a.md").read_text() == (
+        "<!-- a.txt -->\n\nconverted f0-c0_0\n\nconverted f0-c0_1"
+    )
+    # Too short to split, so the cut-off response is kept
+    assert (out / "b.md").read_text() == "<!-- b.txt -->\n\ncut f1-c0"
+
+
+def test_runner_records_jobs_before_submitting(tmp_path):
+    """A run killed during submission leaves a marker the next run reports"""
+    (tmp_path / "a.txt").write_text("one")
+    out = tmp_path / "out"
+
+    class KilledBackend(FakeBackend):
+        async def submit(self, requests):
+            raise KeyboardInterrupt
+
+    processor = make_processor()
+    runner = OfflineBatchRunner(
+        processor, config=OfflineBatchConfig(poll_interval=0), backend=KilledBackend()
+    )
+    with pytest.raises(KeyboardInterrupt):
+        asyncio.run(runner.run([tmp_path / "a.txt"], out))
+    manifest = json.loads((out / OfflineBatchRunner.STATE_DIR / "manifest.json").read_text())
+    assert manifest["jobs"] == [{"id": None, "requests": ["f0-c0"], "status": "submitting"}]
+    assert manifest["attempts"] == {"f0-c0": 1}
+
+    runner = OfflineBatchRunner(
+        processor, config=OfflineBatchConfig(poll_interval=0), backend=FakeBackend()
+    )
+    written = asyncio.run(runner.run([tmp_path / "a.txt"], out))
+
+    assert [p.name for p in written] == ["a.md"]
+    assert any("may have been submitted" in str(m) for m in processor.cli_ctx.messages)
+
+
+def test_runner_refuses_to_resume_with_other_settings(tmp_path):
+    """A changed file set or temperature can't reuse the unfinished batch"""
+    (tmp_path / "a.txt").write_text("one")
+    (tmp_path / "b.txt").write_text("two")
+    out = tmp_path / "out"
+    config = OfflineBatchConfig(poll_interval=0, max_attempts=1)
+    runner = OfflineBatchRunner(
+        make_processor(), config=config, backend=FakeBackend(fail_first={"f0-c0"})
+    )
+    asyncio.run(runner.run([tmp_path / "a.txt"], out))
+
+    runner = OfflineBatchRunner(make_processor(), config=config, backend=FakeBackend())
+    with pytest.raises(OfflineBatchError):
+        asyncio.run(runner.run([tmp_path / "a.txt", tmp_path / "b.txt"], out))
+
+    processor = make_processor()
+    processor.ai_client.get_model_info = lambda provider: {
+        "provider": "anthropic", "model": "test-model", "temperature": 0.7,
+    }
+    runner = OfflineBatchRunner(processor, config=config, backend=FakeBackend())
+    with pytest.raises(OfflineBatchError):
+        asyncio.run(runner.run([tmp_path / "a.txt"], out))
+
+
+def test_anthropic_backend_round_trip():
+    """Requests are posted in the Message Batches format and results parsed from JSONL"""
+    submitted = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.headers["x-api-key"] == "key"
+        if request.method == "POST":
+            submitted.update(json.loads(request.content))
+            return httpx.Response(200, json={"id": "batch1"})
+        if request.url.path.endswith("/results"):
+            lines = [
+                {"custom_id": "a", "result": {"type": "succeeded", "message": {
+                    "stop_reason": "end_turn",
+                    "content": [{"type": "text", "text": "# A"}],
+                }}},
+                {"custom_id": "b", "result": {"type": "errored"}},
+                {"custom_id": "c", "result": {"type": "succeeded", "message": {
+                    "stop_reason": "max_tokens",
+                    "content": [{"type": "text", "text": "# C"}],
+                }}},
+            ]
+            return httpx.Response(200, text="\n".join(json.dumps(line) for line in lines))
+        return httpx.Response(200, json={
+            "processing_status": "ended",
+            "results_url": "https://api.test/v1/messages/batches/batch1/results",
+        })
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            backend = AnthropicBatchBackend(
+                client, "key", "claude-test", 1024, 0.1, "https://api.test"
+            )
+            job_id = await backend.submit([
+                BatchRequest("a", "prompt a", "system"),
+                BatchRequest("b", "prompt b", "system"),
+            ])
+            return job_id, await backend.poll(job_id), await backend.fetch_results(job_id)
+
+    job_id, status, results = asyncio.run(scenario())
+
+    assert job_id == "batch1"
+    assert status == "ended"
+    assert results == {
+        "a": BatchResult("# A"),
+        "b": BatchResult(None),
+        "c": BatchResult("# C", truncated=True),
+    }
+    params = submitted["requests"][0]["params"]
+    assert params["model"] == "claude-test"
+    assert params["system"] == "system"
+    assert params["messages"] == [{"role": "user", "content": "prompt a"}]
+
+
+def test_gemini_backend_round_trip():
+    """Requests are posted as inlined batch requests and results read from the operation"""
+    submitted = {}
+    states = iter(["BATCH_STATE_RUNNING", "BATCH_STATE_SUCCEEDED"])
+
+    def candidate(text, finish_reason):
+        return {"content": {"parts": [{"text": text}]}, "finishReason": finish_reason}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.headers["x-goog-api-key"] == "key"
+        if request.method == "POST":
+            assert request.url.path == "/v1beta/models/gemini-test:batchGenerateContent"
+            submitted.update(json.loads(request.content))
+            return httpx.Response(200, json={"name": "batches/123"})
+        assert request.url.path == "/v1beta/batches/123"
+        return httpx.Response(200, json={
+            "metadata": {"state": next(states, "BATCH_STATE_SUCCEEDED")},
+            "response": {"inlinedResponses": {"inlinedResponses": [
+                {"metadata": {"key": "a"}, "response": {"candidates": [candidate("# A", "STOP")]}},
+                {"metadata": {"key": "b"}, "response": {"candidates": [candidate("", "SAFETY")]}},
+                {"metadata": {"key": "c"}, "response": {"candidates": [candidate("# C", "MAX_TOKENS")]}},
+                {"metadata": {"key": "d"}, "error": {"code": 500}},
+            ]}},
+        })
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            backend = GeminiBatchBackend(
+                client, "key", "gemini-test", 1024, 0.1, "https://api.test"
+            )
+            job_id = await backend.submit([
+                BatchRequest("a", "prompt a", "system"),
+                BatchRequest("b", "prompt b", "system"),
+            ])
+            statuses = [await backend.poll(job_id), await backend.poll(job_id)]
+            return job_id, statuses, await backend.fetch_results(job_id)
+
+    job_id, statuses, results = asyncio.run(scenario())
+
+    assert job_id == "batches/123"
+    assert statuses == ["running", "ended"]
+    assert results == {
+        "a": BatchResult("# A"),
+        "b": BatchResult(None),
+        "c": BatchResult("# C", truncated=True),
+        "d": BatchResult(None),
+    }
+    request = submitted["batch"]["input_config"]["requests"]["requests"][0]
+    assert request["metadata"] == {"key": "a"}
+    assert request["request"]["contents"] == [{"role": "user", "parts": [{"text": "prompt a"}]}]
+    assert request["request"]["system_instruction"] == {"parts": [{"text": "system"}]}
+    assert request["request"]["generation_config"] == {"maxOutputTokens": 1024, "temperature": 0.1}
+
+
+def test_gemini_backend_reports_failed_batches():
+    """Failed, cancelled and expired batches end polling as failed"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"metadata": {"state": "BATCH_STATE_EXPIRED"}})
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            backend = GeminiBatchBackend(client, "key", "gemini-test", 1024, None, "https://api.test")
+            return await backend.poll("batches/123")
+
+    assert asyncio.run(scenario()) == "failed"
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from claude_clis.shared.config import config_manager
+from claude_clis.shared.utils import CLIContext
+from claude_clis.tools.doc2md.processor import Doc2mdProcessor
+
+
+@pytest.fixture
+def stub_config(tmp_path, monkeypatch):
+    """The global config in a temporary directory, with an instant stub provider"""
+    monkeypatch.setattr(config_manager, "_config_dir", tmp_path)
+    monkeypatch.setattr(config_manager, "_config_file", tmp_path / "config.yaml")
+    monkeypatch.setattr(config_manager, "_config", None)
+    config = config_manager.load_config()
+    config.cache.enabled = False
+    config.ai.stub.latency_mean = 0.0
+    return config
+
+
+def test_packed_batch_writes_every_document_through_the_stub(tmp_path, stub_config):
+    """Small files share one stub request and each still gets its own Markdown"""
+    input_dir = tmp_path / "docs"
+    input_dir.mkdir()
+    documents = {
+        "alpha": "Alpha\n\nFirst document, with   spacing.",
+        "beta": "• one\n• two",
+        "gamma": "Gamma closes the pack.",
+    }
+    for name, text in documents.items():
+        (input_dir / f"{name}.txt").write_text(text, encoding="utf-8")
+    cli_ctx = CLIContext()
+    cli_ctx.quiet = True
+    processor = Doc2mdProcessor(cli_ctx, use_cache=False)
+
+    async def scenario():
+        try:
+            return await processor.batch_convert(
+                input_dir, tmp_path / "out", pattern="*.txt", ai_provider="stub", pack=True
+            )
+        finally:
+            await processor.aclose()
+
+    results = asyncio.run(scenario())
+
+    assert sorted(path.name for path in results) == ["alpha.md", "beta.md", "gamma.md"]
+    assert [record.status for record in processor.ai_client.metrics.records] == ["ok"]
+    expected = {
+        "alpha": "## Alpha\n\nFirst document, with spacing.",
+        "beta": "- one\n- two",
+        "gamma": "Gamma closes the pack.",
+    }
+    for name, markdown in expected.items():
+        output = (tmp_path / "out" / f"{name}.md").read_text(encoding="utf-8")
+        assert f"- Original file: {name}.txt" in output
+        assert output.endswith(f"-->\n\n{markdown}")